@@ -0,0 +1,103 @@
+"""
+Benchmark for filtering 100k synthetic positions and transactions with the per-row list of lambdas used before,
+versus the predicates compiled by utils.filter_utils.
+
+Run with:
+    uv run python -m benchmarks.bench_filters
+"""
+import datetime
+import random
+import time
+
+from clearinghouse.models.request import PositionsFilter, TransactionsFilter
+from clearinghouse.models.response_structs import Position, Transaction
+from clearinghouse.utils.filter_utils import compile_positions_filter, compile_transactions_filter
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+SYMBOLS = [f"SYM{i}" for i in range(500)]
+
+
+def generate_positions(n: int, rng: random.Random):
+    return [
+        Position(
+            symbol=rng.choice(SYMBOLS),
+            asset_type=rng.choice(["EQUITY", "MUTUAL_FUND", "OPTION"]),
+            quantity=rng.uniform(-100, 100),
+            lots=[],
+            market_value=rng.uniform(-10_000, 10_000),
+            entry_value=0.0,
+            net_change=0.0,
+        )
+        for _ in range(n)
+    ]
+
+
+def generate_transactions(n: int, rng: random.Random):
+    return [
+        Transaction(
+            id=i,
+            order_id=i,
+            time=START + datetime.timedelta(minutes=rng.randrange(5 * 365 * 24 * 60)),
+            type=rng.choice(["TRADE", "JOURNAL", "DIVIDEND_OR_INTEREST", "WIRE_IN"]),
+            status="VALID",
+            net_amount=0.0,
+            trade_date=START,
+        )
+        for i in range(n)
+    ]
+
+
+def lambda_filter_positions(data, filter_request: PositionsFilter):
+    filters = [
+        lambda p: p.asset_type in filter_request.asset_types if filter_request.asset_types else True,
+        lambda p: p.quantity >= 0 if not filter_request.shorts else True,
+        lambda p: p.quantity <= 0 if not filter_request.longs else True,
+        lambda p: p.market_value >= filter_request.min_position_size if filter_request.min_position_size is not None else True,
+        lambda p: p.market_value <= filter_request.max_position_size if filter_request.max_position_size is not None else True,
+        lambda p: p.symbol in filter_request.symbols if filter_request.symbols else True,
+    ]
+    return [item for item in data if all(f(item) for f in filters)]
+
+
+def lambda_filter_transactions(data, filter_request: TransactionsFilter):
+    filters = [
+        lambda t: t.type in filter_request.types if filter_request.types else True,
+        lambda t: t.time >= filter_request.start_date if filter_request.start_date else True,
+        lambda t: t.time <= filter_request.end_date if filter_request.end_date else True,
+    ]
+    return [item for item in data if all(f(item) for f in filters)]
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(n: int = 100_000):
+    rng = random.Random(0)
+    positions = generate_positions(n, rng)
+    transactions = generate_transactions(n, rng)
+
+    cases = [
+        ("positions, no filter", positions, PositionsFilter(symbols=[]),
+         lambda_filter_positions, compile_positions_filter),
+        ("positions, 50 symbols", positions, PositionsFilter(symbols=SYMBOLS[:50]),
+         lambda_filter_positions, compile_positions_filter),
+        ("positions, longs over 1000", positions, PositionsFilter(shorts=False, min_position_size=1000, symbols=[]),
+         lambda_filter_positions, compile_positions_filter),
+        ("transactions, 2 types, 1 year", transactions, TransactionsFilter(
+            types=["TRADE", "JOURNAL"], start_date=START.replace(year=2022), end_date=START.replace(year=2023),
+            symbols=[]), lambda_filter_transactions, compile_transactions_filter),
+    ]
+
+    print(f"{'case':<32} {'lambdas (ms)':>13} {'compiled (ms)':>14} {'speedup':>8}")
+    for name, data, filter_request, baseline, compile_filter in cases:
+        expected, baseline_ms = timed(baseline, data, filter_request)
+        result, compiled_ms = timed(lambda: list(compile_filter(filter_request).apply(data)))
+        assert result == expected
+        print(f"{name:<32} {baseline_ms:>13.1f} {compiled_ms:>14.1f} {baseline_ms / compiled_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
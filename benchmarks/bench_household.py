@@ -0,0 +1,92 @@
+"""
+Benchmark for the household view of 1 and 20 linked accounts against local data answered after a simulated Schwab
+latency, over a connection pool of the default size: each account's positions and balances fetched one account
+after another, as a client calling /v1/positions and /v1/accounts/default per account did, versus
+fetch_household_book fetching every account concurrently. Balance and positions caches are cleared before every
+run so that each run calls Schwab.
+
+Run with:
+    uv run python -m benchmarks.bench_household
+"""
+import asyncio
+import statistics
+import time
+
+from clearinghouse.dependencies import AsyncLocalSchwabClient, AsyncSchwabClient, LocalSchwabClient, LocalSchwabService
+from clearinghouse.services.household_service import fetch_household_book
+from clearinghouse.services.orders_service import fetch_positions
+from clearinghouse.services.status_service import fetch_account_status, invalidate_account_state
+
+LATENCY = 0.05
+
+
+class LinkedAccountsClient(LocalSchwabClient):
+    def __init__(self, accounts: int):
+        super().__init__()
+        self.accounts = accounts
+
+    def account_linked(self):
+        return self._generate_response([
+            {"accountNumber": str(1234 + i), "hashValue": f"hash{i}"} for i in range(self.accounts)])
+
+
+class SlowAsyncClient(AsyncLocalSchwabClient):
+    """
+    Answers every call after LATENCY, at most max_connections at a time like the connection pool of
+    AsyncSchwabClient, without the worker threads of AsyncLocalSchwabClient.
+    """
+    def __init__(self, client: LocalSchwabClient, connections: asyncio.Semaphore):
+        super().__init__(client)
+        self._connections = connections
+
+    async def _call(self, method: str, *args, **kwargs):
+        async with self._connections:
+            await asyncio.sleep(LATENCY)
+            return getattr(self._client, method)(*args, **kwargs)
+
+
+class SlowLocalSchwabService(LocalSchwabService):
+    def __init__(self):
+        super().__init__()
+        self.connections = asyncio.Semaphore(self.max_connections)
+
+    def _async_schwab_client(self) -> AsyncSchwabClient:
+        return SlowAsyncClient(self.client, self.connections)
+
+
+def create_service(accounts: int) -> LocalSchwabService:
+    service = SlowLocalSchwabService()
+    service.client = LinkedAccountsClient(accounts)
+    service.set_default_trading_account()
+    return service
+
+
+async def fetch_sequentially(service: LocalSchwabService):
+    for account in service.accounts.all():
+        await fetch_positions(account)
+        await fetch_account_status(account)
+
+
+async def time_fetch(service: LocalSchwabService, fetch, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        for account in service.accounts.all():
+            invalidate_account_state(account)
+        started_at = time.perf_counter()
+        await fetch(service)
+        times.append(time.perf_counter() - started_at)
+    return statistics.median(times)
+
+
+def run(account_counts=(1, 20), repeat: int = 5):
+    print(f"Schwab latency {LATENCY * 1000:.0f} ms per call")
+    print(f"{'accounts':>8} {'sequential (ms)':>16} {'household (ms)':>15} {'speedup':>8}")
+    for accounts in account_counts:
+        service = create_service(accounts)
+        sequential = asyncio.run(time_fetch(service, fetch_sequentially, repeat))
+        household = asyncio.run(time_fetch(service, fetch_household_book, repeat))
+        print(f"{accounts:>8} {sequential * 1000:>16.1f} {household * 1000:>15.1f} {sequential / household:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,80 @@
+"""
+Benchmark for decoding and mapping order histories: timestamps kept as strings and parsed with strptime per order,
+versus decoded natively by msgspec, versus the memoized fallback parser for non-standard timestamps.
+
+Run with:
+    uv run python -m benchmarks.bench_order_decoding
+"""
+import copy
+import datetime
+import time
+from typing import List
+
+import msgspec
+
+import clearinghouse.data.sample_data as sample_data
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.services.orders_service import decode_orders, schwab_to_ch_order
+
+
+class StringTimestampOrder(schwab_response.Order, kw_only=True):
+    """
+    Order with the timestamps left as strings, as they were decoded before.
+    """
+    cancel_time: str = msgspec.field(name="cancelTime")
+    entered_time: str = msgspec.field(name="enteredTime")
+
+
+def generate_payload(n: int, timestamp_format: str = "%Y-%m-%dT%H:%M:%S%z") -> bytes:
+    start = datetime.datetime(2024, 1, 2, 14, 30, tzinfo=datetime.timezone.utc)
+    raw = []
+    for i in range(n):
+        order = copy.deepcopy(sample_data.ACCOUNT_ORDERS_ALL[0])
+        entered = start + datetime.timedelta(seconds=37 * i)
+        order.update(
+            orderId=i,
+            enteredTime=entered.strftime(timestamp_format),
+            cancelTime=entered.replace(hour=0, minute=0, second=0).strftime(timestamp_format),
+        )
+        raw.append(order)
+    return msgspec.json.encode(raw)
+
+
+def decode_with_strptime(content: bytes):
+    orders = msgspec.json.decode(content, type=List[StringTimestampOrder])
+    return [
+        (
+            datetime.datetime.strptime(o.entered_time, "%Y-%m-%dT%H:%M:%S%z"),
+            datetime.datetime.strptime(o.cancel_time, "%Y-%m-%dT%H:%M:%S%z"),
+        )
+        for o in orders
+    ]
+
+
+def decode_native(content: bytes):
+    return [schwab_to_ch_order(o) for o in decode_orders(content, List[schwab_response.Order])]
+
+
+def run(sizes=(3000, 10_000)):
+    print(f"{'orders':>8} {'strptime (ms)':>14} {'native (ms)':>12} {'fallback (ms)':>14}")
+    for n in sizes:
+        standard = generate_payload(n)
+        non_standard = generate_payload(n, "%m/%d/%Y %H:%M:%S")
+
+        start = time.perf_counter()
+        decode_with_strptime(standard)
+        strptime_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        decode_native(standard)
+        native_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        decode_native(non_standard)
+        fallback_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{n:>8} {strptime_ms:>14.1f} {native_ms:>12.1f} {fallback_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+"""
+Benchmark for find_order_minimum_error on synthetic rebalance baskets.
+
+Each symbol gets a random share price and target position value, with the options being the position values
+from rounding the share count down or up. The capital cap sits below the nearest-share rounding, so the cap
+always binds and some symbols have to be rounded down further than their nearest option.
+
+Run with:
+    uv run python -m benchmarks.bench_order_solver
+"""
+import math
+import random
+import time
+from typing import Dict, Tuple
+
+from clearinghouse.utils.orders_utils import find_order_minimum_error
+
+
+def generate_basket(n: int, seed: int = 0) -> Tuple[Dict[str, Tuple[float, Tuple[float, ...]]], float]:
+    rng = random.Random(seed)
+    order_options = {}
+    for i in range(n):
+        price = round(rng.uniform(5, 500), 2)
+        target = round(rng.uniform(1_000, 20_000), 2)
+        shares = math.floor(target / price)
+        order_options[f"S{i}"] = (target, (shares * price, (shares + 1) * price))
+    # Halfway between rounding everything down and rounding to the nearest share, so the cap always binds
+    nearest = sum(min(opts, key=lambda o: abs(target - o)) for target, opts in order_options.values())
+    floor = sum(opts[0] for _, opts in order_options.values())
+    return order_options, (nearest + floor) / 2
+
+
+def sse(order_options, choice) -> float:
+    return sum((order_options[k][0] - order_options[k][1][idx]) ** 2 for k, idx in choice.items())
+
+
+def run(sizes=(10, 25, 50, 100, 200, 500, 1000), repeat: int = 3, relative_gap: float = 0.01):
+    print(f"{'symbols':>8} {'exact (ms)':>12} {'approx (ms)':>12} {'approx/exact SSE':>18}")
+    print(f"{'':>8} {'':>12} {'gap=' + str(relative_gap):>12}")
+    for n in sizes:
+        order_options, capital_cap = generate_basket(n)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            exact = find_order_minimum_error(order_options, capital_cap)
+        exact_ms = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            approx = find_order_minimum_error(order_options, capital_cap, relative_gap=relative_gap)
+        approx_ms = (time.perf_counter() - start) / repeat * 1000
+
+        ratio = sse(order_options, approx) / sse(order_options, exact) if exact else float('nan')
+        print(f"{n:>8} {exact_ms:>12.2f} {approx_ms:>12.2f} {ratio:>18.6f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,46 @@
+"""
+Benchmark for plan_rebalance on synthetic target portfolios, from an empty account and from one already holding
+about half of the symbols near their targets.
+
+Run with:
+    uv run python -m benchmarks.bench_rebalance
+"""
+import random
+import time
+
+from clearinghouse.models.request import FractionalOrder
+from clearinghouse.utils.orders_utils import plan_rebalance
+
+ACCOUNT_VALUE = 1_000_000
+
+
+def generate_portfolio(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    weights = [rng.uniform(0.5, 1.5) for _ in range(n)]
+    total = sum(weights)
+    targets = [FractionalOrder(symbol=f"S{i}", fraction=w / total) for i, w in enumerate(weights)]
+    prices = {f"S{i}": round(rng.uniform(5, 800), 2) for i in range(n)}
+    held = {
+        o.symbol: round(o.fraction * ACCOUNT_VALUE / prices[o.symbol] * rng.uniform(0.8, 1.2))
+        for o in targets[::2]
+    }
+    return targets, prices, held
+
+
+def run(sizes=(10, 50, 100, 250, 500, 1000), repeat: int = 3):
+    print(f"{'symbols':>8} {'from cash (ms)':>15} {'orders':>7} {'from held (ms)':>15} {'orders':>7}")
+    for n in sizes:
+        targets, prices, held = generate_portfolio(n)
+        row = [f"{n:>8}"]
+        for current in ({}, held):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                orders = plan_rebalance(targets, current, prices, ACCOUNT_VALUE)
+                best = min(best, time.perf_counter() - start)
+            row.append(f"{best * 1000:>15.1f} {len(orders):>7}")
+        print(" ".join(row))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,81 @@
+"""
+Benchmark for mapping decoded Schwab orders into clearinghouse orders, comparing the pydantic StandardOrder model
+(validated on every row) with the StandardOrder Struct used by the services. Model construction is also timed on
+its own, without the rest of the mapping.
+
+Run with:
+    uv run python -m benchmarks.bench_response_mapping
+"""
+import copy
+import time
+from typing import List
+
+import msgspec
+
+import clearinghouse.data.sample_data as sample_data
+import clearinghouse.models.response as response
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.services.orders_service import schwab_to_ch_order
+
+
+def generate_orders(n: int = 10_000) -> List[schwab_response.Order]:
+    raw = []
+    for i in range(n):
+        order = copy.deepcopy(sample_data.ACCOUNT_ORDERS_ALL[0])
+        order.update(orderId=i, quantity=float(i % 50 + 1), filledQuantity=float(i % 2), price=100.0 + i % 7)
+        raw.append(order)
+    return msgspec.json.decode(msgspec.json.encode(raw), type=List[schwab_response.Order])
+
+
+def schwab_to_pydantic_order(order: schwab_response.Order) -> response.StandardOrder:
+    """
+    The mapping into the pydantic model, kept here as the baseline.
+    """
+    return response.StandardOrder(
+        order_id=order.order_id,
+        is_filled=(order.filled_quantity == order.quantity),
+        total=order.price * order.quantity,
+        duration=order.duration,
+        order_type=order.order_type,
+        price=order.price,
+        quantity=order.quantity,
+        filled_quantity=order.filled_quantity,
+        remaining_quantity=order.remaining_quantity,
+        status=order.status,
+        entered_time=order.entered_time,
+        cancel_time=order.cancel_time,
+        session=order.session,
+        cancelable=order.cancelable,
+        symbols=[leg.instrument.symbol for leg in order.order_leg_collection],
+    )
+
+
+def run(n: int = 10_000):
+    orders = generate_orders(n)
+    structs = [schwab_to_ch_order(o) for o in orders]
+    fields = [{f: getattr(s, f) for f in s.__struct_fields__} for s in structs]
+
+    start = time.perf_counter()
+    [response.StandardOrder(**kwargs) for kwargs in fields]
+    pydantic_build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    [type(structs[0])(**kwargs) for kwargs in fields]
+    struct_build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    [schwab_to_pydantic_order(o) for o in orders]
+    pydantic_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    [schwab_to_ch_order(o) for o in orders]
+    struct_ms = (time.perf_counter() - start) * 1000
+
+    print(f"building {n} orders: pydantic {pydantic_build_ms:.1f} ms, struct {struct_build_ms:.1f} ms "
+          f"({pydantic_build_ms / struct_build_ms:.1f}x)")
+    print(f"mapping {n} orders: pydantic {pydantic_ms:.1f} ms, struct {struct_ms:.1f} ms "
+          f"({pydantic_ms / struct_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,64 @@
+"""
+Benchmark for serializing an orders list response through FastAPI's response_model path (validate, then dump)
+versus encoding the StandardOrder Structs returned by the services straight to bytes with msgspec.
+
+Run with:
+    uv run python -m benchmarks.bench_response_serialization
+"""
+import datetime
+import time
+
+from pydantic import TypeAdapter
+
+import clearinghouse.models.response as response_models
+from clearinghouse.models.response import GenericCollectionResponse
+from clearinghouse.models.response_structs import StandardOrder
+from clearinghouse.services.response_generation import encode_generic_response, generate_generic_response
+
+
+def generate_orders(n: int = 3000) -> list[StandardOrder]:
+    entered = datetime.datetime(2024, 1, 2, 14, 30, tzinfo=datetime.timezone.utc)
+    return [
+        StandardOrder(
+            order_id=1_000_000 + i,
+            is_filled=i % 3 == 0,
+            total=123.45 * (i % 17 + 1),
+            duration="DAY",
+            order_type="LIMIT",
+            price=123.45,
+            quantity=float(i % 17 + 1),
+            filled_quantity=float(i % 17 + 1) if i % 3 == 0 else 0.0,
+            remaining_quantity=0.0 if i % 3 == 0 else float(i % 17 + 1),
+            status="FILLED" if i % 3 == 0 else "WORKING",
+            entered_time=entered + datetime.timedelta(minutes=i),
+            cancel_time=entered + datetime.timedelta(days=1, minutes=i),
+            session="NORMAL",
+            cancelable=i % 3 != 0,
+        )
+        for i in range(n)
+    ]
+
+
+def run(n: int = 3000, repeat: int = 20):
+    orders = generate_orders(n)
+    models = [response_models.StandardOrder.model_validate(o, from_attributes=True) for o in orders]
+    response = generate_generic_response("OrdersList", models)
+    adapter = TypeAdapter(GenericCollectionResponse[response_models.StandardOrder])
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = adapter.dump_json(adapter.validate_python(response, from_attributes=True))
+    pydantic_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = encode_generic_response(response.meta, orders)
+    msgspec_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    assert encoded == expected
+    print(f"{n} orders: response_model {pydantic_ms:.2f} ms, msgspec {msgspec_ms:.2f} ms "
+          f"({pydantic_ms / msgspec_ms:.1f}x), {len(encoded)} bytes")
+
+
+if __name__ == "__main__":
+    run()
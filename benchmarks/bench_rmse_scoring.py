@@ -0,0 +1,59 @@
+"""
+Benchmark for scoring candidate option choices one at a time with calculate_rmse versus in batches with
+calculate_rmse_batch, and for the local search fallback used when the exact search runs out of branches.
+The fallback is forced here with a tiny branch budget.
+
+Run with:
+    uv run python -m benchmarks.bench_rmse_scoring
+"""
+import time
+
+import numpy as np
+
+from benchmarks.bench_order_solver import generate_basket, sse
+from clearinghouse.utils.math_utils import calculate_rmse, calculate_rmse_batch, pad_options
+from clearinghouse.utils.orders_utils import find_order_minimum_error
+
+
+def run_scoring(symbols: int = 50, batch: int = 10_000):
+    order_options, capital_cap = generate_basket(symbols)
+    targets = np.array([target for target, _ in order_options.values()])
+    options = [opts for _, opts in order_options.values()]
+    option_values = pad_options(options)
+    candidates = np.random.default_rng(0).integers(0, 2, size=(batch, symbols))
+
+    start = time.perf_counter()
+    for row in candidates:
+        pairs = [(targets[k], options[k][idx]) for k, idx in enumerate(row)]
+        if sum(v for _, v in pairs) <= capital_cap:
+            calculate_rmse(pairs)
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    calculate_rmse_batch(targets, option_values, candidates, capital_cap)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"scoring {batch} candidates x {symbols} symbols: loop {loop_ms:.1f} ms, batch {batch_ms:.1f} ms "
+          f"({loop_ms / batch_ms:.0f}x)")
+
+
+def run_fallback(sizes=(50, 100, 200), max_nodes: int = 10):
+    print(f"{'symbols':>8} {'exact (ms)':>12} {'fallback (ms)':>14} {'fallback/exact SSE':>20}")
+    for n in sizes:
+        order_options, capital_cap = generate_basket(n)
+
+        start = time.perf_counter()
+        exact = find_order_minimum_error(order_options, capital_cap, max_nodes=None)
+        exact_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        fallback = find_order_minimum_error(order_options, capital_cap, max_nodes=max_nodes)
+        fallback_ms = (time.perf_counter() - start) * 1000
+
+        ratio = sse(order_options, fallback) / sse(order_options, exact)
+        print(f"{n:>8} {exact_ms:>12.2f} {fallback_ms:>14.2f} {ratio:>20.6f}")
+
+
+if __name__ == "__main__":
+    run_scoring()
+    run_fallback()
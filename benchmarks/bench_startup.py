@@ -0,0 +1,73 @@
+"""
+Benchmark for the startup of the app: the time to import clearinghouse.main in a fresh interpreter, in local and
+production mode, and the time until the app answers a health check while the Schwab service takes a while to start.
+Production mode needs no credentials since services do no I/O until started.
+
+Run with:
+    uv run python -m benchmarks.bench_startup
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from clearinghouse.dependencies import LocalSchwabService
+from clearinghouse.services.startup_service import ServiceStartup
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import clearinghouse.main; print(time.perf_counter() - t)"
+SERVICE_START_DELAY = 0.5
+
+
+def time_import(local_mode: bool, repeat: int) -> float:
+    env = {**os.environ, "SCHWAB_LOCAL_MODE": str(local_mode).lower()}
+    times = [
+        float(subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True).stdout)
+        for _ in range(repeat)
+    ]
+    return statistics.median(times)
+
+
+class SlowStartingService(LocalSchwabService):
+    def __init__(self):
+        super().__init__()
+        self._started.clear()
+
+    def _start(self):
+        time.sleep(SERVICE_START_DELAY)
+        super()._start()
+
+
+async def time_first_response():
+    from clearinghouse import main
+
+    main.schwab_service = SlowStartingService()
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        started_at = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            resp = await client.get("/")
+            first_response = time.perf_counter() - started_at
+            while (await client.get("/")).status_code != 200:
+                await asyncio.sleep(0.01)
+            ready = time.perf_counter() - started_at
+    return resp.json()["status"], first_response, ready
+
+
+def run(repeat: int = 5):
+    print(f"{'mode':>12} {'import (ms)':>12}")
+    for local_mode in (True, False):
+        print(f"{'local' if local_mode else 'production':>12} {time_import(local_mode, repeat) * 1000:>12.1f}")
+
+    status, first_response, ready = asyncio.run(time_first_response())
+    print(f"\nService start taking {SERVICE_START_DELAY * 1000:.0f} ms:")
+    print(f"  first health check answered after {first_response * 1000:.1f} ms ({status})")
+    print(f"  healthy after {ready * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run()
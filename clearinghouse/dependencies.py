@@ -1,13 +1,33 @@
+import asyncio
+import collections
+import copy
 import datetime
-from typing import Optional, List, Dict, Any
+import os
+import itertools
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Deque, Annotated, Callable, Final
 import json
 
+import httpx
 import requests
 import schwabdev
-import schedule
+from fastapi import Header, Request
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 import clearinghouse.data.sample_data as sample_data
+from clearinghouse.utils.cache_utils import CoalescingTTLCache
+from clearinghouse.utils.store_utils import OrderStore, TransactionLedger, QuoteBook
+from clearinghouse.utils.stream_utils import QuoteSource, SchwabQuoteSource, LocalReplayQuoteSource
+from clearinghouse.models.schwab_request import SchwabOrder
+from clearinghouse.exceptions import UnknownAccountException
+from clearinghouse.utils.retry_utils import RetryPolicy
+from clearinghouse.utils.maintenance_utils import Clock, MaintenanceRunner
+from clearinghouse.utils.rate_limit_utils import (
+    OutboundScheduler,
+    DEFAULT_RATE_LIMITS,
+    endpoint_class,
+    endpoint_priority,
+)
 
 
 class SafetySettings(BaseSettings):
@@ -60,6 +80,28 @@ class EnvSettings(BaseSettings):
     schwab_account_number: Optional[str] = None
     schwab_local_mode: Optional[bool] = False
     schwab_read_only_mode: Optional[bool] = False
+    schwab_max_concurrent_orders: Optional[int] = 8
+    schwab_quote_ttl: Optional[float] = 5.0
+    schwab_quote_cache_size: Optional[int] = 1024
+    schwab_account_cache_ttl: Optional[float] = 60.0
+    schwab_max_connections: Optional[int] = 20
+    schwab_order_sync_interval: Optional[float] = 30.0
+    schwab_order_store_size: Optional[int] = 10000
+    schwab_ledger_path: Optional[str] = None
+    schwab_ledger_backfill_days: Optional[int] = 365
+    schwab_transaction_sync_interval: Optional[float] = 300.0
+    schwab_quote_stream: Optional[bool] = False
+    schwab_order_watch_interval: Optional[float] = 1.0
+    schwab_rate_limits: Optional[Dict[str, float]] = None
+    schwab_rate_limit_max_wait: Optional[float] = 10.0
+    schwab_rate_limit_max_queue: Optional[int] = 1000
+    schwab_retry_max_attempts: Optional[int] = 3
+    schwab_retry_base_delay: Optional[float] = 0.5
+    schwab_retry_max_delay: Optional[float] = 8.0
+    schwab_idempotency_ttl: Optional[float] = 86400.0
+    schwab_token_renewal_interval: Optional[float] = 6 * 24 * 3600.0
+    schwab_account_refresh_interval: Optional[float] = 50.0
+    schwab_maintenance_jitter: Optional[float] = 0.1
 
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True)
 
@@ -69,12 +111,41 @@ class SchwabService:
     A service class for managing authentication and token renewal for Schwab accounts.
 
     This class initializes a Schwab client using credentials obtained from environment variables.
-    It schedules automatic renewal of the refresh token every 6 days using the `schedule` library.
+    Construction does no I/O: the client is built on first use and start() resolves the trading account.
+    Once started, the maintenance runner renews the refresh token every 6 days and keeps caches and stores fresh.
 
     Attributes:
         app_key (str): The Schwab app key.
         app_secret (str): The Schwab app secret.
-        client (schwabdev.Client): The Schwab client initialized with app key and secret.
+        client (schwabdev.Client): The Schwab client initialized with app key and secret, built on first use.
+        started (bool): Whether start() has resolved the trading account.
+        async_client (AsyncSchwabClient): Non-blocking client sharing the tokens of `client`.
+        max_concurrent_orders (int): The maximum number of orders submitted to Schwab in parallel.
+        quote_cache (CoalescingTTLCache): Recently fetched quotes keyed by symbol.
+        account_cache (CoalescingTTLCache): Recently fetched account balances keyed by account hash.
+        positions_cache (CoalescingTTLCache): Recently fetched account positions keyed by account hash.
+        order_store (OrderStore): Order history kept up to date by the background order sync.
+        order_sync_interval (float): Seconds between background order syncs, 0 to disable.
+        transaction_ledger (TransactionLedger): SQLite transaction history, in memory unless a ledger path is set.
+        ledger_backfill_days (int): Days of transaction history loaded into an empty ledger.
+        transaction_sync_interval (float): Seconds between background transaction syncs, 0 to disable.
+        quote_book (QuoteBook): Latest streamed quote per symbol, served ahead of the quote cache.
+        quote_stream (bool): Whether to stream quotes into the quote book in the background.
+        quote_source (QuoteSource): Source of the running quote stream, None when not streaming. Shared by the
+            services of every linked account.
+        order_watch_interval (float): Seconds between polls of orders watched for status changes.
+        outbound_scheduler (OutboundScheduler): Rate limits and priorities of every call made through async_client.
+        retry_policy (RetryPolicy): Attempts and backoff for order placement and cancellation.
+        linked_accounts (List[Dict[str, str]]): Account numbers and hashes of every linked account.
+        accounts (SchwabAccountPool): Services of the linked accounts, see for_account.
+        root (SchwabService): Service the linked accounts' services were created from, holding the client and
+            quote source they share. The service itself unless created by for_account.
+        idempotency_cache (CoalescingTTLCache): Results of successfully placed orders keyed by idempotency key.
+        token_renewal_interval (float): Seconds between refresh token renewals, 0 to disable.
+        account_refresh_interval (float): Seconds between background reloads of the account balances, 0 to disable.
+        maintenance_jitter (float): Fraction by which the intervals of the maintenance jobs are randomly varied.
+        clock (Clock): Clock of the maintenance jobs, replaceable by a ManualClock for testing.
+        maintenance (MaintenanceRunner): Runner of the maintenance jobs, None until the service has started.
 
     Methods:
         refresh_token() -> str:
@@ -84,6 +155,9 @@ class SchwabService:
             Forces the renewal of tokens, updating both access and refresh tokens.
     """
 
+    # Requests per minute by endpoint class, used when no rate limits are configured
+    default_rate_limits: Dict[str, float] = DEFAULT_RATE_LIMITS
+
     def __init__(self, env_settings: EnvSettings):
         self.app_key = env_settings.schwab_app_key
         self.app_secret = env_settings.schwab_app_secret
@@ -91,14 +165,108 @@ class SchwabService:
         self.account_number = env_settings.schwab_account_number
         self.local_mode = env_settings.schwab_local_mode
         self.read_only_mode = env_settings.schwab_read_only_mode
+        self.max_concurrent_orders = env_settings.schwab_max_concurrent_orders
+        self.max_connections = env_settings.schwab_max_connections
         self.account_hash: str = ""
+        self.linked_accounts: List[Dict[str, str]] = []
+        self.ledger_path = env_settings.schwab_ledger_path
+
+        self.quote_cache = CoalescingTTLCache(
+            maxsize=env_settings.schwab_quote_cache_size,
+            ttl=env_settings.schwab_quote_ttl,
+        )
+        self.account_cache = CoalescingTTLCache(maxsize=16, ttl=env_settings.schwab_account_cache_ttl)
+        self.positions_cache = CoalescingTTLCache(maxsize=16, ttl=env_settings.schwab_account_cache_ttl)
+        self.order_store = OrderStore(maxsize=env_settings.schwab_order_store_size)
+        self.order_sync_lock = asyncio.Lock()
+        self.order_sync_interval = env_settings.schwab_order_sync_interval
+        self.transaction_ledger = TransactionLedger(self.ledger_path or ":memory:")
+        self.transaction_sync_lock = asyncio.Lock()
+        self.ledger_backfill_days = env_settings.schwab_ledger_backfill_days
+        self.transaction_sync_interval = env_settings.schwab_transaction_sync_interval
+        self.quote_book = QuoteBook()
+        self.quote_stream = env_settings.schwab_quote_stream
+        self.order_watch_interval = env_settings.schwab_order_watch_interval
+        self.outbound_scheduler = OutboundScheduler(
+            limits=env_settings.schwab_rate_limits if env_settings.schwab_rate_limits is not None
+            else self.default_rate_limits,
+            max_wait=env_settings.schwab_rate_limit_max_wait,
+            max_queue=env_settings.schwab_rate_limit_max_queue,
+        )
+        self.retry_policy = RetryPolicy(
+            max_attempts=env_settings.schwab_retry_max_attempts,
+            base_delay=env_settings.schwab_retry_base_delay,
+            max_delay=env_settings.schwab_retry_max_delay,
+        )
+        self.idempotency_cache = CoalescingTTLCache(maxsize=10000, ttl=env_settings.schwab_idempotency_ttl)
+        self.token_renewal_interval = env_settings.schwab_token_renewal_interval
+        self.account_refresh_interval = env_settings.schwab_account_refresh_interval
+        self.maintenance_jitter = env_settings.schwab_maintenance_jitter
+        self.clock = Clock()
+        self.maintenance: Optional[MaintenanceRunner] = None
 
         self._cache = {}
+        self._client: Optional[schwabdev.Client] = None
+        self._quote_source: Optional[QuoteSource] = None
+        self._started = asyncio.Event()
+        self.root = self
+        self.accounts = SchwabAccountPool(self)
+
+    @property
+    def client(self) -> schwabdev.Client:
+        """
+        Blocking Schwab client, built on first use since it loads (and may refresh) the tokens.
+        """
+        # Kept on the root so that services of linked accounts use the client even if built or swapped later
+        root = self.root
+        if root._client is None:
+            root._client = root._schwab_client()
+        return root._client
+
+    @client.setter
+    def client(self, client: schwabdev.Client):
+        self.root._client = client
+
+    @property
+    def quote_source(self) -> Optional[QuoteSource]:
+        return self.root._quote_source
+
+    @quote_source.setter
+    def quote_source(self, quote_source: Optional[QuoteSource]):
+        self.root._quote_source = quote_source
+
+    @property
+    def started(self) -> bool:
+        return self.root._started.is_set()
 
-        self.client = self._schwab_client()
+    async def start(self):
+        """
+        Build the Schwab client and resolve the trading account. Both block on Schwab, so they run in a thread and
+        the app can start serving (e.g. health checks) in the meantime. Requests needing the account wait for this
+        through wait_started().
+        """
+        await asyncio.to_thread(self._start)
+        self._started.set()
+
+    def _start(self):
         self.set_default_trading_account()
 
-        schedule.every(6).days.do(self._renew_refresh_token)
+    async def wait_started(self):
+        await self.root._started.wait()
+
+    def reset_async_state(self):
+        """
+        Create the asyncio event and locks of the service and of its linked accounts for the running event loop,
+        keeping whether the service has started. They bind to the first loop that waits on them, so each app
+        lifespan, which may run on a new loop, resets them before serving.
+        """
+        started = self.started
+        self._started = asyncio.Event()
+        if started:
+            self._started.set()
+        for service in [self, *self.accounts._services.values()]:
+            service.order_sync_lock = asyncio.Lock()
+            service.transaction_sync_lock = asyncio.Lock()
 
     def _schwab_client(self) -> schwabdev.Client:
         # TODO: add a call_on_notify
@@ -109,11 +277,35 @@ class SchwabService:
             )
         return self._cache["schwab_client"]
 
+    @property
+    def async_client(self) -> "AsyncSchwabClient":
+        return ScheduledSchwabClient(self._async_schwab_client(), self.outbound_scheduler)
+
+    def _async_schwab_client(self) -> "AsyncSchwabClient":
+        if not self._cache.get("async_schwab_client"):
+            self._cache["async_schwab_client"] = AsyncSchwabClient(
+                tokens=self.client.tokens,
+                max_connections=self.max_connections,
+            )
+        return self._cache["async_schwab_client"]
+
+    def create_quote_source(self) -> QuoteSource:
+        return SchwabQuoteSource(self.client)
+
+    async def aclose(self):
+        """
+        Close the pooled connections of the async client, if one was created.
+        """
+        async_client = self._cache.pop("async_schwab_client", None)
+        if async_client is not None:
+            await async_client.aclose()
+
     def set_default_trading_account(self, account_number: Optional[str] = None):
         """
         If no account ID provided, use the first that is returned from the Schwab API
         """
         account_info: List[Dict[str, str]] = self.client.account_linked().json()
+        self.linked_accounts = account_info
         if self.use_default_trading_account:
             if not account_info:
                 raise ValueError("No accounts linked. Check Schwab developer portal.")
@@ -128,7 +320,37 @@ class SchwabService:
             if not matching_account_info:
                 raise ValueError("No linked account matches provided account number.")
 
-            self.account_hash = matching_account_info[0]["accountHash"]
+            self.account_hash = matching_account_info[0]["hashValue"]
+
+    def for_account(self, account_number: str, account_hash: str) -> "SchwabService":
+        """
+        Service for another linked account. It shares this service's clients and their connection pool, outbound
+        scheduler, quote cache, quote book, quote source and idempotency cache, and has its own account balances
+        and positions caches, order store and transaction ledger. Its orders and transactions are synced by the
+        maintenance runner of this service, see services.maintenance_service.
+
+        :param account_number: Number of the account
+        :param account_hash: Hash of the account used in Schwab API calls
+        :return: Service for the account
+        """
+        service = copy.copy(self)
+        service.account_number = account_number
+        service.account_hash = account_hash
+        service.account_cache = CoalescingTTLCache(maxsize=self.account_cache.maxsize, ttl=self.account_cache.ttl)
+        service.positions_cache = CoalescingTTLCache(
+            maxsize=self.positions_cache.maxsize, ttl=self.positions_cache.ttl)
+        service.order_store = OrderStore(maxsize=self.order_store.maxsize)
+        service.order_sync_lock = asyncio.Lock()
+        service.transaction_ledger = TransactionLedger(self._account_ledger_path(account_number))
+        service.transaction_sync_lock = asyncio.Lock()
+        service.maintenance = None
+        return service
+
+    def _account_ledger_path(self, account_number: str) -> str:
+        if not self.ledger_path:
+            return ":memory:"
+        root, ext = os.path.splitext(self.ledger_path)
+        return f"{root}-{account_number}{ext}"
 
     def refresh_token(self) -> str:
         """
@@ -144,6 +366,80 @@ class SchwabService:
         return self.client.tokens.update_tokens(force_refresh_token=True)
 
 
+class SchwabAccountPool:
+    """
+    Services of every linked account of a Schwab service, so that one process serves all of them. Accounts are
+    resolved from the single account_linked() call made when the service starts, and each account's service is
+    created on first use, see SchwabService.for_account. The service's own account is served by the service itself.
+    """
+
+    def __init__(self, schwab_service: SchwabService):
+        self.schwab_service = schwab_service
+        self._services: Dict[str, SchwabService] = {}
+
+    def _hashes(self) -> Dict[str, str]:
+        return {acc["accountNumber"]: acc["hashValue"] for acc in self.schwab_service.linked_accounts}
+
+    @property
+    def account_numbers(self) -> List[str]:
+        return list(self._hashes())
+
+    def get(self, account: Optional[str] = None) -> SchwabService:
+        """
+        :param account: Number or hash of a linked account, None for the service's own account
+        :return: Service for the account
+        :raises UnknownAccountException: If no linked account has that number or hash
+        """
+        root = self.schwab_service
+        if account is None or account in (root.account_number, root.account_hash):
+            return root
+
+        hashes = self._hashes()
+        if account in hashes:
+            account_number, account_hash = account, hashes[account]
+        else:
+            numbers = {h: n for n, h in hashes.items()}
+            if account not in numbers:
+                raise UnknownAccountException(account)
+            account_number, account_hash = numbers[account], account
+
+        service = self._services.get(account_hash)
+        if service is None:
+            service = self._services[account_hash] = root.for_account(account_number, account_hash)
+        return service
+
+    def all(self) -> List[SchwabService]:
+        """
+        :return: Services of every linked account, the service's own account first
+        """
+        root = self.schwab_service
+        return [root] + [self.get(n) for n in self.account_numbers if n != root.account_number]
+
+    def __len__(self) -> int:
+        return len(self.schwab_service.linked_accounts)
+
+
+# Header naming the account (number or hash) a request is for, when not given in the path
+ACCOUNT_HEADER: Final = "X-Schwab-Account"
+
+
+def route_account(schwab_service: SchwabService) -> Callable[..., SchwabService]:
+    """
+    Router dependency resolving the service of the account a request is for: the account path parameter if the
+    route has one, else the X-Schwab-Account header, else the service's own account.
+
+    :param schwab_service: Service whose linked accounts requests are routed to
+    :return: Dependency returning the account's service
+    """
+    def dependency(
+        request: Request,
+        x_schwab_account: Annotated[Optional[str], Header(alias=ACCOUNT_HEADER)] = None,
+    ) -> SchwabService:
+        return schwab_service.accounts.get(request.path_params.get("account") or x_schwab_account)
+
+    return dependency
+
+
 class LocalSchwabClient(schwabdev.Client):
     """
     A local-only client that aims to be used for integration testing and does
@@ -164,10 +460,10 @@ class LocalSchwabClient(schwabdev.Client):
         return resp
 
     def account_linked(self) -> requests.Response:
-        data = {
+        data = [{
             "accountNumber": "1234",
             "hashValue": "abcde",
-        }
+        }]
         return self._generate_response(data)
 
     def account_details_all(self, fields: str = None) -> requests.Response:
@@ -212,15 +508,312 @@ class LocalSchwabClient(schwabdev.Client):
         return self._generate_response(sample_data.TRANSACTION_DETAILS)
 
 
+@dataclass
+class Fault:
+    """
+    Failure injected into a call of FaultInjectingSchwabClient.
+
+    Attributes:
+        status_code (int): Status of the failed response, ignored if error is set.
+        error (Exception): Raised instead of responding.
+        applied (bool): Whether the call still takes effect, like an order accepted by Schwab whose response was lost.
+        retry_after (float): Seconds sent in the Retry-After header.
+    """
+    status_code: int = 503
+    error: Optional[Exception] = None
+    applied: bool = False
+    retry_after: Optional[float] = None
+
+
+class FaultInjectingSchwabClient(LocalSchwabClient):
+    """
+    Local client that fails calls with injected faults, for testing retries. Placed orders are kept and listed by
+    account_orders along with the sample orders, so that submissions can be checked like on Schwab.
+    """
+    def __init__(self):
+        super().__init__()
+        self.faults: Dict[str, Deque[Fault]] = collections.defaultdict(collections.deque)
+        self.calls: collections.Counter = collections.Counter()
+        self.placed_orders: List[Dict[str, Any]] = []
+        self._order_ids = itertools.count(1)
+
+    def inject(self, method: str, *faults: Fault):
+        """
+        Fail the next calls of a method, one call per fault in the given order.
+
+        :param method: Client method name
+        :param faults: Faults for the next calls
+        """
+        self.faults[method].extend(faults)
+
+    def _fail(self, method: str, fault: Fault) -> requests.Response:
+        if fault.error is not None:
+            raise fault.error
+        resp = self._generate_response({"message": f"Injected {method} failure"}, status_code=fault.status_code)
+        if fault.retry_after is not None:
+            resp.headers["Retry-After"] = str(fault.retry_after)
+        return resp
+
+    def _next_fault(self, method: str) -> Optional[Fault]:
+        self.calls[method] += 1
+        return self.faults[method].popleft() if self.faults[method] else None
+
+    def order_place(self, accountHash: str, order: dict) -> requests.Response:
+        fault = self._next_fault("order_place")
+        order_id = self._record_order(order) if fault is None or fault.applied else None
+        if fault is not None:
+            return self._fail("order_place", fault)
+        resp = super().order_place(accountHash, order)
+        resp.headers["Location"] = f"/trader/v1/accounts/{accountHash}/orders/{order_id}"
+        return resp
+
+    def order_cancel(self, accountHash: str, orderId: int | str) -> requests.Response:
+        fault = self._next_fault("order_cancel")
+        if fault is not None:
+            return self._fail("order_cancel", fault)
+        return super().order_cancel(accountHash, orderId)
+
+    def account_orders(self, accountHash: str, fromEnteredTime: datetime.datetime | str, toEnteredTime: datetime.datetime | str, maxResults: int = None, status: str = None) -> requests.Response:
+        fault = self._next_fault("account_orders")
+        if fault is not None:
+            return self._fail("account_orders", fault)
+        return self._generate_response(sample_data.ACCOUNT_ORDERS_ALL + self.placed_orders)
+
+    def _record_order(self, order: dict) -> int:
+        order_id = next(self._order_ids)
+        schwab_order = SchwabOrder.model_validate({k: v for k, v in order.items() if v is not None})
+        quantity = sum(leg.quantity for leg in schwab_order.order_leg_collection)
+        self.placed_orders.append({
+            "session": schwab_order.session,
+            "duration": schwab_order.duration,
+            "orderType": schwab_order.order_type,
+            "complexOrderStrategyType": "NONE",
+            "quantity": quantity,
+            "filledQuantity": 0.0,
+            "remainingQuantity": quantity,
+            "requestedDestination": "AUTO",
+            "destinationLinkName": "AUTO",
+            "price": schwab_order.price or 0.0,
+            "orderLegCollection": [
+                {
+                    "orderLegType": leg.instrument.asset_type,
+                    "legId": leg_id,
+                    "instrument": {"assetType": leg.instrument.asset_type, "symbol": leg.instrument.symbol},
+                    "instruction": leg.instruction,
+                    "positionEffect": "OPENING",
+                    "quantity": leg.quantity,
+                }
+                for leg_id, leg in enumerate(schwab_order.order_leg_collection, 1)
+            ],
+            "orderStrategyType": schwab_order.order_strategy_type,
+            "orderId": order_id,
+            "cancelable": True,
+            "editable": True,
+            "status": "WORKING",
+            "enteredTime": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "accountNumber": "1234",
+        })
+        return order_id
+
+
+class AsyncSchwabClient:
+    """
+    Non-blocking Schwab API client with the same method surface as LocalSchwabClient.
+
+    Requests go through a pooled httpx.AsyncClient so connections are kept alive between calls.
+    Authentication reuses the tokens managed by the synchronous schwabdev client, which keeps refreshing
+    the access token in the background.
+    """
+    _base_api_url = "https://api.schwabapi.com"
+
+    def __init__(
+        self,
+        tokens: Any,
+        max_connections: int = 20,
+        timeout: float = 10,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._tokens = tokens
+        self._http = httpx.AsyncClient(
+            base_url=self._base_api_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    @staticmethod
+    def _time_convert(dt: datetime.datetime | str | None) -> str | None:
+        if isinstance(dt, datetime.datetime):
+            return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        return dt
+
+    @staticmethod
+    def _format_list(values: list[str] | str | None) -> str | None:
+        return ",".join(values) if isinstance(values, list) else values
+
+    async def _request(self, method: str, url: str, params: Dict[str, Any] = None, json: Any = None) -> httpx.Response:
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        headers = {"Authorization": f"Bearer {self._tokens.access_token}"}
+        return await self._http.request(method, url, params=params, json=json, headers=headers)
+
+    async def account_linked(self) -> httpx.Response:
+        return await self._request("GET", "/trader/v1/accounts/accountNumbers")
+
+    async def account_details_all(self, fields: str = None) -> httpx.Response:
+        return await self._request("GET", "/trader/v1/accounts/", params={"fields": fields})
+
+    async def account_details(self, accountHash: str, fields: str = None) -> httpx.Response:
+        return await self._request("GET", f"/trader/v1/accounts/{accountHash}", params={"fields": fields})
+
+    async def account_orders(self, accountHash: str, fromEnteredTime: datetime.datetime | str, toEnteredTime: datetime.datetime | str, maxResults: int = None, status: str = None) -> httpx.Response:
+        return await self._request("GET", f"/trader/v1/accounts/{accountHash}/orders", params={
+            "fromEnteredTime": self._time_convert(fromEnteredTime),
+            "toEnteredTime": self._time_convert(toEnteredTime),
+            "maxResults": maxResults,
+            "status": status,
+        })
+
+    async def order_details(self, accountHash: str, orderId: int | str) -> httpx.Response:
+        return await self._request("GET", f"/trader/v1/accounts/{accountHash}/orders/{orderId}")
+
+    async def order_place(self, accountHash: str, order: dict) -> httpx.Response:
+        return await self._request("POST", f"/trader/v1/accounts/{accountHash}/orders", json=order)
+
+    async def order_cancel(self, accountHash: str, orderId: int | str) -> httpx.Response:
+        return await self._request("DELETE", f"/trader/v1/accounts/{accountHash}/orders/{orderId}")
+
+    async def order_replace(self, accountHash: str, orderId: int | str, order: dict) -> httpx.Response:
+        return await self._request("PUT", f"/trader/v1/accounts/{accountHash}/orders/{orderId}", json=order)
+
+    async def account_orders_all(self, fromEnteredTime: datetime.datetime | str, toEnteredTime: datetime.datetime | str, maxResults: int = None, status: str = None) -> httpx.Response:
+        return await self._request("GET", "/trader/v1/orders", params={
+            "fromEnteredTime": self._time_convert(fromEnteredTime),
+            "toEnteredTime": self._time_convert(toEnteredTime),
+            "maxResults": maxResults,
+            "status": status,
+        })
+
+    async def transactions(self, accountHash: str, startDate: datetime.datetime | str, endDate: datetime.datetime | str, types: str, symbol: str = None) -> httpx.Response:
+        return await self._request("GET", f"/trader/v1/accounts/{accountHash}/transactions", params={
+            "startDate": self._time_convert(startDate),
+            "endDate": self._time_convert(endDate),
+            "types": self._format_list(types),
+            "symbol": symbol,
+        })
+
+    async def quotes(self, symbols: list[str] | str, fields: str = None, indicative: bool = False) -> httpx.Response:
+        return await self._request("GET", "/marketdata/v1/quotes", params={
+            "symbols": self._format_list(symbols),
+            "fields": fields,
+            "indicative": indicative,
+        })
+
+    async def quote(self, symbol_id: str, fields: str = None) -> httpx.Response:
+        return await self._request("GET", f"/marketdata/v1/{symbol_id}/quotes", params={"fields": fields})
+
+    async def transaction_details(self, accountHash: str, transactionId: str | int) -> httpx.Response:
+        return await self._request("GET", f"/trader/v1/accounts/{accountHash}/transactions/{transactionId}")
+
+
+class AsyncLocalSchwabClient(AsyncSchwabClient):
+    """
+    Async stand-in for AsyncSchwabClient that runs each call of a synchronous client (normally a
+    LocalSchwabClient) in a worker thread. Used for local mode and testing.
+    """
+    def __init__(self, client: schwabdev.Client):
+        self._client = client
+
+    async def aclose(self):
+        pass
+
+    async def _call(self, method: str, *args, **kwargs) -> requests.Response:
+        return await asyncio.to_thread(getattr(self._client, method), *args, **kwargs)
+
+    async def account_linked(self) -> requests.Response:
+        return await self._call("account_linked")
+
+    async def account_details_all(self, fields: str = None) -> requests.Response:
+        return await self._call("account_details_all", fields=fields)
+
+    async def account_details(self, accountHash: str, fields: str = None) -> requests.Response:
+        return await self._call("account_details", accountHash=accountHash, fields=fields)
+
+    async def account_orders(self, accountHash: str, fromEnteredTime: datetime.datetime | str, toEnteredTime: datetime.datetime | str, maxResults: int = None, status: str = None) -> requests.Response:
+        return await self._call("account_orders", accountHash=accountHash, fromEnteredTime=fromEnteredTime,
+                                toEnteredTime=toEnteredTime, maxResults=maxResults, status=status)
+
+    async def order_details(self, accountHash: str, orderId: int | str) -> requests.Response:
+        return await self._call("order_details", accountHash=accountHash, orderId=orderId)
+
+    async def order_place(self, accountHash: str, order: dict) -> requests.Response:
+        return await self._call("order_place", accountHash=accountHash, order=order)
+
+    async def order_cancel(self, accountHash: str, orderId: int | str) -> requests.Response:
+        return await self._call("order_cancel", accountHash=accountHash, orderId=orderId)
+
+    async def order_replace(self, accountHash: str, orderId: int | str, order: dict) -> requests.Response:
+        return await self._call("order_replace", accountHash=accountHash, orderId=orderId, order=order)
+
+    async def account_orders_all(self, fromEnteredTime: datetime.datetime | str, toEnteredTime: datetime.datetime | str, maxResults: int = None, status: str = None) -> requests.Response:
+        return await self._call("account_orders_all", fromEnteredTime=fromEnteredTime, toEnteredTime=toEnteredTime,
+                                maxResults=maxResults, status=status)
+
+    async def transactions(self, accountHash: str, startDate: datetime.datetime | str, endDate: datetime.datetime | str, types: str, symbol: str = None) -> requests.Response:
+        return await self._call("transactions", accountHash=accountHash, startDate=startDate, endDate=endDate,
+                                types=types, symbol=symbol)
+
+    async def quotes(self, symbols: list[str] | str, fields: str = None, indicative: bool = False) -> requests.Response:
+        return await self._call("quotes", symbols, fields=fields, indicative=indicative)
+
+    async def quote(self, symbol_id: str, fields: str = None) -> requests.Response:
+        return await self._call("quote", symbol_id, fields=fields)
+
+    async def transaction_details(self, accountHash: str, transactionId: str | int) -> requests.Response:
+        return await self._call("transaction_details", accountHash=accountHash, transactionId=transactionId)
+
+
+class ScheduledSchwabClient:
+    """
+    Routes every Schwab API call of an async client through an OutboundScheduler, keeping the client's methods.
+    """
+    def __init__(self, client: AsyncSchwabClient, scheduler: OutboundScheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name == "aclose" or not callable(attr):
+            return attr
+
+        async def scheduled(*args, **kwargs):
+            await self._scheduler.acquire(endpoint_class(name), endpoint_priority(name))
+            return await attr(*args, **kwargs)
+
+        return scheduled
+
+
 class LocalSchwabService(SchwabService):
+    # Local calls are free, rate limits only apply when configured
+    default_rate_limits: Dict[str, float] = {}
+
     def __init__(self):
         super().__init__(EnvSettings())
+        # Resolving the local accounts does no I/O, so the service is usable without being started
+        self.set_default_trading_account()
+        self._started.set()
 
     def _schwab_client(self) -> schwabdev.Client:
         return LocalSchwabClient()
 
-    def set_default_trading_account(self, account_number: Optional[str] = None):
-        ...
+    def _async_schwab_client(self) -> AsyncSchwabClient:
+        # Not cached so that it always wraps the current (possibly swapped) local client
+        return AsyncLocalSchwabClient(self.client)
+
+    def create_quote_source(self) -> QuoteSource:
+        return LocalReplayQuoteSource()
 
     def refresh_token(self) -> str:
         return ""
@@ -1,3 +1,5 @@
+import math
+
 from fastapi import HTTPException
 
 class ForbiddenException(HTTPException):
@@ -21,3 +23,37 @@ class FailedOrderException(HTTPException):
     def __init__(self, symbol: str, message: str):
         detail_message = f"Failed to place order for {symbol}: {message}"
         super().__init__(status_code=502, detail=detail_message)
+
+
+class RateLimitedException(HTTPException):
+    """Raised when an outbound Schwab call would wait too long for the rate limits."""
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=429,
+            detail=f"Schwab rate limit reached, retry after {retry_after:.1f}s.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        self.retry_after = retry_after
+
+
+class IdempotencyKeyConflictException(HTTPException):
+    """Raised when an idempotency key is reused for a different order."""
+    def __init__(self, idempotency_key: str):
+        super().__init__(
+            status_code=409, detail=f"Idempotency key {idempotency_key} was already used for a different order.")
+
+
+class ServiceUnavailableException(HTTPException):
+    """Raised when a request arrives before the Schwab service has started."""
+    def __init__(self, detail: str = "Clearinghouse is starting.", retry_after: float = 5):
+        super().__init__(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class UnknownAccountException(HTTPException):
+    """Raised when a request is routed to an account that is not linked."""
+    def __init__(self, account: str):
+        super().__init__(status_code=404, detail=f"No linked account matches {account}.")
@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 
 from .dependencies import SchwabService, LocalSchwabService, EnvSettings, SafetySettings
 from .routers import orders, status
+from .services.startup_service import ServiceStartup
 
 
 env_settings = None
@@ -9,6 +12,9 @@ safety_settings = None
 schwab_service = None
 
 def initialize_services():
+    """
+    Create the services. They do no I/O until started, which the lifespan does in the background.
+    """
     global env_settings, safety_settings, schwab_service
     if env_settings is None or safety_settings is None or schwab_service is None:
         env_settings = EnvSettings()
@@ -20,11 +26,32 @@ def get_global_schwab_service() -> SchwabService:
         initialize_services()
     return schwab_service
 
-app = FastAPI()
-app.include_router(orders.create_order_endpoints(get_global_schwab_service()))
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup = ServiceStartup(get_global_schwab_service())
+    app.state.startup = startup
+    startup.launch()
+    yield
+    await startup.aclose()
+
+app = FastAPI(lifespan=lifespan)
+# Order routes serve the default account under /v1 and any linked account under /v1/accounts/{account}
+order_router = orders.create_order_endpoints(get_global_schwab_service(), prefix="")
+app.include_router(order_router, prefix="/v1")
+app.include_router(order_router, prefix="/v1/accounts/{account}")
 app.include_router(status.create_status_endpoints(get_global_schwab_service()))
 
 @app.get("/")
-async def root():
-    # TODO: return something useful here
-    return {"status": "healthy"}
+async def root(response: Response):
+    """
+    Healthy once the Schwab service has started, degraded while maintenance jobs keep failing,
+    and 503 with the startup status before.
+    """
+    service = get_global_schwab_service()
+    if service.started:
+        maintenance = service.maintenance
+        failing = [name for name in maintenance.jobs if not maintenance.is_healthy(name)] if maintenance else []
+        return {"status": "degraded", "failing_jobs": failing} if failing else {"status": "healthy"}
+    response.status_code = 503
+    startup = getattr(app.state, "startup", None)
+    return startup.readiness() if startup is not None else {"status": "starting"}
@@ -73,9 +73,14 @@ class BaseOrder(BaseModel):
 class NumericalOrder(BaseOrder):
     """
     Standard order representing quantities and options to buy/close/short etc.
+
+    idempotency_key: Client-chosen key of the order. An order submitted again under the key of a
+        successfully placed one is not placed again and gets the original result.
+        A key may only be reused for the same order, otherwise the order is rejected with 409.
     """
     instruction: OrderInstruction
     quantity: float
+    idempotency_key: Optional[str] = None
 
     @model_validator(mode="after")
     def check_entries(self) -> Self:
@@ -102,7 +107,7 @@ class FractionalOrder(BaseOrder):
     @model_validator(mode="before")
     @classmethod
     def to_upper(cls, data):
-        return _to_upper(["fraction", "symbol", "order_type", "duration", "asset_type"], data)
+        return _to_upper(["symbol", "order_type", "duration", "asset_type"], data)
 
 
 class AdjustmentOrder(BaseOrder):
@@ -143,6 +148,7 @@ class OrdersFilter(BaseModel):
     max_results: Optional[int] = None
     status: Optional[OrderStatus] = None
     symbols: Optional[List[str]] = None
+    stream: bool = False
 
     # noinspection PyNestedDecorators
     @model_validator(mode="before")
@@ -157,6 +163,7 @@ class TransactionsFilter(BaseModel):
     end_date: Optional[datetime.datetime] = None
     types: Optional[List[TransactionType]] = None
     symbols: Optional[List[str]] = None
+    stream: bool = False
 
     # noinspection PyNestedDecorators
     @model_validator(mode="before")
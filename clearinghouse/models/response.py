@@ -20,6 +20,7 @@ InitialOrderStatus = Literal["IGNORED", "FAILED", "SUCCEEDED", "PREVIEW"]
 class Meta(BaseModel):
     type: str
     timestamp: datetime.datetime
+    staleness: Optional[float] = None  # seconds since the data was synced from Schwab, None if fetched live
     # request_duration: Optional[datetime.timedelta]  # TODO: implement this via middleware
 
 
@@ -38,6 +39,58 @@ class GenericCollectionResponse(BaseResponse[T]):
     data: List[T]
 
 
+class CacheStats(BaseModel):
+    """
+    Counters for a service cache, used to tune its size and TTL.
+    """
+    hits: int
+    misses: int
+    coalesced: int
+    size: int
+    maxsize: int
+    ttl: float
+
+
+class AccountCacheStats(BaseModel):
+    balances: CacheStats
+    positions: CacheStats
+
+
+class SchedulerStats(BaseModel):
+    """
+    Counters for the outbound Schwab call scheduler, used to tune its rate limits.
+    """
+    queue_depth: Dict[str, int]
+    peak_queue: int
+    granted: int
+    rejected: int
+    waited: float
+    tokens: Dict[str, int]
+
+
+class JobHealth(BaseModel):
+    """
+    Health of a maintenance job, times in UTC and the last duration in seconds.
+    """
+    healthy: bool
+    runs: int
+    failures: int
+    consecutive_failures: int
+    last_run: Optional[datetime.datetime] = None
+    last_success: Optional[datetime.datetime] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run: Optional[datetime.datetime] = None
+
+
+class MaintenanceHealth(BaseModel):
+    """
+    Health of the background maintenance jobs, empty until the service has started.
+    """
+    running: bool
+    jobs: Dict[str, JobHealth]
+
+
 class AccountDetails(BaseModel):
     # omits positions
     current_balances: Dict[str, Any]
@@ -59,9 +112,10 @@ class StandardOrder(BaseModel):
     remaining_quantity: float
     status: str
     entered_time: datetime.datetime
-    cancel_time: datetime.datetime
+    cancel_time: Optional[datetime.datetime] = None
     session: str
     cancelable: bool
+    symbols: List[str] = []  # Instrument symbols of the order legs
 
 class BaseOrderResult(BaseModel):
     """
@@ -84,6 +138,7 @@ class NumericalOrderResult(BaseOrderResult):
     Model representing the return from a place order or similar request.
     """
     instruction: OrderInstruction
+    idempotency_key: Optional[str] = None
 
 
 class FractionalOrderResult(NumericalOrderResult):
@@ -145,4 +200,58 @@ class Position(BaseModel):
     market_value: float
     entry_value: float
     net_change: float
-    account_fraction: float = 0
+    account_fraction: float = 0.0
+
+
+class PortfolioSummary(BaseModel):
+    """
+    Exposure and P&L totals over all positions of the account.
+    """
+    account_value: float
+    positions: int
+    long_exposure: float
+    short_exposure: float
+    net_exposure: float
+    gross_exposure: float
+    unrealized_profit_loss: float
+    day_profit_loss: float
+
+
+class AccountPosition(BaseModel):
+    """
+    Share of one account in a household position. Quantity is signed, negative for a short position.
+    """
+    account_number: str
+    quantity: float
+    market_value: float
+    account_fraction: float
+
+
+class HouseholdPosition(BaseModel):
+    """
+    Position netted over all linked accounts. Quantity is signed, negative for a net short position, and the
+    account fraction is relative to the value of all accounts.
+    """
+    symbol: str
+    asset_type: str
+    quantity: float
+    market_value: float
+    entry_value: float
+    net_change: float
+    account_fraction: float
+    accounts: List[AccountPosition]
+
+
+class AccountBalances(BaseModel):
+    account_number: str
+    current_balances: Dict[str, Any]
+    initial_balances: Dict[str, Any]
+
+
+class HouseholdBook(BaseModel):
+    """
+    Positions and balances of all linked accounts, with the positions netted into one book.
+    """
+    summary: PortfolioSummary
+    balances: List[AccountBalances]
+    positions: List[HouseholdPosition]
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List
+import datetime
+
+import msgspec
+
+"""
+msgspec counterparts of the clearinghouse response models in response.py, used between the Schwab response mapping
+and the API boundary. Field names and order match the pydantic models so both encode to the same JSON.
+The pydantic models remain the response_model of each route for validation of outgoing models and OpenAPI.
+"""
+
+
+class StandardOrder(msgspec.Struct, kw_only=True):
+    order_id: int
+    is_filled: bool
+    total: float
+    duration: str
+    order_type: str
+    price: float
+    quantity: float
+    filled_quantity: float
+    remaining_quantity: float
+    status: str
+    entered_time: datetime.datetime
+    cancel_time: datetime.datetime | None = None
+    session: str
+    cancelable: bool
+    symbols: List[str] = []
+
+
+class Quote(msgspec.Struct, kw_only=True):
+    symbol: str
+    price: float
+    quote_time: datetime.datetime
+    total_volume: int
+    net_percent_change: float
+    bid_price: float
+    ask_price: float
+
+
+class Transaction(msgspec.Struct, kw_only=True):
+    id: int
+    order_id: int
+    time: datetime.datetime
+    type: str
+    status: str
+    net_amount: float
+    trade_date: datetime.datetime
+
+
+class Lot(msgspec.Struct, kw_only=True):
+    acquisition_date: datetime.datetime
+    quantity: float
+    price: float
+
+
+class Position(msgspec.Struct, kw_only=True):
+    symbol: str
+    asset_type: str
+    quantity: float
+    lots: List[Lot]
+    market_value: float
+    entry_value: float
+    net_change: float
+    account_fraction: float = 0.0
+
+
+class PortfolioSummary(msgspec.Struct, kw_only=True):
+    account_value: float
+    positions: int
+    long_exposure: float
+    short_exposure: float
+    net_exposure: float
+    gross_exposure: float
+    unrealized_profit_loss: float
+    day_profit_loss: float
+
+
+class AccountPosition(msgspec.Struct, kw_only=True):
+    account_number: str
+    quantity: float
+    market_value: float
+    account_fraction: float
+
+
+class HouseholdPosition(msgspec.Struct, kw_only=True):
+    symbol: str
+    asset_type: str
+    quantity: float
+    market_value: float
+    entry_value: float
+    net_change: float
+    account_fraction: float
+    accounts: List[AccountPosition]
+
+
+class AccountBalances(msgspec.Struct, kw_only=True):
+    account_number: str
+    current_balances: Dict[str, Any]
+    initial_balances: Dict[str, Any]
+
+
+class HouseholdBook(msgspec.Struct, kw_only=True):
+    summary: PortfolioSummary
+    balances: List[AccountBalances]
+    positions: List[HouseholdPosition]
@@ -182,11 +182,11 @@ class OrderLeg(msgspec.Struct):
     quantity: float
 
 
-class Order(msgspec.Struct):
+class Order(msgspec.Struct, kw_only=True):
     session: str
     duration: str
     order_type: str = msgspec.field(name="orderType")
-    cancel_time: str = msgspec.field(name="cancelTime")
+    cancel_time: datetime | None = msgspec.field(default=None, name="cancelTime")
     complex_order_strategy_type: str = msgspec.field(name="complexOrderStrategyType")
     quantity: float
     filled_quantity: float = msgspec.field(name="filledQuantity")
@@ -200,5 +200,5 @@ class Order(msgspec.Struct):
     cancelable: bool
     editable: bool
     status: str
-    entered_time: str = msgspec.field(name="enteredTime")
+    entered_time: datetime = msgspec.field(name="enteredTime")
     account_number: str = msgspec.field(name="accountNumber")
@@ -1,9 +1,10 @@
-from typing import List, Any, Annotated, Dict
+from typing import List, Any, Annotated, Dict, Optional
 
-from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Header
+from fastapi.responses import StreamingResponse
 from starlette import status
 
-from clearinghouse.dependencies import SchwabService
+from clearinghouse.dependencies import SchwabService, route_account
 from clearinghouse.models.request import (
     NumericalOrder,
     AdjustmentOrder,
@@ -18,77 +19,184 @@ from clearinghouse.models.response import (
     Quote,
     Transaction,
     Position,
+    PortfolioSummary,
     GenericItemResponse,
     GenericCollectionResponse,
     NumericalOrderResult,
 )
-from clearinghouse.services.response_generation import generate_generic_response
+from clearinghouse.services.sync_service import (
+    OrderStatusWatcher,
+    fetch_synced_orders,
+    fetch_ledger_transactions,
+    LEDGER_TRANSACTION_FILTERS,
+)
+from clearinghouse.services.startup_service import require_started
+from clearinghouse.services.response_generation import (
+    generate_generic_response,
+    generate_encoded_response,
+    generate_streaming_response,
+    generate_event_stream_response,
+    NDJSON_MEDIA_TYPE,
+    EVENT_STREAM_MEDIA_TYPE,
+)
 from clearinghouse.services.orders_service import (
     fetch_positions,
     fetch_orders,
+    fetch_positions_snapshot,
+    iter_orders,
     fetch_order_details,
     place_orders,
     cancel_order_request,
     fetch_quotes,
     fetch_transactions,
+    iter_transactions,
     adjust_bulk_positions_fractions,
     fetch_transaction_details,
     filter_orders,
     filter_positions,
     filter_transactions,
+    iter_filter_orders,
+    iter_filter_transactions,
 )
 from clearinghouse.exceptions import ForbiddenException
 
 
-def create_order_endpoints(schwab_service: SchwabService):
-    order_router = APIRouter(prefix="/v1", tags=["orders"])
+STREAMING_RESPONSES = {200: {"content": {NDJSON_MEDIA_TYPE: {}}}}
+
+
+def create_order_endpoints(schwab_service: SchwabService, prefix: str = "/v1"):
+    """
+    :param schwab_service: Service of the default account, requests for its other linked accounts are routed
+        by route_account
+    :param prefix: Path prefix of the routes. Include the router again under a prefix with an {account}
+        parameter to route requests by path.
+    """
+    order_router = APIRouter(
+        prefix=prefix, tags=["orders"], dependencies=[Depends(require_started(schwab_service))])
+    AccountService = Annotated[SchwabService, Depends(route_account(schwab_service))]
+    # One watcher per account, shared by every subscriber to that account's orders
+    order_watchers: Dict[str, OrderStatusWatcher] = {}
 
     @order_router.get(
         "/positions",
         status_code=status.HTTP_200_OK,
         response_model=GenericCollectionResponse[Position]
     )
-    def get_positions(position_filter: Annotated[PositionsFilter, Query()]) -> Any:
+    async def get_positions(
+        schwab_service: AccountService,
+        position_filter: Annotated[PositionsFilter, Query()],
+    ) -> Any:
         # All current filtering is done by clearinghouse and not by the schwab client
-        data = fetch_positions(schwab_service)
+        data = await fetch_positions(schwab_service)
         filtered_data = filter_positions(data, position_filter)
 
-        return generate_generic_response("PositionsList", filtered_data)
+        return generate_encoded_response("PositionsList", filtered_data)
+
+    @order_router.get(
+        "/positions/summary",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[PortfolioSummary]
+    )
+    async def get_positions_summary(schwab_service: AccountService) -> Any:
+        data = (await fetch_positions_snapshot(schwab_service)).summary()
+        return generate_encoded_response("PortfolioSummary", data)
 
     @order_router.get(
         "/orders",
         status_code=status.HTTP_200_OK,
-        response_model=GenericCollectionResponse[StandardOrder]
+        response_model=GenericCollectionResponse[StandardOrder],
+        responses=STREAMING_RESPONSES,
     )
-    def get_orders(orders_filter: Annotated[OrdersFilter, Query()]) -> Any:
-        data = fetch_orders(
+    async def get_orders(
+        schwab_service: AccountService,
+        orders_filter: Annotated[OrdersFilter, Query()],
+        accept: Annotated[str | None, Header()] = None,
+    ) -> Any:
+        """
+        Served from the synced order store when it covers the requested window, in which case meta.staleness is
+        the age of the store in seconds.
+        Set stream=true to send orders as they are mapped, as NDJSON if requested by the Accept header.
+        """
+        # Filtering by symbol happens after fetching, so the result limit is applied after it
+        max_results = orders_filter.max_results if not orders_filter.symbols else None
+        synced = fetch_synced_orders(
+            schwab_service,
+            start_date=orders_filter.start_date,
+            end_date=orders_filter.end_date,
+            max_results=max_results,
+            status=orders_filter.status)
+        staleness = schwab_service.order_store.staleness() if synced is not None else None
+
+        if orders_filter.stream:
+            data = synced if synced is not None else await iter_orders(
+                schwab_service,
+                start_date=orders_filter.start_date,
+                end_date=orders_filter.end_date,
+                max_results=max_results,
+                status=orders_filter.status)
+            return generate_streaming_response(
+                "OrdersList",
+                iter_filter_orders(data, orders_filter),
+                ndjson=NDJSON_MEDIA_TYPE in (accept or ""),
+                staleness=staleness,
+            )
+
+        data = synced if synced is not None else await fetch_orders(
             schwab_service,
             start_date=orders_filter.start_date,
             end_date=orders_filter.end_date,
-            max_results=orders_filter.max_results,
+            max_results=max_results,
             status=orders_filter.status)
         filtered_data = filter_orders(data, orders_filter)
-        return generate_generic_response("OrdersList", filtered_data)
+        return generate_encoded_response("OrdersList", filtered_data, staleness)
+
+    @order_router.get(
+        "/orders/events",
+        status_code=status.HTTP_200_OK,
+        response_class=StreamingResponse,
+        responses={200: {"content": {EVENT_STREAM_MEDIA_TYPE: {}}}},
+    )
+    async def order_events(
+        schwab_service: AccountService,
+        order_ids: Annotated[List[int], Query(min_length=1)],
+    ) -> Any:
+        """
+        Server-sent events with the current state of each order, then every change to it, as StandardOrder data
+        of "OrderDetails" events. The stream ends once every order is in a terminal status.
+        All subscribers share one poller, so each watched order is fetched once per interval.
+        """
+        order_watcher = order_watchers.get(schwab_service.account_hash)
+        if order_watcher is None:
+            order_watcher = order_watchers[schwab_service.account_hash] = OrderStatusWatcher(schwab_service)
+        return generate_event_stream_response("OrderDetails", order_watcher.watch(order_ids))
 
     @order_router.get(
         "/orders/{order_id}",
         status_code=status.HTTP_200_OK,
         response_model=GenericItemResponse[StandardOrder]
     )
-    def order_details(order_id: str) -> Any:
-        data = fetch_order_details(schwab_service, order_id=order_id)
+    async def order_details(schwab_service: AccountService, order_id: str) -> Any:
+        data = await fetch_order_details(schwab_service, order_id=order_id)
 
-        return generate_generic_response("OrderDetails", data)
+        return generate_encoded_response("OrderDetails", data)
 
     @order_router.post(
         "/orders",
         status_code=status.HTTP_201_CREATED,
         response_model=GenericItemResponse[NumericalOrderResult]
     )
-    async def order_placement(order: NumericalOrder | FractionalOrder, response: Response) -> Any:
+    async def order_placement(
+        schwab_service: AccountService,
+        order: NumericalOrder | FractionalOrder,
+        response: Response,
+        idempotency_key: Annotated[Optional[str], Header()] = None,
+    ) -> Any:
         """
         Place a single fractional or numerical order.
+        An Idempotency-Key header applies to a numerical order without an idempotency_key of its own.
         """
+        if idempotency_key and isinstance(order, NumericalOrder) and order.idempotency_key is None:
+            order.idempotency_key = idempotency_key
         results: List[NumericalOrderResult]
         results, _ = await place_orders(schwab_service, [order])
 
@@ -102,7 +210,11 @@ def create_order_endpoints(schwab_service: SchwabService):
         status_code=status.HTTP_201_CREATED,
         response_model=GenericCollectionResponse[NumericalOrderResult]
     )
-    async def order_placement_batch(orders: List[NumericalOrder | FractionalOrder], response: Response) -> Any:
+    async def order_placement_batch(
+        schwab_service: AccountService,
+        orders: List[NumericalOrder | FractionalOrder],
+        response: Response,
+    ) -> Any:
         """
         Place a batch of fractional or numerical orders.
         """
@@ -119,8 +231,8 @@ def create_order_endpoints(schwab_service: SchwabService):
         "/orders/{order_id}",  # Ensure the path parameter matches the function argument
         status_code=status.HTTP_204_NO_CONTENT,
     )
-    def cancel_order(order_id: str) -> None:
-        status_code = cancel_order_request(schwab_service, order_id)
+    async def cancel_order(schwab_service: AccountService, order_id: str) -> None:
+        status_code = await cancel_order_request(schwab_service, order_id)
         if status_code != 200:
             raise HTTPException(
                 status_code=status_code,
@@ -131,46 +243,82 @@ def create_order_endpoints(schwab_service: SchwabService):
         "/transactions",
         status_code=status.HTTP_200_OK,
         response_model=GenericCollectionResponse[Transaction],
+        responses=STREAMING_RESPONSES,
     )
-    def get_transactions(transaction_filter: Annotated[TransactionsFilter, Query(...)]) -> Any:
-        data = fetch_transactions(
+    async def get_transactions(
+        schwab_service: AccountService,
+        transaction_filter: Annotated[TransactionsFilter, Query(...)],
+        accept: Annotated[str | None, Header()] = None,
+    ) -> Any:
+        """
+        Served from the transaction ledger when it covers the requested window, in which case meta.staleness is
+        the age of the ledger in seconds. Filtering by symbols is only supported by the ledger, so with symbols the
+        requested window is synced into the ledger first if it does not cover it yet.
+        Set stream=true to send transactions as they are mapped, as NDJSON if requested by the Accept header.
+        """
+        synced = await fetch_ledger_transactions(
+            schwab_service,
+            start_date=transaction_filter.start_date,
+            end_date=transaction_filter.end_date,
+            types=transaction_filter.types,
+            symbols=transaction_filter.symbols,
+            sync=bool(transaction_filter.symbols),
+        )
+        staleness = schwab_service.transaction_ledger.staleness() if synced is not None else None
+        pushed_down = LEDGER_TRANSACTION_FILTERS if synced is not None else ()
+
+        if transaction_filter.stream:
+            data = synced if synced is not None else await iter_transactions(
+                schwab_service,
+                start_date=transaction_filter.start_date,
+                end_date=transaction_filter.end_date,
+                types=transaction_filter.types
+            )
+            return generate_streaming_response(
+                "TransactionsList",
+                iter_filter_transactions(data, transaction_filter, pushed_down),
+                ndjson=NDJSON_MEDIA_TYPE in (accept or ""),
+                staleness=staleness,
+            )
+
+        data = synced if synced is not None else await fetch_transactions(
             schwab_service,
             start_date=transaction_filter.start_date,
             end_date=transaction_filter.end_date,
             types=transaction_filter.types
         )
 
-        filtered_data = filter_transactions(data, transaction_filter)
-        return generate_generic_response("TransactionsList", filtered_data)
+        filtered_data = filter_transactions(data, transaction_filter, pushed_down)
+        return generate_encoded_response("TransactionsList", filtered_data, staleness)
 
     @order_router.get(
         "/transactions/{transaction_id}",
         status_code=status.HTTP_200_OK,
         response_model=GenericItemResponse[Transaction],
     )
-    def get_transactions_details(transaction_id: str) -> Any:
-        data = fetch_transaction_details(schwab_service, transaction_id)
-        return generate_generic_response("Transaction", data)
+    async def get_transactions_details(schwab_service: AccountService, transaction_id: str) -> Any:
+        data = await fetch_transaction_details(schwab_service, transaction_id)
+        return generate_encoded_response("Transaction", data)
 
     @order_router.get(
         "/quotes/{symbol}",
         status_code=status.HTTP_200_OK,
         response_model=GenericItemResponse[Quote],
     )
-    def get_quote(symbol: str) -> GenericItemResponse[Quote]:
+    async def get_quote(schwab_service: AccountService, symbol: str) -> GenericItemResponse[Quote]:
         # TODO: add parameter for equity vs option
         # TODO: consolidate quotes into query parameter
-        data = fetch_quotes(schwab_service, [symbol])[0]
-        return generate_generic_response("Quote", data)
+        data = (await fetch_quotes(schwab_service, [symbol]))[0]
+        return generate_encoded_response("Quote", data)
 
     @order_router.post(
         "/quotes",
         status_code=status.HTTP_200_OK,
         response_model=GenericCollectionResponse[Quote],
     )
-    def get_bulk_quotes(symbols: List[str]) -> Any:
-        data = fetch_quotes(schwab_service, symbols)
-        return generate_generic_response("QuotesList", data)
+    async def get_bulk_quotes(schwab_service: AccountService, symbols: List[str]) -> Any:
+        data = await fetch_quotes(schwab_service, symbols)
+        return generate_encoded_response("QuotesList", data)
 
     @order_router.post(
         "/adjustments",
@@ -178,6 +326,7 @@ def create_order_endpoints(schwab_service: SchwabService):
         response_model=GenericCollectionResponse[AdjustmentOrderResult],
     )
     async def adjust_position(
+        schwab_service: AccountService,
         symbol_to_fraction: List[AdjustmentOrder], preview: bool=True, response: Response = None
     ) -> GenericCollectionResponse[AdjustmentOrderResult]:
         """
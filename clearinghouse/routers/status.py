@@ -1,36 +1,45 @@
-from typing import Dict, Any
+from typing import Annotated, Dict, Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from starlette import status
 
-from clearinghouse.dependencies import SchwabService
+from clearinghouse.dependencies import SchwabService, route_account
 from clearinghouse.models.response import (
     GenericCollectionResponse,
     GenericItemResponse,
     AccountDetails,
+    CacheStats,
+    AccountCacheStats,
+    SchedulerStats,
+    MaintenanceHealth,
+    HouseholdBook,
 )
-from clearinghouse.services.response_generation import generate_generic_response
+from clearinghouse.services.household_service import fetch_household_book
+from clearinghouse.services.response_generation import generate_generic_response, generate_encoded_response
 from clearinghouse.services.status_service import (
     fetch_account_status,
 )
+from clearinghouse.services.startup_service import require_started
 
 
 def create_status_endpoints(schwab_service: SchwabService):
-    status_router = APIRouter(prefix="/v1", tags=["status"])
+    status_router = APIRouter(
+        prefix="/v1", tags=["status"], dependencies=[Depends(require_started(schwab_service))])
+    AccountService = Annotated[SchwabService, Depends(route_account(schwab_service))]
 
     @status_router.get(
         "/accounts/accountNumbers",
         status_code=status.HTTP_200_OK,
         response_model=GenericCollectionResponse[Dict[str, str]]
     )
-    def get_linked_accounts() -> Any:
+    async def get_linked_accounts() -> Any:
         """
         Mirrors the Schwab API endpoint for retrieving linked and authorized accounts.
         :return:
         """
-        resp = schwab_service.client.account_linked()
+        resp = await schwab_service.async_client.account_linked()
 
-        if not resp.ok:
+        if resp.status_code >= 400:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to retrieve linked accounts from Schwab service."
@@ -63,8 +72,88 @@ def create_status_endpoints(schwab_service: SchwabService):
         status_code=status.HTTP_200_OK,
         response_model=GenericItemResponse[AccountDetails]
     )
-    def get_account_details() -> Any:
-        data = fetch_account_status(schwab_service)
+    async def get_account_details(schwab_service: AccountService) -> Any:
+        """
+        Balances of the default account, or of the account named by the X-Schwab-Account header.
+        """
+        data = await fetch_account_status(schwab_service)
+        return generate_generic_response("AccountDetails", data)
+
+    @status_router.get(
+        "/accounts/{account}",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[AccountDetails]
+    )
+    async def get_linked_account_details(schwab_service: AccountService) -> Any:
+        """
+        Balances of a linked account by account number or hash.
+        """
+        data = await fetch_account_status(schwab_service)
         return generate_generic_response("AccountDetails", data)
 
+    @status_router.get(
+        "/household",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[HouseholdBook]
+    )
+    async def get_household_book() -> Any:
+        """
+        Positions of all linked accounts netted by symbol, with each account's share, and the balances of each
+        account. The accounts are fetched concurrently.
+        """
+        data = await fetch_household_book(schwab_service)
+        return generate_encoded_response("HouseholdBook", data)
+
+    @status_router.get(
+        "/cache/quotes",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[CacheStats]
+    )
+    def get_quote_cache_stats() -> Any:
+        data = CacheStats(**schwab_service.quote_cache.stats())
+        return generate_generic_response("CacheStats", data)
+
+    @status_router.get(
+        "/cache/accounts",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[AccountCacheStats]
+    )
+    def get_account_cache_stats() -> Any:
+        """
+        Counters of the default account's balances and positions caches.
+        """
+        data = AccountCacheStats(
+            balances=CacheStats(**schwab_service.account_cache.stats()),
+            positions=CacheStats(**schwab_service.positions_cache.stats()),
+        )
+        return generate_generic_response("AccountCacheStats", data)
+
+    @status_router.get(
+        "/scheduler",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[SchedulerStats]
+    )
+    def get_scheduler_stats() -> Any:
+        """
+        Queue depth per priority lane and the tokens left in each rate limit of the outbound Schwab calls.
+        """
+        data = SchedulerStats(**schwab_service.outbound_scheduler.stats())
+        return generate_generic_response("SchedulerStats", data)
+
+    @status_router.get(
+        "/maintenance",
+        status_code=status.HTTP_200_OK,
+        response_model=GenericItemResponse[MaintenanceHealth]
+    )
+    def get_maintenance_health() -> Any:
+        """
+        Runs, failures and next run of each background maintenance job (token renewal, warmups, syncs).
+        """
+        maintenance = schwab_service.maintenance
+        data = MaintenanceHealth(
+            running=maintenance is not None and maintenance.running,
+            jobs=maintenance.health() if maintenance is not None else {},
+        )
+        return generate_generic_response("MaintenanceHealth", data)
+
     return status_router
@@ -0,0 +1,85 @@
+from typing import List
+import asyncio
+
+from clearinghouse.dependencies import SchwabService
+from clearinghouse.models.response_structs import (
+    AccountBalances,
+    AccountPosition,
+    HouseholdBook,
+    HouseholdPosition,
+)
+from clearinghouse.services.orders_service import fetch_positions_snapshot
+from clearinghouse.services.status_service import fetch_account_status
+from clearinghouse.utils.portfolio_utils import PositionsSnapshot
+
+"""
+Household view over every linked account of a Schwab service.
+"""
+
+
+async def fetch_household_book(schwab_service: SchwabService) -> HouseholdBook:
+    """
+    Retrieve the positions and balances of all linked accounts, fetched concurrently, and net the positions by
+    symbol into one book with each account's share of every position.
+
+    :param schwab_service: Instantiated Schwab service
+    :return: Netted book, balances and summary of all linked accounts
+    """
+    accounts = schwab_service.accounts.all()
+    # Requested alongside the snapshots, which also load the balances, so the account cache makes one call for both
+    results = await asyncio.gather(
+        *(fetch_positions_snapshot(a) for a in accounts),
+        *(fetch_account_status(a) for a in accounts),
+    )
+    snapshots: List[PositionsSnapshot] = results[:len(accounts)]
+    statuses = results[len(accounts):]
+
+    book = PositionsSnapshot.merge(snapshots)
+    index = {symbol: i for i, symbol in enumerate(book.symbols)}
+    shares: List[List[AccountPosition]] = [[] for _ in range(len(book))]
+    for account, snapshot in zip(accounts, snapshots):
+        for symbol, quantity, market_value, account_fraction in zip(
+            snapshot.symbols,
+            snapshot.quantity.tolist(),
+            snapshot.market_value.tolist(),
+            snapshot.account_fraction.tolist(),
+        ):
+            shares[index[symbol]].append(AccountPosition(
+                account_number=account.account_number,
+                quantity=quantity,
+                market_value=market_value,
+                account_fraction=account_fraction,
+            ))
+
+    positions = [
+        HouseholdPosition(
+            symbol=symbol,
+            asset_type=asset_type,
+            quantity=quantity,
+            market_value=market_value,
+            entry_value=entry_value,
+            net_change=net_change,
+            account_fraction=account_fraction,
+            accounts=accounts_shares,
+        )
+        for symbol, asset_type, quantity, market_value, entry_value, net_change, account_fraction, accounts_shares
+        in zip(
+            book.symbols,
+            book.asset_types,
+            book.quantity.tolist(),
+            book.market_value.tolist(),
+            book.entry_value.tolist(),
+            book.net_change.tolist(),
+            book.account_fraction.tolist(),
+            shares,
+        )
+    ]
+    balances = [
+        AccountBalances(
+            account_number=account.account_number,
+            current_balances=account_status.current_balances,
+            initial_balances=account_status.initial_balances,
+        )
+        for account, account_status in zip(accounts, statuses)
+    ]
+    return HouseholdBook(summary=book.summary(), balances=balances, positions=positions)
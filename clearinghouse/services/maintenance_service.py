@@ -0,0 +1,93 @@
+from typing import List, Optional
+import asyncio
+
+from clearinghouse.dependencies import SchwabService
+from clearinghouse.services.status_service import (
+    fetch_account_status,
+    fetch_account_positions,
+    invalidate_account_state,
+)
+from clearinghouse.services.sync_service import sync_orders, sync_transactions
+from clearinghouse.utils.maintenance_utils import Clock, MaintenanceJob, MaintenanceRunner
+from clearinghouse.utils.rate_limit_utils import background_priority
+
+"""
+Maintenance jobs of the Schwab service: token renewal, cache warmups and the order and transaction syncs of every
+linked account.
+"""
+
+
+async def renew_tokens(schwab_service: SchwabService):
+    # schwabdev renews tokens with blocking requests
+    await asyncio.to_thread(schwab_service._renew_refresh_token)
+
+
+async def refresh_account_status(schwab_service: SchwabService):
+    """
+    Reload the account balances and positions before they expire, so that requests find them cached.
+    """
+    invalidate_account_state(schwab_service)
+    await asyncio.gather(fetch_account_status(schwab_service), fetch_account_positions(schwab_service))
+
+
+def _sync_jobs(schwab_service: SchwabService, jitter: float, suffix: str = "") -> List[MaintenanceJob]:
+    """
+    :param schwab_service: Service of the account to sync
+    :param jitter: Jitter of the jobs
+    :param suffix: Appended to the job names
+    :return: Order and transaction sync jobs of the account
+    """
+    return [
+        MaintenanceJob(
+            f"order_sync{suffix}", lambda: sync_orders(schwab_service), schwab_service.order_sync_interval, jitter),
+        MaintenanceJob(
+            f"transaction_sync{suffix}", lambda: sync_transactions(schwab_service),
+            schwab_service.transaction_sync_interval, jitter,
+        ),
+    ]
+
+
+def maintenance_jobs(schwab_service: SchwabService) -> List[MaintenanceJob]:
+    """
+    The orders and transactions of every other linked account are synced as well, by jobs named after the account
+    (e.g. "order_sync:5678"), so that they are served from their stores too. Each adds its calls to the background
+    lane of the shared outbound scheduler.
+
+    :param schwab_service: Instantiated Schwab service
+    :return: Jobs enabled on the service, those with an interval of 0 are left out
+    """
+    jitter = schwab_service.maintenance_jitter
+    jobs = [
+        # The first renewal is due an interval after start, a failed one is retried within the hour
+        MaintenanceJob(
+            "token_renewal", lambda: renew_tokens(schwab_service), schwab_service.token_renewal_interval,
+            jitter=jitter, retry_interval=3600.0, run_at_start=False,
+        ),
+        MaintenanceJob(
+            "account_status", lambda: refresh_account_status(schwab_service),
+            schwab_service.account_refresh_interval, jitter=jitter, run_at_start=False,
+        ),
+        *_sync_jobs(schwab_service, jitter),
+    ]
+    for account in schwab_service.accounts.all()[1:]:
+        jobs += _sync_jobs(account, jitter, suffix=f":{account.account_number}")
+    return [job for job in jobs if job.interval]
+
+
+def create_maintenance_runner(schwab_service: SchwabService, clock: Optional[Clock] = None) -> MaintenanceRunner:
+    """
+    :param schwab_service: Instantiated Schwab service
+    :param clock: Clock of the runner, the real clock by default
+    :return: Runner of the service's maintenance jobs, whose calls to Schwab yield to requests
+    """
+    jobs = maintenance_jobs(schwab_service)
+    for job in jobs:
+        job.run = _in_background(job.run)
+    return MaintenanceRunner(jobs, clock=clock)
+
+
+def _in_background(run):
+    async def background_run():
+        with background_priority():
+            return await run()
+    return background_run
@@ -1,10 +1,14 @@
-from typing import Dict, List, Optional, get_args, Final, Set, overload
+from typing import Collection, Dict, List, Optional, get_args, Final, Set, Tuple, Iterable, Iterator, overload
+import asyncio
 import datetime
+import hashlib
+import itertools
 from requests import Response
 import logging
 
 import msgspec
 import cachetools
+import numpy as np
 
 from clearinghouse.dependencies import SchwabService
 import clearinghouse.models.schwab_response as schwab_response
@@ -24,20 +28,46 @@ from clearinghouse.models.schwab_request import (
     Instrument,
     OrderLeg,
 )
-from clearinghouse.models.response import (
+from clearinghouse.models.response_structs import (
     Quote,
     Transaction,
     StandardOrder,
     Position,
+)
+from clearinghouse.models.response import (
     AdjustmentOrderResult,
+    FractionalOrderResult,
     InitialOrderStatus,
     NumericalOrderResult,
 )
-from clearinghouse.services.status_service import fetch_account_status
-from clearinghouse.exceptions import ForbiddenException, NullPositionException, FailedOrderException
+from clearinghouse.services.status_service import (
+    fetch_account_status,
+    fetch_account_positions,
+    invalidate_account_state,
+)
+from clearinghouse.exceptions import (
+    ForbiddenException,
+    NullPositionException,
+    FailedOrderException,
+    RateLimitedException,
+    IdempotencyKeyConflictException,
+)
+from clearinghouse.utils.time_utils import normalize_timestamps
+from clearinghouse.utils.portfolio_utils import PositionsSnapshot
+from clearinghouse.utils.orders_utils import plan_rebalance
+from clearinghouse.utils.filter_utils import (
+    compile_positions_filter,
+    compile_orders_filter,
+    compile_transactions_filter,
+)
+from clearinghouse.utils.retry_utils import RETRYABLE_EXCEPTIONS, call_with_retry, is_retryable
+
+ORDER_TIMESTAMP_KEYS: Final = ("enteredTime", "cancelTime")
+# Slack for the difference between our clock and Schwab's when looking for an order that was already placed
+PLACEMENT_CLOCK_SKEW: Final = datetime.timedelta(seconds=30)
 
 
-def fetch_orders(
+async def fetch_orders(
     schwab_service: SchwabService,
     start_date: Optional[datetime.datetime] = None,
     end_date: Optional[datetime.datetime] = None,
@@ -54,6 +84,26 @@ def fetch_orders(
     :param status: Status of orders to filter by
     :return: List of submitted orders
     """
+    return list(await iter_orders(schwab_service, start_date, end_date, max_results, status))
+
+
+async def iter_orders(
+    schwab_service: SchwabService,
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+    max_results: Optional[int] = 3000,
+    status: Optional[OrderStatus] = None
+) -> Iterator[StandardOrder]:
+    """
+    Retrieve orders for the given account, mapping each one only as it is consumed.
+
+    :param schwab_service: Instantiated Schwab service
+    :param start_date: Start date for filtering orders
+    :param end_date: End date for filtering orders
+    :param max_results: Maximum number of orders to retrieve
+    :param status: Status of orders to filter by
+    :return: Iterator of submitted orders
+    """
     now = datetime.datetime.now()
     start_date = start_date or (now - datetime.timedelta(days=5))
     end_date = end_date or now
@@ -61,19 +111,19 @@ def fetch_orders(
     # Enforce status option via Enum
     status_arg = status if status else None
 
-    resp = schwab_service.client.account_orders(
+    resp = await schwab_service.async_client.account_orders(
         accountHash=schwab_service.account_hash,
         fromEnteredTime=start_date.isoformat(),
         toEnteredTime=end_date.isoformat(),
         maxResults=max_results,
         status=status_arg,
     )
-    decoded_resp = msgspec.json.decode(resp.content, type=List[schwab_response.Order])
+    decoded_resp = decode_orders(resp.content, List[schwab_response.Order])
 
-    return [schwab_to_ch_order(k) for k in decoded_resp]
+    return (schwab_to_ch_order(k) for k in decoded_resp)
 
 
-def fetch_order_details(schwab_service: SchwabService, order_id: str) -> StandardOrder:
+async def fetch_order_details(schwab_service: SchwabService, order_id: str) -> StandardOrder:
     """
     Retrieve details of a specific order by its ID.
 
@@ -81,16 +131,16 @@ def fetch_order_details(schwab_service: SchwabService, order_id: str) -> Standar
     :param order_id: ID of the order to fetch details for
     :return: Details of the submitted order
     """
-    resp = schwab_service.client.order_details(
+    resp = await schwab_service.async_client.order_details(
         accountHash=schwab_service.account_hash,
         orderId=order_id,
     )
-    decoded_resp = msgspec.json.decode(resp.content, type=schwab_response.Order)
+    decoded_resp = decode_orders(resp.content, schwab_response.Order)
 
     return schwab_to_ch_order(decoded_resp)
 
 
-def fetch_positions(schwab_service: SchwabService, symbols: Optional[Set[str]] = None, **kwargs) -> List[Position]:
+async def fetch_positions(schwab_service: SchwabService, symbols: Optional[Set[str]] = None, **kwargs) -> List[Position]:
     """
     Retrieve a list of positions for the given account.
 
@@ -100,13 +150,38 @@ def fetch_positions(schwab_service: SchwabService, symbols: Optional[Set[str]] =
 
     TODO: kwargs to real filters
     """
-    resp = schwab_service.client.account_details(accountHash=schwab_service.account_hash, fields='positions')
-    decoded_resp: List[schwab_response.SchwabPosition] = (
-        msgspec.json.decode(resp.text, type=List[schwab_response.SchwabPosition]))
+    return (await fetch_positions_snapshot(schwab_service, symbols)).to_positions()
 
-    if symbols:
-        decoded_resp = [p for p in decoded_resp if p.instrument.symbol in symbols]
-    return [schwab_to_ch_position(p) for p in decoded_resp]
+
+async def fetch_positions_snapshot(schwab_service: SchwabService, symbols: Optional[Set[str]] = None) -> PositionsSnapshot:
+    """
+    Retrieve the account's positions as a columnar snapshot, with account fractions relative to the account's
+    liquidation value. The (cached) positions and account balances are fetched concurrently.
+
+    :param schwab_service: Instantiated Schwab service
+    :param symbols: Optional list of symbols to filter positions by
+    :return: Snapshot of the positions
+    """
+    positions, account_status = await asyncio.gather(
+        fetch_account_positions(schwab_service),
+        fetch_account_status(schwab_service),
+    )
+    snapshot = PositionsSnapshot.from_schwab(
+        positions,
+        account_value=account_status.current_balances.get("liquidationValue"),
+    )
+    return snapshot.select(symbols) if symbols else snapshot
+
+
+async def fetch_positions_by_symbol(schwab_service: SchwabService, symbols: Optional[Set[str]] = None) -> Dict[str, Position]:
+    """
+    Retrieve a single snapshot of the account's positions indexed by symbol.
+
+    :param schwab_service: Instantiated Schwab service
+    :param symbols: Optional list of symbols to filter positions by
+    :return: Dictionary of symbol to position
+    """
+    return {p.symbol: p for p in await fetch_positions(schwab_service, symbols)}
 
 
 async def _place_order(schwab_service: SchwabService, order: Dict) -> Response:
@@ -118,28 +193,165 @@ async def _place_order(schwab_service: SchwabService, order: Dict) -> Response:
     :param order: Order data to be placed
     :return: Response from the Schwab API
     """
-    return schwab_service.client.order_place(
+    return await schwab_service.async_client.order_place(
         accountHash=schwab_service.account_hash,
         order=order,
     )
 
 
-def fetch_total_account_value(schwab_service: SchwabService, longs: bool = True, shorts: bool = True, **kwargs) -> float:
+def _placed_order_id(resp: Response) -> Optional[int]:
+    """
+    :param resp: Response of a successful order placement
+    :return: ID of the new order from the Location header, if present
+    """
+    location = resp.headers.get("Location", "")
+    order_id = location.rstrip("/").rsplit("/", 1)[-1]
+    return int(order_id) if order_id.isdigit() else None
+
+
+def _is_same_order(placed: schwab_response.Order, order: NumericalOrder) -> bool:
+    if len(placed.order_leg_collection) != 1:
+        return False
+    leg = placed.order_leg_collection[0]
+    return (
+        leg.instrument.symbol == order.symbol
+        and leg.instruction == order.instruction
+        and leg.quantity == order.quantity
+        and placed.order_type == order.order_type
+        and (not order.price or placed.price == order.price)
+    )
+
+
+async def _find_placed_order(
+    schwab_service: SchwabService,
+    order: NumericalOrder,
+    since: datetime.datetime,
+    claimed: Set[int],
+) -> Optional[int]:
+    """
+    Look for an order that Schwab entered since a placement was first attempted and that matches it, for placements
+    whose response was lost. Orders already claimed by another placement are skipped and the match is claimed.
+
+    A match is not proof that the placement went through: Schwab orders carry nothing unique to the placement, and
+    the order ID in the Location header was lost with the response, so an identical order placed by another request
+    or client matches as well.
+
+    :param schwab_service: Instantiated Schwab service
+    :param order: Order being placed
+    :param since: Time of the first placement attempt, timezone aware
+    :param claimed: IDs of orders already accounted for, updated in place
+    :return: ID of the matching order, None if there is none
+    :raises FailedOrderException: If the recent orders could not be listed
+    """
+    resp = await schwab_service.async_client.account_orders(
+        accountHash=schwab_service.account_hash,
+        fromEnteredTime=(since - PLACEMENT_CLOCK_SKEW).isoformat(),
+        toEnteredTime=(datetime.datetime.now(datetime.timezone.utc) + PLACEMENT_CLOCK_SKEW).isoformat(),
+    )
+    if resp.status_code != 200:
+        raise FailedOrderException(order.symbol, f"could not list recent orders ({resp.status_code})")
+
+    for placed in decode_orders(resp.content, List[schwab_response.Order]):
+        if (placed.order_id not in claimed and placed.entered_time >= since - PLACEMENT_CLOCK_SKEW
+                and _is_same_order(placed, order)):
+            claimed.add(placed.order_id)
+            return placed.order_id
+    return None
+
+
+async def _place_order_with_retry(
+    schwab_service: SchwabService,
+    order: NumericalOrder,
+    semaphore: asyncio.Semaphore,
+    claimed: Set[int],
+) -> NumericalOrderResult:
+    """
+    Place an order, retrying transient failures with the service's retry policy. After a failure other than a rate
+    limit, including that of the last attempt, the recent orders are checked for the order, since Schwab may have
+    accepted it and only the response was lost. If a matching order is found, or they cannot be checked, the order
+    is not placed again and fails with a warning to check the open orders, since the match may be another order.
+    An attempt rejected by the outbound rate limits fails the order instead of raising, so that the other orders of
+    a batch, some of which may already be placed, still get their results.
+
+    :param schwab_service: Instantiated Schwab service
+    :param order: Order to place
+    :param semaphore: Bounds the placements in flight, released while backing off
+    :param claimed: IDs of the orders placed by this batch, see _find_placed_order
+    :return: Result of the placement
+    """
+    since = datetime.datetime.now(datetime.timezone.utc)
+    schwab_order = order_to_schwab_order(order).model_dump()
+    found_id: Optional[int] = None
+    unverified = False
+
+    async def place() -> Response:
+        async with semaphore:
+            try:
+                return await _place_order(schwab_service, schwab_order)
+            finally:
+                # Once Schwab has answered, drop balances cached or loading from before the order, even if the
+                # answer was lost or an error since the order may have gone through
+                invalidate_account_state(schwab_service)
+
+    async def check_placed():
+        nonlocal found_id, unverified
+        try:
+            found_id = await _find_placed_order(schwab_service, order, since, claimed)
+        except (FailedOrderException, RateLimitedException, *RETRYABLE_EXCEPTIONS) as e:
+            logging.warning("Could not check whether the order for %s was placed: %s", order.symbol, e)
+            unverified = True
+
+    async def should_retry(resp: Optional[Response], error: Optional[BaseException]) -> bool:
+        # Rate limited calls are rejected before they reach the order book
+        if resp is not None and resp.status_code == 429:
+            return True
+        await check_placed()
+        return found_id is None and not unverified
+
+    error: Optional[BaseException] = None
+    try:
+        resp = await call_with_retry(place, schwab_service.retry_policy, should_retry)
+    except RETRYABLE_EXCEPTIONS as e:
+        resp, error, info = None, e, f"{type(e).__name__}: {e}"
+    except RateLimitedException as e:
+        # Rejected by the outbound scheduler before reaching Schwab, so the order was not placed by this attempt
+        return NumericalOrderResult(
+            **order.model_dump(), status="FAILED", info=f"Rate limited, retry after {e.retry_after:.1f}s")
+    else:
+        info = f"Schwab responded with status {resp.status_code}"
+
+    if resp is not None and resp.status_code == 201:
+        placed_id = _placed_order_id(resp)
+        if placed_id is not None:
+            claimed.add(placed_id)
+        return NumericalOrderResult(**order.model_dump(), status="SUCCEEDED")
+
+    # Retries ran out without checking whether the last attempt went through
+    if (found_id is None and not unverified and is_retryable(resp, error)
+            and (resp is None or resp.status_code != 429)):
+        await check_placed()
+    if found_id is not None:
+        info += (f". A matching order {found_id} was entered since and may be this one, check the open orders "
+                 f"before placing it again")
+    elif unverified:
+        info += ". The order may have been placed, check the open orders before placing it again"
+    return NumericalOrderResult(**order.model_dump(), status="FAILED", info=info)
+
+
+async def fetch_total_account_value(schwab_service: SchwabService, longs: bool = True, shorts: bool = True, **kwargs) -> float:
     """
     Get the total account value of the default trading account. Can filter by longs or shorts
     to get a narrowed version (e.g. liquidationValue, shortBalance, longStockValue)
     """
-    account_status = fetch_account_status(schwab_service)
+    account_status = await fetch_account_status(schwab_service)
     account_value = 0
 
     # TODO: confirm the attr definitions from Schwab API
     if longs and shorts:
         account_value = account_status.current_balances.get("liquidationValue", 0)
-
-    if longs:
+    elif longs:
         account_value = account_status.current_balances.get("longMarketValue", 0)
-
-    if shorts:
+    elif shorts:
         account_value = account_status.current_balances.get("shortMarketValue", 0)
 
     if account_value == 0:
@@ -148,14 +360,14 @@ def fetch_total_account_value(schwab_service: SchwabService, longs: bool = True,
     return account_value
 
 @overload
-def calculate_account_fraction(schwab_service: SchwabService, *, position: Position) -> float:
+async def calculate_account_fraction(schwab_service: SchwabService, *, position: Position) -> float:
     ...
 
 @overload
-def calculate_account_fraction(schwab_service: SchwabService, *, symbol: str) -> float:
+async def calculate_account_fraction(schwab_service: SchwabService, *, symbol: str) -> float:
     ...
 
-def calculate_account_fraction(
+async def calculate_account_fraction(
     schwab_service: SchwabService,
     position: Optional[Position] = None,
     symbol: Optional[str] = None
@@ -170,110 +382,198 @@ def calculate_account_fraction(
     if position is not None and symbol is not None:
         raise ValueError("Only one of 'position' or 'symbol' should be provided.")
 
-    # Fetch positions if only symbol is provided
+    snapshot = await fetch_positions_snapshot(schwab_service)
     if symbol is not None:
-        positions = fetch_positions(schwab_service, symbols={symbol})
-        position = positions[0] if positions else None
-
-    if not position:
-        return 0.0
+        return snapshot.fraction_of(symbol)
+    return position.market_value / snapshot.account_value if snapshot.account_value > 0 else 0.0
 
-    # Example calculation logic (replace with actual logic)
-    total_account_value = 1000  # TODO: calculate this using a combination of longMarketValue, equity, etc.
-    return position.market_value / total_account_value if total_account_value > 0 else 0.0
 
-
-def _convert_fractional_to_numerical_order(schwab_service: SchwabService, order: FractionalOrder) -> NumericalOrder:
+async def realize_fractional_orders(
+        schwab_service: SchwabService,
+        orders: List[FractionalOrder],
+) -> Tuple[List[NumericalOrder], List[FractionalOrderResult]]:
     """
-    Realize a fractional portfolio request into an order that the Schwab API can accept.
+    Realize fractional portfolio targets into orders that the Schwab API can accept, see plan_rebalance.
+    The account value and positions come from one positions snapshot and the prices from one quote request.
 
-    :param order: FractionalOrder object containing the desired fractional position
-    :return: NumericalOrder object ready for submission to the Schwab API
+    :param schwab_service: Instantiated Schwab service
+    :param orders: Fractional targets
+    :return: Numerical orders with sells before buys; results for the targets that need no order or have no price
     """
-    # get current account value
+    snapshot, quotes = await asyncio.gather(
+        fetch_positions_snapshot(schwab_service),
+        fetch_quotes(schwab_service, list(dict.fromkeys(o.symbol for o in orders))),
+    )
+    prices = {q.symbol: q.price for q in quotes if q.price > 0}
+    current_quantities = dict(zip(snapshot.symbols, snapshot.quantity.tolist()))
 
-    # get current positional value and determine if it needs to be a sell/buy order
+    unplaceable: List[FractionalOrderResult] = []
+    priced: List[FractionalOrder] = []
+    for order in orders:
+        if order.symbol in prices:
+            priced.append(order)
+            continue
+        unplaceable.append(FractionalOrderResult(
+            **order.model_dump(),
+            quantity=0,
+            instruction="BUY",
+            status="FAILED",
+            info="No market data available",
+        ))
 
-    # get quote for the current price
+    numerical_orders = plan_rebalance(priced, current_quantities, prices, snapshot.account_value)
 
-    # convert the delta into an actual order
+    ordered = {o.symbol for o in numerical_orders}
+    targets = {o.symbol: o for o in priced}
+    unplaceable.extend(
+        FractionalOrderResult(**order.model_dump(), quantity=0, instruction="BUY", status="IGNORED")
+        for symbol, order in targets.items() if symbol not in ordered
+    )
+    return numerical_orders, unplaceable
 
 
-    # Get current positions
-    positions = fetch_positions(schwab_service, {})
-    position = next((p for p in positions if p.symbol == order.symbol), None)
+async def rebalance_to_fractions(
+        schwab_service: SchwabService,
+        orders: List[FractionalOrder],
+        preview: bool = True,
+) -> (List[FractionalOrderResult], Dict[str, int]):
+    """
+    Bring the targeted positions to the given fractions of the account with the minimal set of orders.
+    Sells are submitted and completed before any buys, so their proceeds can fund the buys.
+
+    :param schwab_service: Instantiated Schwab service
+    :param orders: Fractional targets, negative fractions for short positions
+    :param preview: Whether to preview the orders or actually place them
+    :return: List of the placed, preview, failed and ignored orders; Dict of the result counts
+    """
+    if schwab_service.read_only_mode:
+        raise ForbiddenException()
 
-    # If no current position, assume zero
-    current_quantity = position.quantity if position else 0
+    numerical_orders, results = await realize_fractional_orders(schwab_service, orders)
+    fractions = {o.symbol: o.fraction for o in orders}
 
-    # Get the current quote for the symbol
-    quotes = fetch_quotes(schwab_service, [order.symbol])
-    current_price = quotes[0].price if quotes else 0
+    # sort_orders already put the orders that free up cash first
+    sells = [o for o in numerical_orders if o.instruction in ("SELL", "SELL_SHORT")]
+    buys = [o for o in numerical_orders if o.instruction not in ("SELL", "SELL_SHORT")]
+    placed: List[NumericalOrderResult] = []
+    for batch in (sells, buys):
+        if batch:
+            placed.extend((await place_orders(schwab_service, batch, preview=preview))[0])
 
-    # Calculate the target quantity based on the fractional order
-    target_quantity = order.fraction * (current_quantity * current_price)
+    results = [
+        FractionalOrderResult(**result.model_dump(), fraction=fractions[result.symbol]) for result in placed
+    ] + results
 
-    # Determine the quantity difference
-    quantity_difference = target_quantity - current_quantity
+    count = {k: 0 for k in get_args(InitialOrderStatus)}
+    for result in results:
+        count[result.status] += 1
 
-    # Determine the instruction (buy/sell) based on the quantity difference
-    instruction: Final[str] = "BUY" if quantity_difference > 0 else "SELL"
+    return results, count
+
+
+def _order_fingerprint(order: NumericalOrder) -> str:
+    """
+    :return: Hash of the order as submitted, without its idempotency key
+    """
+    return hashlib.sha256(order.model_dump_json(exclude={"idempotency_key"}).encode()).hexdigest()
 
-    # Create a NumericalOrder based on the calculated values
-    numerical_order = NumericalOrder(
-        symbol=order.symbol,
-        quantity=abs(quantity_difference),
-        instruction=instruction,
-        price=current_price,
-        order_type="LIMIT",  # Assuming limit order; adjust as necessary
-        duration="DAY",      # Assuming day order; adjust as necessary
-        session="NORMAL"     # Assuming normal session; adjust as necessary
-    )
 
-    return numerical_order
+def _check_idempotency_keys(schwab_service: SchwabService, orders: List[NumericalOrder]) -> Dict[str, str]:
+    """
+    :param schwab_service: Instantiated Schwab service
+    :param orders: Orders to place
+    :return: Fingerprint of the order of each idempotency key
+    :raises IdempotencyKeyConflictException: If a key is used for different orders, in the batch or before
+    """
+    fingerprints: Dict[str, str] = {}
+    for order in orders:
+        if order.idempotency_key is None:
+            continue
+        fingerprint = _order_fingerprint(order)
+        placed = schwab_service.idempotency_cache.peek((schwab_service.account_hash, order.idempotency_key))
+        if (fingerprints.setdefault(order.idempotency_key, fingerprint) != fingerprint
+                or placed is not None and placed[0] != fingerprint):
+            raise IdempotencyKeyConflictException(order.idempotency_key)
+    return fingerprints
 
 
 # TODO: add overloading for adjustment, regular, and preview order
-async def place_orders(schwab_service: SchwabService, orders: List[NumericalOrder], preview: bool = False) -> (List[NumericalOrderResult], Dict[str, int]):
+async def place_orders(
+        schwab_service: SchwabService,
+        orders: List[NumericalOrder | FractionalOrder],
+        preview: bool = False,
+) -> (List[NumericalOrderResult], Dict[str, int]):
     """
     Place multiple orders and return lists of successful and failed orders.
+    Orders are submitted concurrently, bounded by the service's max_concurrent_orders, and
+    results are returned in the same order as the input. Transient failures are retried without placing an order
+    twice (see _place_order_with_retry), and orders with an idempotency key are placed at most once per key. A key
+    may only be reused for the same order. Fractional orders are realized together as one
+    rebalance (see rebalance_to_fractions) and their results follow those of the numerical orders.
+    The account's cached balances and positions are invalidated as each placement is answered.
 
     :param schwab_service: Instantiated Schwab service
     :param orders: List of orders to be placed
     :param preview: Whether to preview the order or actually place it
     :return: Tuple containing lists of successful and failed orders
+    :raises IdempotencyKeyConflictException: If an idempotency key is reused for a different order, in which case
+        no order is placed
     """
     if schwab_service.read_only_mode:
         raise ForbiddenException()
 
-    results = []
+    # Checked before anything is placed and before default limit prices are filled in
+    fingerprints = _check_idempotency_keys(
+        schwab_service, [order for order in orders if isinstance(order, NumericalOrder)])
+
+    fractional_results: List[FractionalOrderResult] = []
+    fractional = [order for order in orders if isinstance(order, FractionalOrder)]
+    if fractional:
+        orders = [order for order in orders if not isinstance(order, FractionalOrder)]
+        fractional_results, _ = await rebalance_to_fractions(schwab_service, fractional, preview=preview)
+
     count = {k: 0 for k in get_args(InitialOrderStatus)}
+    semaphore = asyncio.Semaphore(max(1, schwab_service.max_concurrent_orders or 1))
 
-    for order in orders:
-        if order.order_type == "LIMIT" and not order.price:
-            order.price = get_default_limit_price(
-                schwab_service,
-                order.symbol,
-                use_bid=order.instruction=="BUY"
-            )
-        if not preview:
-            resp = await _place_order(schwab_service, order_to_schwab_order(order).model_dump())
-            if resp.status_code == 201:
-                results.append(NumericalOrderResult(**order.model_dump(), status="SUCCEEDED"))
-                count["SUCCEEDED"] += 1
-            else:
-                results.append(NumericalOrderResult(**order.model_dump(), status="FAILED"))
-                count["FAILED"] += 1
-        else:
-            results.append(NumericalOrderResult(**order.model_dump(), status="PREVIEW"))
-            count["PREVIEW"] += 1
+    claimed: Set[int] = set()
+
+    async def _submit(order: NumericalOrder) -> NumericalOrderResult:
+        if preview:
+            return NumericalOrderResult(**order.model_dump(), status="PREVIEW")
+        if order.idempotency_key is None:
+            return await _place_order_with_retry(schwab_service, order, semaphore, claimed)
+
+        # Orders submitted again under the key of a placed order get its result, concurrent ones wait for it
+        key = (schwab_service.account_hash, order.idempotency_key)
+        fingerprint = fingerprints[order.idempotency_key]
+
+        async def place(_) -> Tuple[str, NumericalOrderResult]:
+            return fingerprint, await _place_order_with_retry(schwab_service, order, semaphore, claimed)
+
+        placed_fingerprint, result = await schwab_service.idempotency_cache.aget(key, place)
+        if placed_fingerprint != fingerprint:
+            # Placed concurrently by another request under the same key
+            return NumericalOrderResult(
+                **order.model_dump(), status="FAILED",
+                info=f"Idempotency key {order.idempotency_key} was already used for a different order")
+        if result.status != "SUCCEEDED":
+            schwab_service.idempotency_cache.invalidate(key)
+        return result
+
+    await fill_default_limit_prices(schwab_service, orders)
+
+    results: List[NumericalOrderResult] = await asyncio.gather(*[_submit(order) for order in orders])
+    results = results + fractional_results
+    for result in results:
+        count[result.status] += 1
 
     return results, count
 
 
-def cancel_order_request(schwab_service: SchwabService, order_id: str) -> int:
+async def cancel_order_request(schwab_service: SchwabService, order_id: str) -> int:
     """
-    Cancel an order by its ID.
+    Cancel an order by its ID, retrying transient failures with the service's retry policy. The account's cached
+    balances and positions are invalidated.
 
     :param schwab_service: Instantiated Schwab service
     :param order_id: ID of the order to be canceled
@@ -282,28 +582,60 @@ def cancel_order_request(schwab_service: SchwabService, order_id: str) -> int:
     if schwab_service.read_only_mode:
         raise ForbiddenException()
 
-    resp = schwab_service.client.order_cancel(
-        accountHash=schwab_service.account_hash,
-        orderId=order_id,
-    )
+    try:
+        resp = await call_with_retry(
+            lambda: schwab_service.async_client.order_cancel(
+                accountHash=schwab_service.account_hash,
+                orderId=order_id,
+            ),
+            schwab_service.retry_policy,
+        )
+    finally:
+        invalidate_account_state(schwab_service)
     return resp.status_code
 
 
-def fetch_quotes(schwab_service: SchwabService, symbols: List[str]) -> List[Quote]:
+async def fetch_quotes(schwab_service: SchwabService, symbols: List[str]) -> List[Quote]:
     """
-    Retrieve quotes for a list of symbols.
+    Retrieve quotes for a list of symbols. Quotes are served from the streamed quote book without any I/O when it
+    has them, then from the service's quote cache while fresh, and only the remaining symbols are requested from
+    Schwab. Symbols missing from the book are subscribed to the quote stream, if one is running.
 
     :param schwab_service: Instantiated Schwab service
     :param symbols: List of symbols to fetch quotes for
     :return: List of quotes
     """
-    resp = schwab_service.client.quote(symbols)
+    symbols = list(dict.fromkeys(symbols))
+    quotes = schwab_service.quote_book.get_many(symbols)
+    missing = [s for s in symbols if s not in quotes]
+    if not missing:
+        return list(quotes.values())
+
+    if schwab_service.quote_source is not None:
+        await schwab_service.quote_source.subscribe(missing)
+    quotes.update(await schwab_service.quote_cache.aget_many(
+        missing,
+        lambda keys: _load_quotes(schwab_service, keys),
+    ))
+    return [quotes[s] for s in symbols if s in quotes]
+
+
+async def _load_quotes(schwab_service: SchwabService, symbols: List[str]) -> Dict[str, Quote]:
+    """
+    Request quotes from Schwab, bypassing the quote cache.
+
+    :param schwab_service: Instantiated Schwab service
+    :param symbols: List of symbols to fetch quotes for
+    :return: Dictionary of symbol to quote
+    """
+    resp = await schwab_service.async_client.quotes(symbols)
     decoded_resp = msgspec.json.decode(resp.text, type=Dict[str, schwab_response.Asset])
 
-    return [schwab_to_ch_quote(q) for q in decoded_resp.values()]
+    requested = set(symbols)
+    return {symbol: schwab_to_ch_quote(q) for symbol, q in decoded_resp.items() if symbol in requested}
 
 
-def fetch_transactions(
+async def fetch_transactions(
     schwab_service: SchwabService,
     start_date: Optional[datetime.datetime] = None,
     end_date: Optional[datetime.datetime] = None,
@@ -319,11 +651,29 @@ def fetch_transactions(
     :param types: List of transaction types to filter by
     :return: List of transactions
     """
+    return list(await iter_transactions(schwab_service, start_date, end_date, types))
+
+
+async def iter_transactions(
+    schwab_service: SchwabService,
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+    types: Optional[List[TransactionType]] = None,
+) -> Iterator[Transaction]:
+    """
+    Get transactions for the given account, mapping each one only as it is consumed.
+
+    :param schwab_service: Instantiated Schwab service
+    :param start_date: Start date for filtering transactions
+    :param end_date: End date for filtering transactions
+    :param types: List of transaction types to filter by
+    :return: Iterator of transactions
+    """
     now = datetime.datetime.now()
     start_date = start_date or (now - datetime.timedelta(days=5))
     end_date = end_date or now
 
-    resp = schwab_service.client.transactions(
+    resp = await schwab_service.async_client.transactions(
         accountHash=schwab_service.account_hash,
         startDate=start_date,
         endDate=end_date,
@@ -332,10 +682,10 @@ def fetch_transactions(
     )
     decoded_resp = msgspec.json.decode(resp.text, type=List[schwab_response.Transaction])
 
-    return [schwab_to_ch_transaction(t) for t in decoded_resp]
+    return (schwab_to_ch_transaction(t) for t in decoded_resp)
 
 
-def fetch_transaction_details(schwab_service: SchwabService, transaction_id: str) -> Transaction:
+async def fetch_transaction_details(schwab_service: SchwabService, transaction_id: str) -> Transaction:
     """
     Retrieve details of a specific transaction by its ID.
 
@@ -343,7 +693,7 @@ def fetch_transaction_details(schwab_service: SchwabService, transaction_id: str
     :param transaction_id: ID of the transaction to fetch details for
     :return: Details of the transaction
     """
-    resp = schwab_service.client.transaction_details(
+    resp = await schwab_service.async_client.transaction_details(
         accountHash=schwab_service.account_hash,
         transactionId=transaction_id,
     )
@@ -356,7 +706,8 @@ async def adjust_position_fraction(
         schwab_service: SchwabService,
         order: AdjustmentOrder,
         round_down: bool = False,
-        preview: bool = True
+        preview: bool = True,
+        positions: Optional[Dict[str, Position]] = None,
 ) -> AdjustmentOrderResult:
     """
     Adjust the current holding of a security by a fraction. It will round down to the closest quantity to
@@ -365,114 +716,115 @@ async def adjust_position_fraction(
     TODO: return value of stable/failed order to concrete obj
 
     :param schwab_service: Instantiated Schwab service
-    :param symbol: Symbol of the security to adjust
-    :param fraction: Fraction/percentage to adjust the position by
+    :param order: Adjustment order specifying the symbol and fraction to adjust the position by
     :param round_down: Whether to round down the quantity
     :param preview: Whether to perform a preview of the adjustment
+    :param positions: Optional positions snapshot keyed by symbol. Fetched if not provided.
     :return: Submitted or preview order, or None if no adjustment is needed
     """
-    positions: List[Position] = fetch_positions(schwab_service)
-    position = next((p for p in positions if p.symbol == order.symbol), None)
-
-    if not position:
-        return AdjustmentOrderResult(
-            symbol=order.symbol,
-            adjustment=order.adjustment,
-            quantity=0,
-            total_position_size=0,
-            status="FAILED",
-            info="No existing position",
-            instruction="BUY",
-        )
-    else:
-        current_quantity = position.quantity
-
-    target_quantity = current_quantity * (1 + order.adjustment)
-
-    if round_down:
-        target_quantity = int(target_quantity)
-
-    quantity_difference = target_quantity - current_quantity
-
-    # Place order if there is a difference
-    # TODO: account for short positions -> translation back into Schwab orders
-
-    numerical_order = NumericalOrder(
-        symbol=order.symbol,
-        order_type=order.order_type,
-        duration=order.duration,
-        asset_type=order.asset_type,
-        session=order.session,
-        strategy_type=order.strategy_type,
-        instruction= "BUY" if quantity_difference > 0 else "SELL",
-        quantity=abs(quantity_difference),
+    results, _ = await adjust_bulk_positions_fractions(
+        schwab_service,
+        [order],
+        round_down=round_down,
+        preview=preview,
+        positions=positions,
     )
+    return results[0]
 
-    if quantity_difference != 0.0:
-        results: List[NumericalOrderResult]
-        results, _ = await place_orders(
-            schwab_service,
-            [numerical_order],
-            preview=preview,
-            )
-        if results[0].status == "FAILED":
-            return AdjustmentOrderResult(
-                **results[0].model_dump(),
-                # TODO: calculate the real delta instead of the proposed
-                adjustment=order.adjustment,
-                total_position_size=target_quantity,
-                info="Miscellaneous failure",
-            )
-        return AdjustmentOrderResult(
-            **results[0].model_dump(),
-            total_position_size=target_quantity,
-            adjustment=order.adjustment,
-        )
-
-
-    else:
-        # TODO: add ignore mode to the orderresult model
-        return AdjustmentOrderResult(
-            **order.model_dump(),
-            total_position_size=target_quantity,
-            status="IGNORED",
-            quantity=0,
-            instruction="BUY"
-        )
 
 async def adjust_bulk_positions_fractions(
         schwab_service: SchwabService,
         orders: List[AdjustmentOrder],
         round_down: bool = False,
         preview: bool = True,
+        positions: Optional[Dict[str, Position]] = None,
 ) -> (List[AdjustmentOrderResult], Dict[str, int]):
     """
     Adjust the current holding of many securities by the fractions specified. It will round down to the closest quantity
     to minimize buying and selling and will not open new positions by default. Use negatives for position reductions.
+    Positions are read from a single snapshot and every resulting order is placed in one batch.
 
     :param schwab_service: Instantiated Schwab service
     :param orders: List of adjustment orders specifying symbols and fractions
     :param round_down: Whether to round down the quantity
     :param preview: Whether to perform a preview of the adjustments
+    :param positions: Optional positions snapshot keyed by symbol. Fetched once if not provided.
     :return: List containing of successful, failed, stable, and preview orders; Dict of the result counts
     """
-    results = []
+    if positions is None:
+        positions = await fetch_positions_by_symbol(schwab_service)
+
+    results: List[Optional[AdjustmentOrderResult]] = [None] * len(orders)
     count = {k: 0 for k in get_args(InitialOrderStatus)}
 
-    for order in orders:
-        processed_order = await adjust_position_fraction(
-            schwab_service,
-            order=order,
-            round_down=round_down,
-            preview=preview,
-        )
-        results.append(processed_order)
-        count[processed_order.status] += 1
+    held = [i for i, order in enumerate(orders) if order.symbol in positions]
+    for i, order in enumerate(orders):
+        if order.symbol not in positions:
+            results[i] = AdjustmentOrderResult(
+                symbol=order.symbol,
+                adjustment=order.adjustment,
+                quantity=0,
+                total_position_size=0,
+                status="FAILED",
+                info="No existing position",
+                instruction="BUY",
+            )
+
+    # Target quantities for the whole basket at once
+    current_quantities = np.array([positions[orders[i].symbol].quantity for i in held], dtype=float)
+    adjustments = np.array([orders[i].adjustment for i in held], dtype=float)
+    target_quantities = current_quantities * (1 + adjustments)
+    if round_down:
+        target_quantities = np.trunc(target_quantities)
+    quantity_differences = target_quantities - current_quantities
+
+    # TODO: account for short positions -> translation back into Schwab orders
+    pending: List[Tuple[int, float]] = []
+    numerical_orders: List[NumericalOrder] = []
+    for i, target_quantity, quantity_difference in zip(held, target_quantities.tolist(), quantity_differences.tolist()):
+        order = orders[i]
+        if quantity_difference == 0.0:
+            # TODO: add ignore mode to the orderresult model
+            results[i] = AdjustmentOrderResult(
+                **order.model_dump(),
+                total_position_size=target_quantity,
+                status="IGNORED",
+                quantity=0,
+                instruction="BUY"
+            )
+            continue
+
+        pending.append((i, target_quantity))
+        numerical_orders.append(NumericalOrder(
+            symbol=order.symbol,
+            order_type=order.order_type,
+            duration=order.duration,
+            asset_type=order.asset_type,
+            session=order.session,
+            strategy_type=order.strategy_type,
+            instruction="BUY" if quantity_difference > 0 else "SELL",
+            quantity=abs(quantity_difference),
+        ))
+
+    if numerical_orders:
+        placed: List[NumericalOrderResult]
+        placed, _ = await place_orders(schwab_service, numerical_orders, preview=preview)
+        for (i, target_quantity), result in zip(pending, placed):
+            extra = {"info": "Miscellaneous failure"} if result.status == "FAILED" else {}
+            results[i] = AdjustmentOrderResult(
+                **{**result.model_dump(), **extra},
+                # TODO: calculate the real delta instead of the proposed
+                adjustment=orders[i].adjustment,
+                total_position_size=target_quantity,
+            )
+
+    for result in results:
+        count[result.status] += 1
 
     return results, count
 
 
-def get_default_limit_price(schwab_service: SchwabService, symbol: str, use_bid: bool = True) -> float:
+async def get_default_limit_price(schwab_service: SchwabService, symbol: str, use_bid: bool = True) -> float:
     """
     Determine a default price for a limit order if no price is set.
 
@@ -481,7 +833,7 @@ def get_default_limit_price(schwab_service: SchwabService, symbol: str, use_bid:
     :param use_bid: Whether to use the bid price or ask price
     :return: Default price for the limit order
     """
-    quotes = fetch_quotes(schwab_service, [symbol])
+    quotes = await fetch_quotes(schwab_service, [symbol])
 
     if not quotes:
         raise ValueError(f"No market data available for symbol: {symbol}")
@@ -491,6 +843,26 @@ def get_default_limit_price(schwab_service: SchwabService, symbol: str, use_bid:
     return current_quote.bid_price if use_bid else current_quote.ask_price
 
 
+async def fill_default_limit_prices(schwab_service: SchwabService, orders: List[NumericalOrder]) -> None:
+    """
+    Set a default price on every LIMIT order without one, using a single quote request for all of their symbols.
+    Buys use the bid price and sells use the ask price.
+
+    :param schwab_service: Instantiated Schwab service
+    :param orders: Orders to update in place
+    """
+    unpriced = [order for order in orders if order.order_type == "LIMIT" and not order.price]
+    if not unpriced:
+        return
+
+    quotes: Dict[str, Quote] = {q.symbol: q for q in await fetch_quotes(schwab_service, [o.symbol for o in unpriced])}
+    for order in unpriced:
+        current_quote = quotes.get(order.symbol)
+        if not current_quote:
+            raise ValueError(f"No market data available for symbol: {order.symbol}")
+        order.price = current_quote.bid_price if order.instruction == "BUY" else current_quote.ask_price
+
+
 def filter_positions(data: List[Position], filter_request: PositionsFilter) -> List[Position]:
     """
     Filter positions by input parameters.
@@ -499,48 +871,39 @@ def filter_positions(data: List[Position], filter_request: PositionsFilter) -> L
     :param filter_request: Filtering criteria
     :return: List of filtered positions
     """
-    filters = [
-        lambda p: p.asset_type in filter_request.asset_types if filter_request.asset_types else True,
-        lambda p: p.quantity >= 0 if not filter_request.shorts else True,
-        lambda p: p.quantity <= 0 if not filter_request.longs else True,
-        lambda p: p.market_value >= filter_request.min_position_size if filter_request.min_position_size is not None else True,
-        lambda p: p.market_value <= filter_request.max_position_size if filter_request.max_position_size is not None else True,
-        lambda p: p.symbol in filter_request.symbols if filter_request.symbols else True,
-    ]
-
-    filtered_data = [
-        item for item in data
-        if all(f(item) for f in filters)
-    ]
-
-    return filtered_data
+    return list(compile_positions_filter(filter_request).apply(data))
 
 
-def filter_transactions(data: List[Transaction], filter_request: TransactionsFilter) -> List[Transaction]:
+def filter_transactions(
+    data: Iterable[Transaction],
+    filter_request: TransactionsFilter,
+    pushed_down: Collection[str] = (),
+) -> List[Transaction]:
     """
     Filter transactions by input parameters. Parameters not included here are done natively by the Schwab client.
-    TODO: add symbol to transaction?
 
     :param data: List of transactions to filter
     :param filter_request: Filtering criteria
+    :param pushed_down: Names of filter fields already applied by the data source
     :return: List of filtered transactions
     """
-    filters = [
-        lambda t: t.type in filter_request.types if filter_request.types else True,
-        # lambda t: t.symbol in filter_request.symbols if filter_request.symbols else True,
-        lambda t: t.time >= filter_request.start_date if filter_request.start_date else True,
-        lambda t: t.time <= filter_request.end_date if filter_request.end_date else True,
-    ]
+    return list(iter_filter_transactions(data, filter_request, pushed_down))
+
 
-    filtered_data = [
-        item for item in data
-        if all(f(item) for f in filters)
-    ]
+def iter_filter_transactions(
+    data: Iterable[Transaction],
+    filter_request: TransactionsFilter,
+    pushed_down: Collection[str] = (),
+) -> Iterator[Transaction]:
+    """
+    Lazily filter transactions by input parameters, see filter_transactions.
 
-    return filtered_data
+    :param pushed_down: Names of filter fields already applied by the data source
+    """
+    return compile_transactions_filter(filter_request, pushed_down).apply(data)
 
 
-def filter_orders(data: List[NumericalOrder], filter_request: OrdersFilter) -> List[NumericalOrder]:
+def filter_orders(data: Iterable[StandardOrder], filter_request: OrdersFilter) -> List[StandardOrder]:
     """
     Filter orders by input parameters. Parameters not included here are done natively by the Schwab client.
 
@@ -548,16 +911,22 @@ def filter_orders(data: List[NumericalOrder], filter_request: OrdersFilter) -> L
     :param filter_request: Filtering criteria
     :return: List of filtered orders
     """
-    filters = [
-        lambda o: o.symbol in filter_request.symbols if filter_request.symbols else True,
-    ]
+    return list(iter_filter_orders(data, filter_request))
+
 
-    filtered_data = [
-        item for item in data
-        if all(f(item) for f in filters)
-    ]
+def iter_filter_orders(
+    data: Iterable[StandardOrder],
+    filter_request: OrdersFilter,
+    pushed_down: Collection[str] = (),
+) -> Iterator[StandardOrder]:
+    """
+    Lazily filter orders by input parameters, see filter_orders.
 
-    return filtered_data
+    :param pushed_down: Names of filter fields already applied by the data source
+    """
+    orders = compile_orders_filter(filter_request, pushed_down).apply(data)
+    # Already limited upstream unless rows were filtered out here
+    return itertools.islice(orders, filter_request.max_results) if filter_request.max_results else orders
 
 
 """
@@ -567,10 +936,10 @@ Mapping functions
 
 def schwab_to_ch_position(position: schwab_response.SchwabPosition) -> Position:
     """
-    Convert a Schwab position response to a clearinghouse Position object.
+    Convert a Schwab position response to a clearinghouse Position struct.
 
     :param position: Schwab position response
-    :return: Converted Position object
+    :return: Converted Position struct
     """
     # todo: helper for settling short or long position
     quantity = position.long_quantity or position.short_quantity
@@ -590,10 +959,10 @@ def schwab_to_ch_position(position: schwab_response.SchwabPosition) -> Position:
 
 def schwab_to_ch_transaction(transaction: schwab_response.Transaction) -> Transaction:
     """
-    Convert a Schwab transaction response to a clearinghouse Transaction object.
+    Convert a Schwab transaction response to a clearinghouse Transaction struct.
 
     :param transaction: Schwab transaction response
-    :return: Converted Transaction object
+    :return: Converted Transaction struct
     """
     # TODO: confirm that these are valid
     return Transaction(
@@ -609,14 +978,14 @@ def schwab_to_ch_transaction(transaction: schwab_response.Transaction) -> Transa
 
 def schwab_to_ch_quote(asset: schwab_response.Asset) -> Quote:
     """
-    Convert a Schwab asset response to a clearinghouse Quote object.
+    Convert a Schwab asset response to a clearinghouse Quote struct.
 
     :param asset: Schwab asset response
-    :return: Converted Quote object
+    :return: Converted Quote struct
     """
     return Quote(
         symbol=asset.symbol,
-        price=asset.quote.open_price,
+        price=asset.quote.last_price,
         quote_time=datetime.datetime.fromtimestamp(asset.quote.quote_time / 1000),  # epoch time
         total_volume=asset.quote.total_volume,
         net_percent_change=asset.quote.net_percent_change,
@@ -625,12 +994,28 @@ def schwab_to_ch_quote(asset: schwab_response.Asset) -> Quote:
     )
 
 
+def decode_orders(content: bytes, type_):
+    """
+    Decode a Schwab order or list of orders. Timestamps are decoded natively by msgspec, and only payloads with
+    timestamps it cannot read take the slower path through the memoized fallback parser.
+
+    :param content: Raw JSON response body
+    :param type_: schwab_response.Order or List[schwab_response.Order]
+    :return: Decoded order(s)
+    """
+    try:
+        return msgspec.json.decode(content, type=type_)
+    except msgspec.ValidationError:
+        raw = normalize_timestamps(msgspec.json.decode(content), ORDER_TIMESTAMP_KEYS)
+        return msgspec.convert(raw, type=type_)
+
+
 def schwab_to_ch_order(order: schwab_response.Order) -> StandardOrder:
     """
-    Convert a Schwab order response to a clearinghouse SubmittedOrder object.
+    Convert a Schwab order response to a clearinghouse StandardOrder struct.
 
     :param order: Schwab order response
-    :return: Converted SubmittedOrder object
+    :return: Converted StandardOrder struct
     """
     return StandardOrder(
         order_id=order.order_id,
@@ -643,10 +1028,11 @@ def schwab_to_ch_order(order: schwab_response.Order) -> StandardOrder:
         filled_quantity=order.filled_quantity,
         remaining_quantity=order.remaining_quantity,
         status=order.status,
-        entered_time=datetime.datetime.strptime(order.entered_time, "%Y-%m-%dT%H:%M:%S%z"),
-        cancel_time=datetime.datetime.strptime(order.cancel_time, "%Y-%m-%dT%H:%M:%S%z"),
+        entered_time=order.entered_time,
+        cancel_time=order.cancel_time,
         session=order.session,
-        cancelable=order.cancelable
+        cancelable=order.cancelable,
+        symbols=[leg.instrument.symbol for leg in order.order_leg_collection],
     )
 
 
@@ -1,6 +1,11 @@
-from typing import List, Any
+from typing import List, Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+import asyncio
 import datetime
 
+import msgspec
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
 from clearinghouse.models.response import (
     Meta,
     GenericItemResponse,
@@ -8,10 +13,11 @@ from clearinghouse.models.response import (
 )
 
 
-def generate_meta_data(response_type: str) -> Meta:
+def generate_meta_data(response_type: str, staleness: Optional[float] = None) -> Meta:
     return Meta(
         type=response_type,
         timestamp=datetime.datetime.now(),
+        staleness=staleness,
     )
 
 
@@ -27,3 +33,130 @@ def generate_generic_response(response_type: str, data: Any | List[Any]) -> Gene
             meta=meta,
             data=data or {},
         )
+
+
+def _encode_model(obj: Any) -> Any:
+    """
+    Hand pydantic models to msgspec as their already validated field values, skipping re-validation.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise NotImplementedError(f"Cannot encode object of type {type(obj)}")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_encode_model)
+
+
+def encode_generic_response(meta: Meta, data: Any | List[Any]) -> bytes:
+    """
+    Encode a generic response straight to JSON bytes. The output is byte for byte the same as FastAPI's
+    serialization of the GenericCollectionResponse/GenericItemResponse built by generate_generic_response.
+
+    :param meta: Response meta data
+    :param data: Response item or list of items, as pydantic models or msgspec Structs
+    :return: Encoded JSON body
+    """
+    if isinstance(data, list):
+        return _encoder.encode({"meta": meta, "data": data})
+    return _encoder.encode({"meta": meta, "data": data or {}})
+
+
+def generate_encoded_response(response_type: str, data: Any | List[Any], staleness: Optional[float] = None) -> Response:
+    """
+    Fast path for generate_generic_response. Returning a Response skips the response_model validation in FastAPI,
+    while the route's response_model still documents the body in OpenAPI.
+    """
+    meta = generate_meta_data(response_type, staleness)
+    return Response(content=encode_generic_response(meta, data), media_type="application/json")
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def generate_streaming_response(
+        response_type: str,
+        data: Iterable[Any],
+        ndjson: bool = False,
+        chunk_size: int = 256,
+        staleness: Optional[float] = None,
+) -> StreamingResponse:
+    """
+    Stream a collection response as records are produced instead of building it in memory.
+    The meta object is always sent first.
+
+    NDJSON sends {"meta": ...} on the first line and one record per line after it. Otherwise the body is the
+    same JSON document as GenericCollectionResponse, sent in chunks.
+    """
+    meta = generate_meta_data(response_type, staleness)
+    if ndjson:
+        return StreamingResponse(_ndjson_chunks(meta, data, chunk_size), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(_json_array_chunks(meta, data, chunk_size), media_type="application/json")
+
+
+def _ndjson_chunks(meta: Meta, data: Iterable[Any], chunk_size: int) -> Iterator[bytes]:
+    yield b'{"meta":' + _encoder.encode(meta) + b'}\n'
+
+    batch = []
+    for item in data:
+        batch.append(_encoder.encode(item))
+        if len(batch) >= chunk_size:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def _json_array_chunks(meta: Meta, data: Iterable[Any], chunk_size: int) -> Iterator[bytes]:
+    yield b'{"meta":' + _encoder.encode(meta) + b',"data":['
+
+    batch = []
+    first = True
+    for item in data:
+        batch.append(_encoder.encode(item))
+        if len(batch) >= chunk_size:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]}"
+
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+
+def generate_event_stream_response(event: str, data: AsyncIterable[Any], heartbeat: float = 15.0) -> StreamingResponse:
+    """
+    Send items as server-sent events while they are produced, one "event: <event>" message per item with the
+    encoded item as its data. A comment is sent after heartbeat seconds without an item so idle connections
+    are not dropped by proxies.
+    """
+    return StreamingResponse(
+        _event_chunks(event, data, heartbeat),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _event_chunks(event: str, data: AsyncIterable[Any], heartbeat: float) -> AsyncIterator[bytes]:
+    prefix = f"event: {event}\ndata: ".encode()
+    items = aiter(data)
+    next_item = asyncio.ensure_future(anext(items))
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_item}, timeout=heartbeat)
+            if not done:
+                yield b": keepalive\n\n"
+                continue
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            yield prefix + _encoder.encode(item) + b"\n\n"
+            next_item = asyncio.ensure_future(anext(items))
+    finally:
+        # Cancelling the pending item also closes an async generator source, letting it clean up
+        if not next_item.done():
+            next_item.cancel()
+            await asyncio.gather(next_item, return_exceptions=True)
+        if hasattr(items, "aclose"):
+            await items.aclose()
@@ -0,0 +1,147 @@
+from typing import Any, Awaitable, Callable, Dict, Final, List, Literal, Optional
+import asyncio
+import logging
+import time
+
+from clearinghouse.dependencies import SchwabService
+from clearinghouse.exceptions import ServiceUnavailableException
+from clearinghouse.services.status_service import fetch_account_status, fetch_account_positions
+from clearinghouse.services.sync_service import run_quote_stream
+from clearinghouse.services.maintenance_service import create_maintenance_runner
+from clearinghouse.utils.rate_limit_utils import background_priority
+
+"""
+Background startup of the Schwab service for the app lifespan, so that the app serves health checks while the
+service connects to Schwab and warms its caches.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request waits for a starting service before it is answered with 503
+STARTUP_WAIT: Final = 5.0
+# Seconds before retrying a failed service start
+STARTUP_RETRY: Final = 5.0
+
+StartupStatus = Literal["starting", "warming", "ready"]
+
+
+class ServiceStartup:
+    """
+    Starts a service in the background: connects it (see SchwabService.start), retrying until it succeeds, then
+    runs the cache warmups concurrently, starts the service's maintenance runner and launches the quote stream if
+    the service has it enabled.
+
+    Attributes:
+        status (str): "starting" until the service is started, "warming" during the warmups, then "ready".
+        error (str): Last error of a failed start, cleared once started.
+        durations (Dict[str, float]): Seconds taken by the start and by each warmup.
+    """
+
+    def __init__(self, schwab_service: SchwabService, retry: float = STARTUP_RETRY):
+        """
+        :param schwab_service: Service to start
+        :param retry: Seconds to wait before retrying a failed start
+        """
+        self.schwab_service = schwab_service
+        self.retry = retry
+        self.status: StartupStatus = "starting"
+        self.error: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        self.tasks: List[asyncio.Task] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def warmups(self) -> Dict[str, Callable[[], Awaitable[Any]]]:
+        """
+        :return: Loads run once the service has started, by name
+        """
+        return {
+            "account_status": lambda: fetch_account_status(self.schwab_service),
+            "account_positions": lambda: fetch_account_positions(self.schwab_service),
+        }
+
+    def runners(self) -> List[Callable[[], Awaitable[None]]]:
+        """
+        :return: Long-running background tasks enabled on the service, besides its maintenance jobs
+        """
+        service = self.schwab_service
+        runners = []
+        if service.quote_stream:
+            runners.append(lambda: run_quote_stream(service))
+        return runners
+
+    def launch(self) -> asyncio.Task:
+        """
+        Start the service in a background task and return without waiting for it.
+        """
+        self.schwab_service.reset_async_state()
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        started_at = time.perf_counter()
+        while not self.schwab_service.started:
+            try:
+                await self.schwab_service.start()
+            except Exception as e:
+                logger.exception("Schwab service failed to start, retrying in %.0fs", self.retry)
+                self.error = f"{type(e).__name__}: {e}"
+                await asyncio.sleep(self.retry)
+        self.error = None
+        self.durations["start"] = time.perf_counter() - started_at
+
+        self.status = "warming"
+        with background_priority():
+            await asyncio.gather(*(self._warm(name, load) for name, load in self.warmups().items()))
+        self.schwab_service.maintenance = create_maintenance_runner(self.schwab_service, self.schwab_service.clock)
+        self.schwab_service.maintenance.start()
+        self.tasks = [asyncio.create_task(runner()) for runner in self.runners()]
+        self.status = "ready"
+
+    async def _warm(self, name: str, load: Callable[[], Awaitable[Any]]):
+        started_at = time.perf_counter()
+        try:
+            await load()
+        except Exception:
+            # A failed warmup only means a cold cache, the first request loads it instead
+            logger.exception("%s warmup failed", name)
+        self.durations[name] = time.perf_counter() - started_at
+
+    async def aclose(self):
+        """
+        Stop the startup if still running, the maintenance jobs and the background runners, then close the service.
+        """
+        for task in [self._task, *self.tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*[t for t in [self._task, *self.tasks] if t is not None], return_exceptions=True)
+        if self.schwab_service.maintenance is not None:
+            await self.schwab_service.maintenance.stop()
+        await self.schwab_service.aclose()
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        :return: Status of the startup, with the error of the last failed start if any
+        """
+        readiness: Dict[str, Any] = {"status": self.status}
+        if self.error:
+            readiness["detail"] = self.error
+        return readiness
+
+
+def require_started(schwab_service: SchwabService, wait: Optional[float] = None) -> Callable[[], Awaitable[None]]:
+    """
+    Router dependency holding requests until the service has started, for up to wait seconds.
+
+    :param schwab_service: Service the router uses
+    :param wait: Seconds a request may wait, STARTUP_WAIT if not given
+    :return: Dependency raising ServiceUnavailableException if the service is still starting after the wait
+    """
+    async def dependency():
+        if schwab_service.started:
+            return
+        try:
+            await asyncio.wait_for(schwab_service.wait_started(), timeout=STARTUP_WAIT if wait is None else wait)
+        except TimeoutError:
+            raise ServiceUnavailableException(retry_after=STARTUP_RETRY)
+
+    return dependency
@@ -1,22 +1,65 @@
-from typing import Dict
+from typing import Dict, List
 
 import msgspec
-from cachetools import cached, TTLCache
 
 from clearinghouse.dependencies import SchwabService
 from clearinghouse.models.schwab_response import (
-    SecuritiesAccount
+    SecuritiesAccount,
+    SchwabPosition,
 )
 from clearinghouse.models.response import (
     AccountDetails
 )
 
-@cached(cache=TTLCache(maxsize=1024, ttl=60))
-def fetch_account_status(schwab_service: SchwabService) -> AccountDetails:
-    resp = schwab_service.client.account_details(schwab_service.account_hash)
+async def fetch_account_status(schwab_service: SchwabService) -> AccountDetails:
+    """
+    Retrieve the balances of the default trading account. Cached on the service for up to account_cache_ttl
+    seconds, or until an order is placed or cancelled.
+
+    :param schwab_service: Instantiated Schwab service
+    :return: Current and initial balances of the account
+    """
+    return await schwab_service.account_cache.aget(
+        schwab_service.account_hash,
+        lambda _: _load_account_status(schwab_service),
+    )
+
+
+async def _load_account_status(schwab_service: SchwabService) -> AccountDetails:
+    resp = await schwab_service.async_client.account_details(schwab_service.account_hash)
     decoded_resp: SecuritiesAccount = msgspec.json.decode(resp.content,
                                                           type=Dict[str, SecuritiesAccount]).get("securitiesAccount")
     return AccountDetails(
         current_balances=decoded_resp.current_balances,
         initial_balances=decoded_resp.initial_balances,
     )
+
+
+async def fetch_account_positions(schwab_service: SchwabService) -> List[SchwabPosition]:
+    """
+    Retrieve the positions of the default trading account. Cached like the balances, see fetch_account_status.
+
+    :param schwab_service: Instantiated Schwab service
+    :return: Decoded Schwab positions
+    """
+    return await schwab_service.positions_cache.aget(
+        schwab_service.account_hash,
+        lambda _: _load_account_positions(schwab_service),
+    )
+
+
+async def _load_account_positions(schwab_service: SchwabService) -> List[SchwabPosition]:
+    resp = await schwab_service.async_client.account_details(
+        accountHash=schwab_service.account_hash, fields="positions")
+    return msgspec.json.decode(resp.content, type=List[SchwabPosition])
+
+
+def invalidate_account_state(schwab_service: SchwabService):
+    """
+    Drop the cached balances and positions of the account, including loads in flight, so that the next request
+    sees the effect of an order placed or cancelled.
+
+    :param schwab_service: Instantiated Schwab service
+    """
+    schwab_service.account_cache.invalidate(schwab_service.account_hash)
+    schwab_service.positions_cache.invalidate(schwab_service.account_hash)
@@ -0,0 +1,295 @@
+from typing import AsyncIterator, Dict, Final, Iterable, List, Optional, Set, get_args
+import asyncio
+import datetime
+import logging
+
+import msgspec
+
+from clearinghouse.dependencies import SchwabService
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.models.response_structs import StandardOrder, Transaction
+from clearinghouse.models.shared import OrderStatus, TransactionType
+from clearinghouse.services.orders_service import fetch_order_details, fetch_positions_snapshot, iter_orders
+from clearinghouse.utils.store_utils import TERMINAL_ORDER_STATUSES, as_aware
+from clearinghouse.utils.rate_limit_utils import background_priority
+
+logger = logging.getLogger(__name__)
+
+# Re-fetch a little before the high-water mark so orders entered within the same second are not missed
+SYNC_OVERLAP: Final = datetime.timedelta(minutes=1)
+# Same default window as fetch_orders and fetch_transactions
+INITIAL_SYNC_WINDOW: Final = datetime.timedelta(days=5)
+# Schwab limits each transactions request to a year
+MAX_TRANSACTION_WINDOW: Final = datetime.timedelta(days=365)
+# TransactionsFilter fields applied by the ledger query
+LEDGER_TRANSACTION_FILTERS: Final = frozenset({"start_date", "end_date", "types", "symbols"})
+# Seconds before restarting a quote stream that failed
+QUOTE_STREAM_RETRY: Final = 5.0
+
+
+async def sync_orders(schwab_service: SchwabService) -> int:
+    """
+    Bring the service's order store up to date. Only orders entered since the high-water mark are requested from
+    Schwab, and stored orders that are not yet in a terminal status are re-checked individually.
+
+    :param schwab_service: Instantiated Schwab service
+    :return: Number of orders fetched from Schwab
+    """
+    store = schwab_service.order_store
+    async with schwab_service.order_sync_lock:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if store.high_water_mark is None:
+            window_start = now - INITIAL_SYNC_WINDOW
+        else:
+            window_start = min(store.high_water_mark - SYNC_OVERLAP, now)
+
+        fetched: List[StandardOrder] = list(await iter_orders(
+            schwab_service,
+            start_date=window_start,
+            end_date=now,
+            max_results=None,
+        ))
+        seen = {o.order_id for o in fetched}
+
+        stale_open = [o.order_id for o in store.open_orders() if o.order_id not in seen]
+        fetched.extend(await _recheck_orders(schwab_service, stale_open))
+
+        store.upsert(fetched)
+        store.mark_synced(window_start)
+        return len(fetched)
+
+
+async def _recheck_orders(
+        schwab_service: SchwabService,
+        order_ids: Iterable[int],
+        return_exceptions: bool = False,
+) -> List[StandardOrder | BaseException]:
+    semaphore = asyncio.Semaphore(max(1, schwab_service.max_concurrent_orders or 1))
+
+    async def _fetch(order_id: int) -> StandardOrder:
+        async with semaphore:
+            return await fetch_order_details(schwab_service, str(order_id))
+
+    return list(await asyncio.gather(*(_fetch(i) for i in order_ids), return_exceptions=return_exceptions))
+
+
+class OrderStatusWatcher:
+    """
+    One shared poller pushing order status changes to any number of subscribers.
+
+    Every watched order is fetched once per poll no matter how many subscribers watch it, so N subscribers
+    watching M orders cost M requests per interval. Orders stop being polled once they reach a terminal status,
+    and the poller only runs while something is watched. Polled orders are also written to the order store.
+    """
+
+    def __init__(self, schwab_service: SchwabService, interval: Optional[float] = None):
+        self._service = schwab_service
+        self.interval = interval or schwab_service.order_watch_interval
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._latest: Dict[int, StandardOrder] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def watched(self) -> Set[int]:
+        return set(self._subscribers)
+
+    async def watch(self, order_ids: Iterable[int]) -> AsyncIterator[StandardOrder]:
+        """
+        Yield the last known state of every order, then every change, until all of them are in a terminal status.
+
+        :param order_ids: Orders to watch
+        :return: Async iterator of order states
+        """
+        order_ids = set(order_ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        for order_id in order_ids:
+            self._subscribers.setdefault(order_id, set()).add(queue)
+            if order_id in self._latest:
+                queue.put_nowait(self._latest[order_id])
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._run())
+
+        pending = set(order_ids)
+        try:
+            while pending:
+                order: StandardOrder = await queue.get()
+                if order.status in TERMINAL_ORDER_STATUSES:
+                    pending.discard(order.order_id)
+                yield order
+        finally:
+            for order_id in order_ids:
+                subscribers = self._subscribers.get(order_id, set())
+                subscribers.discard(queue)
+                if not subscribers:
+                    self._subscribers.pop(order_id, None)
+                    self._latest.pop(order_id, None)
+            if not self._subscribers and self._poller is not None:
+                self._poller.cancel()
+                self._poller = None
+
+    async def poll(self) -> int:
+        """
+        Fetch every watched order that may still change once, and publish those that changed.
+
+        :return: Number of orders fetched
+        """
+        order_ids = [
+            i for i in self._subscribers
+            if i not in self._latest or self._latest[i].status not in TERMINAL_ORDER_STATUSES
+        ]
+        changed = []
+        for order_id, order in zip(order_ids, await _recheck_orders(self._service, order_ids, return_exceptions=True)):
+            if isinstance(order, BaseException):
+                logger.warning("Could not poll order %s: %s", order_id, order)
+                continue
+            if self._latest.get(order_id) == order or order_id not in self._subscribers:
+                continue
+            self._latest[order_id] = order
+            changed.append(order)
+            for queue in self._subscribers[order_id]:
+                queue.put_nowait(order)
+
+        self._service.order_store.upsert(changed)
+        return len(order_ids)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Order status poll failed")
+            await asyncio.sleep(self.interval)
+
+
+def fetch_synced_orders(
+    schwab_service: SchwabService,
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+    max_results: Optional[int] = None,
+    status: Optional[OrderStatus] = None,
+) -> Optional[List[StandardOrder]]:
+    """
+    Orders from the service's order store, with the same defaults as fetch_orders.
+
+    :param schwab_service: Instantiated Schwab service
+    :param start_date: Start date for filtering orders
+    :param end_date: End date for filtering orders
+    :param max_results: Maximum number of orders to retrieve
+    :param status: Status of orders to filter by
+    :return: Matching orders, or None if the store has not been synced back to start_date
+    """
+    start_date = start_date or (datetime.datetime.now() - INITIAL_SYNC_WINDOW)
+    if not schwab_service.order_store.covers(start_date):
+        return None
+    return schwab_service.order_store.query(start_date, end_date, max_results, status)
+
+
+async def sync_transactions(schwab_service: SchwabService, start_date: Optional[datetime.datetime] = None) -> int:
+    """
+    Bring the service's transaction ledger up to date. An empty ledger is backfilled for ledger_backfill_days,
+    afterwards only transactions since the latest one in the ledger are requested from Schwab.
+
+    :param schwab_service: Instantiated Schwab service
+    :param start_date: Also backfill the ledger back to this time if it does not cover it yet
+    :return: Number of transactions written to the ledger
+    """
+    ledger = schwab_service.transaction_ledger
+    async with schwab_service.transaction_sync_lock:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        high_water_mark = ledger.high_water_mark
+        if high_water_mark is None:
+            window_start = now - datetime.timedelta(days=schwab_service.ledger_backfill_days)
+        else:
+            window_start = min(high_water_mark - SYNC_OVERLAP, now)
+        if start_date is not None and not ledger.covers(start_date):
+            window_start = min(window_start, as_aware(start_date))
+
+        written = 0
+        chunk_start = window_start
+        while chunk_start < now:
+            chunk_end = min(chunk_start + MAX_TRANSACTION_WINDOW, now)
+            resp = await schwab_service.async_client.transactions(
+                accountHash=schwab_service.account_hash,
+                startDate=chunk_start,
+                endDate=chunk_end,
+                types=list(get_args(TransactionType)),
+            )
+            decoded_resp = msgspec.json.decode(resp.content, type=List[schwab_response.Transaction])
+            written += await asyncio.to_thread(ledger.ingest, decoded_resp)
+            chunk_start = chunk_end
+
+        ledger.mark_synced(window_start)
+        return written
+
+
+async def fetch_ledger_transactions(
+    schwab_service: SchwabService,
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+    types: Optional[List[TransactionType]] = None,
+    symbols: Optional[List[str]] = None,
+    sync: bool = False,
+) -> Optional[List[Transaction]]:
+    """
+    Transactions from the service's ledger, with the same defaults as fetch_transactions. The query runs in a worker
+    thread since it may cover years of history.
+
+    :param schwab_service: Instantiated Schwab service
+    :param start_date: Start date for filtering transactions
+    :param end_date: End date for filtering transactions
+    :param types: List of transaction types to filter by
+    :param symbols: List of transfer item symbols to filter by
+    :param sync: Sync the ledger back to start_date first if it does not cover it yet
+    :return: Matching transactions, or None if the ledger has not been synced back to start_date
+    """
+    start_date = start_date or (datetime.datetime.now() - INITIAL_SYNC_WINDOW)
+    if not schwab_service.transaction_ledger.covers(start_date):
+        if not sync:
+            return None
+        await sync_transactions(schwab_service, start_date)
+    return await asyncio.to_thread(schwab_service.transaction_ledger.query, start_date, end_date, types, symbols)
+
+
+async def stream_quotes(schwab_service: SchwabService):
+    """
+    Stream quotes into the service's quote book until cancelled or the source fails. Held positions are subscribed
+    when the stream starts, other symbols are subscribed by fetch_quotes the first time they are requested.
+
+    :param schwab_service: Instantiated Schwab service
+    """
+    source = schwab_service.create_quote_source()
+    book = schwab_service.quote_book
+    await source.start()
+    schwab_service.quote_source = source
+    book.live = True
+    try:
+        try:
+            await source.subscribe((await fetch_positions_snapshot(schwab_service)).symbols)
+        except Exception:
+            logger.exception("Could not subscribe held positions to the quote stream")
+
+        async for batch in source.updates():
+            for symbol, fields in batch:
+                book.apply(symbol, fields)
+    finally:
+        book.live = False
+        schwab_service.quote_source = None
+        book.clear()
+        await source.stop()
+
+
+async def run_quote_stream(schwab_service: SchwabService, retry: float = QUOTE_STREAM_RETRY):
+    """
+    Keep the quote stream running until cancelled. Failures are logged and the stream is restarted after retry
+    seconds, with quotes served by REST in the meantime.
+
+    :param schwab_service: Instantiated Schwab service
+    :param retry: Seconds to wait before restarting a failed stream
+    """
+    with background_priority():
+        while True:
+            try:
+                await stream_quotes(schwab_service)
+            except Exception:
+                logger.exception("Quote stream failed")
+            await asyncio.sleep(retry)
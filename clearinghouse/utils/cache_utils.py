@@ -0,0 +1,181 @@
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+from concurrent.futures import Future
+import asyncio
+import threading
+import time
+
+from cachetools import TTLCache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CoalescingTTLCache:
+    """
+    Thread-safe LRU cache where every entry expires a fixed time after it was loaded.
+
+    Concurrent misses for the same key are coalesced: the first caller loads it and every other caller
+    waits on that load instead of making its own call. Misses within one call are loaded together.
+    Invalidating a key also discards a load of it that is in flight, so callers arriving after the invalidation
+    start a new load and the discarded load's value is not cached.
+
+    Attributes:
+        ttl (float): Seconds an entry stays fresh after being loaded.
+        maxsize (int): Maximum number of entries before the least recently used one is evicted.
+        hits (int): Lookups served from the cache.
+        misses (int): Lookups that triggered a load.
+        coalesced (int): Lookups that waited on another caller's load.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: K, loader: Callable[[K], Optional[V]]) -> Optional[V]:
+        """
+        Return the cached value for a key, loading it with loader(key) on a miss.
+        """
+        return self.get_many([key], lambda keys: {keys[0]: loader(keys[0])}).get(key)
+
+    def get_many(self, keys: Iterable[K], loader: Callable[[List[K]], Dict[K, V]]) -> Dict[K, V]:
+        """
+        Return cached values for the keys, loading every missing key in a single loader call.
+        Keys that the loader does not return are omitted from the result and are not cached.
+
+        :param keys: Keys to look up
+        :param loader: Callable taking the list of missing keys and returning a dict of loaded values
+        :return: Dictionary of key to value, in the order the keys were requested
+        """
+        keys = list(dict.fromkeys(keys))
+        found, waiting, claimed = self._claim(keys)
+
+        if claimed:
+            try:
+                loaded = loader(list(claimed))
+            except BaseException as e:
+                self._fail(claimed, e)
+                raise
+            found.update(self._complete(claimed, loaded))
+
+        for key, future in waiting.items():
+            found[key] = future.result()
+
+        return {key: found[key] for key in keys if found.get(key) is not None}
+
+    async def aget_many(self, keys: Iterable[K], loader: Callable[[List[K]], Awaitable[Dict[K, V]]]) -> Dict[K, V]:
+        """
+        Async version of get_many for a coroutine loader. Loads started by threads or other tasks are awaited
+        without blocking the event loop.
+        """
+        keys = list(dict.fromkeys(keys))
+        found, waiting, claimed = self._claim(keys)
+
+        if claimed:
+            try:
+                loaded = await loader(list(claimed))
+            except BaseException as e:
+                self._fail(claimed, e)
+                raise
+            found.update(self._complete(claimed, loaded))
+
+        for key, future in waiting.items():
+            found[key] = await asyncio.wrap_future(future)
+
+        return {key: found[key] for key in keys if found.get(key) is not None}
+
+    async def aget(self, key: K, loader: Callable[[K], Awaitable[Optional[V]]]) -> Optional[V]:
+        """
+        Async version of get for a coroutine loader.
+        """
+        async def load(keys: List[K]) -> Dict[K, V]:
+            return {keys[0]: await loader(keys[0])}
+
+        return (await self.aget_many([key], load)).get(key)
+
+    def peek(self, key: K) -> Optional[V]:
+        """
+        :return: Cached value of the key without loading it or counting a lookup, None if not cached
+        """
+        with self._lock:
+            return self._cache.get(key)
+
+    def _claim(self, keys: List[K]) -> Tuple[Dict[K, V], Dict[K, Future], Dict[K, Future]]:
+        """
+        Split keys into cached values, loads already in flight, and keys this caller now has to load, with the
+        futures it has to complete.
+        """
+        found: Dict[K, V] = {}
+        waiting: Dict[K, Future] = {}
+        claimed: Dict[K, Future] = {}
+
+        with self._lock:
+            for key in keys:
+                try:
+                    found[key] = self._cache[key]
+                    self.hits += 1
+                    continue
+                except KeyError:
+                    pass
+
+                if key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    self.coalesced += 1
+                else:
+                    claimed[key] = self._in_flight[key] = Future()
+                    self.misses += 1
+
+        return found, waiting, claimed
+
+    def _complete(self, claimed: Dict[K, Future], loaded: Dict[K, V]) -> Dict[K, V]:
+        """
+        Store loaded values, unless invalidated while loading, and release any callers waiting on them.
+        """
+        with self._lock:
+            for key, future in claimed.items():
+                value = loaded.get(key)
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                    if value is not None:
+                        self._cache[key] = value
+                future.set_result(value)
+        return {key: loaded[key] for key in claimed if loaded.get(key) is not None}
+
+    def _fail(self, claimed: Dict[K, Future], error: BaseException):
+        with self._lock:
+            for key, future in claimed.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+                future.set_exception(error)
+
+    def invalidate(self, key: Optional[K] = None):
+        """
+        Drop one key from the cache, or every key if none is given, along with loads of them in flight.
+        """
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+                self._in_flight.clear()
+            else:
+                self._cache.pop(key, None)
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Counters for tuning the cache size and TTL.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Callable, Collection, Generic, Iterable, Iterator, List, Optional, TypeVar
+
+from clearinghouse.models.request import PositionsFilter, OrdersFilter, TransactionsFilter
+from clearinghouse.utils.store_utils import as_aware
+
+"""
+Compile request filters into a single predicate per request instead of evaluating every clause per row.
+Inactive clauses are dropped at compile time, and clauses already applied upstream (by Schwab, the order store or
+the transaction ledger) can be skipped by naming their filter fields in pushed_down.
+"""
+
+T = TypeVar("T")
+Clause = Callable[[Any], bool]
+
+
+@dataclass(frozen=True)
+class CompiledFilter(Generic[T]):
+    predicate: Optional[Callable[[T], bool]] = None
+
+    def apply(self, data: Iterable[T]) -> Iterator[T]:
+        return iter(data) if self.predicate is None else filter(self.predicate, data)
+
+
+def _combine(clauses: List[Clause]) -> CompiledFilter:
+    if not clauses:
+        return CompiledFilter()
+    if len(clauses) == 1:
+        return CompiledFilter(clauses[0])
+    if len(clauses) == 2:
+        first, second = clauses
+        return CompiledFilter(lambda item: first(item) and second(item))
+
+    def predicate(item) -> bool:
+        for clause in clauses:
+            if not clause(item):
+                return False
+        return True
+
+    return CompiledFilter(predicate)
+
+
+def _membership(attribute: str, values: Iterable[str]) -> Clause:
+    get = attrgetter(attribute)
+    allowed = frozenset(values)
+    if len(allowed) == 1:
+        (value,) = allowed
+        return lambda item: get(item) == value
+    return lambda item: get(item) in allowed
+
+
+def _overlap(attribute: str, values: Iterable[str]) -> Clause:
+    get = attrgetter(attribute)
+    allowed = frozenset(values)
+    return lambda item: not allowed.isdisjoint(get(item))
+
+
+def compile_positions_filter(filter_request: PositionsFilter, pushed_down: Collection[str] = ()) -> CompiledFilter:
+    """
+    :param filter_request: Filtering criteria
+    :param pushed_down: Names of filter fields that were already applied to the data
+    :return: Filter keeping the positions matching all active criteria
+    """
+    clauses = []
+    if filter_request.asset_types and "asset_types" not in pushed_down:
+        clauses.append(_membership("asset_type", filter_request.asset_types))
+    if not filter_request.shorts and "shorts" not in pushed_down:
+        clauses.append(lambda p: p.quantity >= 0)
+    if not filter_request.longs and "longs" not in pushed_down:
+        clauses.append(lambda p: p.quantity <= 0)
+    if filter_request.min_position_size is not None and "min_position_size" not in pushed_down:
+        min_size = filter_request.min_position_size
+        clauses.append(lambda p: p.market_value >= min_size)
+    if filter_request.max_position_size is not None and "max_position_size" not in pushed_down:
+        max_size = filter_request.max_position_size
+        clauses.append(lambda p: p.market_value <= max_size)
+    if filter_request.symbols and "symbols" not in pushed_down:
+        clauses.append(_membership("symbol", filter_request.symbols))
+    return _combine(clauses)
+
+
+def compile_orders_filter(filter_request: OrdersFilter, pushed_down: Collection[str] = ()) -> CompiledFilter:
+    """
+    The date range and status are always applied upstream, by Schwab or the order store, and so is the result limit
+    unless symbols are filtered here. Orders match symbols if any of their legs does.
+
+    :param filter_request: Filtering criteria
+    :param pushed_down: Names of filter fields that were already applied to the data
+    :return: Filter keeping the orders matching all active criteria
+    """
+    clauses = []
+    if filter_request.symbols and "symbols" not in pushed_down:
+        clauses.append(_overlap("symbols", filter_request.symbols))
+    return _combine(clauses)
+
+
+def compile_transactions_filter(filter_request: TransactionsFilter, pushed_down: Collection[str] = ()) -> CompiledFilter:
+    """
+    Symbols can only be filtered by the transaction ledger, so they are never applied here.
+
+    :param filter_request: Filtering criteria
+    :param pushed_down: Names of filter fields that were already applied to the data
+    :return: Filter keeping the transactions matching all active criteria
+    """
+    clauses = []
+    if filter_request.types and "types" not in pushed_down:
+        clauses.append(_membership("type", filter_request.types))
+    # Transaction times from Schwab are timezone aware, naive bounds are local time like in the stores
+    start_date = filter_request.start_date if "start_date" not in pushed_down else None
+    end_date = filter_request.end_date if "end_date" not in pushed_down else None
+    if start_date and end_date:
+        start_date, end_date = as_aware(start_date), as_aware(end_date)
+        clauses.append(lambda t: start_date <= t.time <= end_date)
+    elif start_date:
+        start_date = as_aware(start_date)
+        clauses.append(lambda t: t.time >= start_date)
+    elif end_date:
+        end_date = as_aware(end_date)
+        clauses.append(lambda t: t.time <= end_date)
+    return _combine(clauses)
@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import random
+import time
+
+"""
+Interval jobs run in the background of the event loop, with jitter, per-job health and a swappable clock.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """
+    Monotonic time and sleeping, on the real clock.
+    """
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class ManualClock(Clock):
+    """
+    Stand-in clock that only moves when advanced, for local mode and testing. Sleepers wake up once the clock has
+    been advanced past their deadline.
+    """
+
+    # Real seconds a woken sleeper gets to reach its next sleep
+    settle_timeout = 1.0
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._sleepers: List = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + max(0.0, seconds), next(self._seq), future))
+        await future
+
+    async def advance(self, seconds: float):
+        """
+        Move the clock forward, waking the sleepers in deadline order and letting each one run before the next.
+
+        :param seconds: Seconds to move forward
+        """
+        target = self.now + seconds
+        # Let tasks that were just created reach their first sleep
+        await asyncio.sleep(0)
+        while self._sleepers and self._sleepers[0][0] <= target:
+            sleeping = len(self._sleepers)
+            deadline, _, future = heapq.heappop(self._sleepers)
+            self.now = max(self.now, deadline)
+            if not future.done():
+                future.set_result(None)
+            await self._settle(sleeping)
+        self.now = target
+
+    async def _settle(self, sleeping: int):
+        # Let the woken sleeper run until it sleeps again, including work it hands to threads, within settle_timeout
+        settle_by = time.monotonic() + self.settle_timeout
+        await asyncio.sleep(0)
+        while len(self._sleepers) < sleeping and time.monotonic() < settle_by:
+            await asyncio.sleep(0.001)
+
+
+@dataclass
+class MaintenanceJob:
+    """
+    Attributes:
+        name (str): Name the job's health is reported under.
+        run (Callable): Coroutine function doing one run of the job.
+        interval (float): Seconds between runs.
+        jitter (float): Fraction of the interval by which each wait is randomly shortened or lengthened, so jobs
+            of many processes (or of one process started together) do not call Schwab in lockstep.
+        retry_interval (float): Seconds before running again after a failed run, defaults to interval.
+        run_at_start (bool): Whether to run right away rather than after the first interval.
+        timeout (float): Seconds a run may take before it is cancelled and counted as failed.
+    """
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    interval: float
+    jitter: float = 0.1
+    retry_interval: Optional[float] = None
+    run_at_start: bool = True
+    timeout: Optional[float] = None
+
+
+@dataclass
+class JobHealth:
+    runs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_run: Optional[float] = None
+    last_success: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run: Optional[float] = None
+
+
+class MaintenanceRunner:
+    """
+    Runs every job on its interval in its own task until stopped. Runs are awaited on the event loop, so jobs
+    that block must hand their work to a thread themselves. A failed or timed out run is logged and recorded in
+    the job's health, and the job carries on.
+
+    A job is healthy while its last run succeeded or it has failed fewer than max_failures times in a row.
+    """
+
+    def __init__(
+        self,
+        jobs: List[MaintenanceJob],
+        clock: Optional[Clock] = None,
+        max_failures: int = 3,
+        rng: Callable[[], float] = random.random,
+    ):
+        """
+        :param jobs: Jobs to run
+        :param clock: Clock the intervals are measured on, the real clock by default
+        :param max_failures: Consecutive failures after which a job is reported unhealthy
+        :param rng: Source of uniform numbers in [0, 1) for the jitter
+        """
+        self.jobs = {job.name: job for job in jobs}
+        self.clock = clock or Clock()
+        self.max_failures = max_failures
+        self._rng = rng
+        self._health: Dict[str, JobHealth] = {job.name: JobHealth() for job in jobs}
+        self._tasks: List[asyncio.Task] = []
+
+    def _wait(self, job: MaintenanceJob, failed: bool = False) -> float:
+        interval = job.retry_interval if failed and job.retry_interval is not None else job.interval
+        return max(0.0, interval * (1 + job.jitter * (2 * self._rng() - 1)))
+
+    async def run_once(self, name: str) -> bool:
+        """
+        Run a job now, recording its health.
+
+        :param name: Name of the job
+        :return: Whether the run succeeded
+        """
+        job = self.jobs[name]
+        health = self._health[name]
+        started_at = self.clock.time()
+        health.runs += 1
+        health.last_run = started_at
+        try:
+            await asyncio.wait_for(job.run(), timeout=job.timeout)
+        except Exception as e:
+            logger.exception("Maintenance job %s failed", name)
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = f"{type(e).__name__}: {e}"
+            return False
+        finally:
+            health.last_duration = self.clock.time() - started_at
+        health.consecutive_failures = 0
+        health.last_success = self.clock.time()
+        return True
+
+    async def _run_job(self, job: MaintenanceJob):
+        health = self._health[job.name]
+        wait = 0.0 if job.run_at_start else self._wait(job)
+        while True:
+            health.next_run = self.clock.time() + wait
+            await self.clock.sleep(wait)
+            succeeded = await self.run_once(job.name)
+            wait = self._wait(job, failed=not succeeded)
+
+    def start(self):
+        """
+        Start a task per job, if not started yet.
+        """
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run_job(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def is_healthy(self, name: str) -> bool:
+        return self._health[name].consecutive_failures < self.max_failures
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: Health of every job by name, with the last run, last success and next run as UTC datetimes and
+            the last duration in seconds
+        """
+        # Wall-clock time at which the runner's clock read zero, to convert its monotonic times
+        origin = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.clock.time())
+
+        def wall_time(t: Optional[float]) -> Optional[datetime.datetime]:
+            return origin + datetime.timedelta(seconds=t) if t is not None else None
+
+        return {
+            name: {
+                "healthy": self.is_healthy(name),
+                **vars(health),
+                "last_run": wall_time(health.last_run),
+                "last_success": wall_time(health.last_success),
+                "next_run": wall_time(health.next_run),
+            }
+            for name, health in self._health.items()
+        }
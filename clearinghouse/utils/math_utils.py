@@ -1,6 +1,8 @@
-from typing import List, Tuple
+from typing import List, Tuple, Sequence
 import math
 
+import numpy as np
+
 def calculate_rmse(pairs: List[Tuple[float,float]]) -> float:
     """
     Calculate the Root Mean Squared Error (RMSE) between two float values.
@@ -13,3 +15,48 @@ def calculate_rmse(pairs: List[Tuple[float,float]]) -> float:
     """
     squares = sum([(t - v) ** 2 for t,v in pairs])
     return math.sqrt(squares/len(pairs))
+
+
+def pad_options(options: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Stack a ragged list of per-symbol options into a 2D array, padding missing options with NaN.
+
+    Args:
+        options: Options for each symbol, e.g. [(80, 130), (100,)]
+
+    Returns:
+        np.ndarray: Array of shape (symbols, max options)
+    """
+    width = max((len(opts) for opts in options), default=0)
+    padded = np.full((len(options), width), np.nan)
+    for k, opts in enumerate(options):
+        padded[k, :len(opts)] = opts
+    return padded
+
+
+def calculate_rmse_batch(
+        targets: np.ndarray,
+        option_values: np.ndarray,
+        candidates: np.ndarray,
+        capital_cap: float = float('inf'),
+) -> np.ndarray:
+    """
+    Calculate the RMSE of many candidate option choices in one vectorized pass.
+
+    Args:
+        targets: Array of shape (symbols,) with the target value of each symbol.
+        option_values: Array of shape (symbols, options) as built by pad_options.
+        candidates: Integer array of shape (batch, symbols), each row choosing one option index per symbol.
+        capital_cap: Candidates whose chosen values total more than this are scored as infinite.
+
+    Returns:
+        np.ndarray: Array of shape (batch,) with the RMSE of each candidate. Candidates over the cap or
+            choosing a padded option are infinite.
+    """
+    candidates = np.atleast_2d(candidates)
+    chosen = option_values[np.arange(option_values.shape[0]), candidates]
+
+    rmse = np.sqrt(((chosen - targets) ** 2).sum(axis=1) / chosen.shape[1])
+    capital = chosen.sum(axis=1)
+    rmse[np.isnan(capital) | (capital > capital_cap)] = np.inf
+    return rmse
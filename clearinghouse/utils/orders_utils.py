@@ -1,10 +1,14 @@
-from typing import List, Optional, Dict, Tuple
-from itertools import product
+from typing import List, Optional, Dict, Tuple, Iterator
+from bisect import bisect_left
+import math
+
+import numpy as np
 
 from clearinghouse.models.request import (
-    NumericalOrder
+    NumericalOrder,
+    FractionalOrder,
 )
-from clearinghouse.utils.math_utils import calculate_rmse
+from clearinghouse.utils.math_utils import pad_options, calculate_rmse_batch
 
 DEFAULT_INSTRUCTION_ORDER = [
     "SELL",
@@ -41,14 +45,123 @@ def sort_orders(
     )
 
 
+def _rebalance_legs(current: float, target: float) -> List[Tuple[str, float]]:
+    """
+    Instructions and quantities moving a signed position from current to target. Crossing zero takes two legs,
+    closing the current position before opening the opposite one.
+    """
+    if current >= 0 and target >= 0:
+        return [("BUY" if target > current else "SELL", abs(target - current))]
+    if current <= 0 and target <= 0:
+        return [("SELL_SHORT" if target < current else "BUY_TO_COVER", abs(target - current))]
+    if current > 0:
+        return [("SELL", current), ("SELL_SHORT", -target)]
+    return [("BUY_TO_COVER", -current), ("BUY", target)]
+
+
+def plan_rebalance(
+        orders: List[FractionalOrder],
+        current_quantities: Dict[str, float],
+        prices: Dict[str, float],
+        account_value: float,
+        capital_cap: Optional[float] = None,
+        relative_gap: float = 0.0,
+) -> List[NumericalOrder]:
+    """
+    Realize fractional targets into the minimal set of numerical orders. Every target is rounded to a whole share
+    count with find_order_minimum_error, so that the resulting position values are as close to the targets as
+    possible without their total exceeding the capital cap. A symbol whose rounded target is its current quantity
+    gets no order, and a position that has to cross zero gets a closing and an opening order.
+
+    example:
+    account_value=10_000, AAPL at 150 with 10 shares held, target fraction 0.3
+    ->
+    [NumericalOrder(symbol="AAPL", instruction="BUY", quantity=10, ...)]
+
+    :param orders: Fractional targets, negative fractions for short positions. Later targets for the same symbol win.
+    :param current_quantities: Signed quantity currently held per symbol, missing symbols are not held
+    :param prices: Share price per symbol, required for every target
+    :param account_value: Account value the fractions are relative to
+    :param capital_cap: Max total value of the targeted positions. Defaults to the total of the target values.
+    :param relative_gap: Passed to find_order_minimum_error
+    :return: Numerical orders sorted with sort_orders, so sells come before buys
+    """
+    targets: Dict[str, FractionalOrder] = {order.symbol: order for order in orders}
+    if not targets:
+        return []
+
+    symbols = list(targets)
+    missing = [s for s in symbols if not prices.get(s) or prices[s] <= 0]
+    if missing:
+        raise ValueError(f"No price available for symbols: {', '.join(missing)}")
+
+    # Round every target to the share counts on either side of it, for the whole basket at once
+    price = np.array([prices[s] for s in symbols], dtype=float)
+    current = np.array([current_quantities.get(s, 0.0) for s in symbols], dtype=float)
+    target_values = np.array([targets[s].fraction for s in symbols], dtype=float) * account_value
+    exact = target_values / price
+    lower, upper = np.floor(exact), np.ceil(exact)
+    if capital_cap is None:
+        capital_cap = float(target_values.sum())
+
+    order_options: Dict[str, Tuple[float, Tuple[float, ...]]] = {}
+    quantity_options: Dict[str, Tuple[float, ...]] = {}
+    for s, p, c, target, low, high in zip(
+            symbols, price.tolist(), current.tolist(), target_values.tolist(), lower.tolist(), upper.tolist()):
+        # The current quantity goes first when it is a candidate, so ties keep the position as it is
+        quantities = (c,) + tuple(q for q in (low, high) if q != c) if c in (low, high) else tuple(dict.fromkeys((low, high)))
+        quantity_options[s] = quantities
+        order_options[s] = (target, tuple(q * p for q in quantities))
+
+    choice = find_order_minimum_error(order_options, capital_cap=capital_cap, relative_gap=relative_gap)
+    if not choice:
+        raise ValueError("No whole share rounding of the targets fits the capital cap.")
+
+    numerical_orders = []
+    for s in symbols:
+        target_quantity = quantity_options[s][choice[s]]
+        current_quantity = current_quantities.get(s, 0.0)
+        if target_quantity == current_quantity:
+            continue
+        order = targets[s]
+        numerical_orders.extend(
+            NumericalOrder(
+                symbol=s,
+                **({"price": order.price} if order.price is not None else {}),
+                order_type=order.order_type,
+                duration=order.duration,
+                asset_type=order.asset_type,
+                session=order.session,
+                strategy_type=order.strategy_type,
+                instruction=instruction,
+                quantity=quantity,
+            )
+            for instruction, quantity in _rebalance_legs(current_quantity, target_quantity)
+        )
+
+    return sort_orders(numerical_orders)
+
+
 def find_order_minimum_error(
-        order_options: Dict[str, Tuple[float, Tuple[float, float]]],
+        order_options: Dict[str, Tuple[float, Tuple[float, ...]]],
         capital_cap: Optional[float] = float('inf'),
+        relative_gap: float = 0.0,
+        max_nodes: Optional[int] = 500_000,
 ) -> Dict[str, int]:
 
     """
-    Calculate permutations of options for each symbol and track the original choice by index.
-    The input options are intended to be total position size.
+    Choose one option per symbol so that the RMSE between targets and chosen options is minimized without the
+    total of the chosen options exceeding the capital cap. The input options are intended to be total position size.
+
+    Uses a branch-and-bound search rather than enumerating every permutation. With the default relative_gap of 0
+    the result is identical to an exhaustive search (ties go to the lowest option indices). A positive relative_gap
+    enables the approximate mode: the search stops refining once no branch can improve the squared error by more
+    than that fraction, so the returned squared error is at most (1 + relative_gap) times the optimum.
+
+    If the search visits more than max_nodes branches the candidate space is treated as too big for an exact answer:
+    the best choice found so far is improved with a vectorized local search (see calculate_rmse_batch) and returned.
+    The result is then no longer guaranteed to be optimal, even with a relative_gap of 0, so with the default
+    max_nodes large inputs may get an approximate answer. Pass max_nodes=None to always get the exact one.
 
     example:
     {
@@ -57,42 +170,264 @@ def find_order_minimum_error(
     "C": (80, (79, 140))
     }
     ->
-    {"A": 0, "B": 0, "C": 1}
+    {"A": 0, "B": 0, "C": 0}
 
 
     :param order_options: Dictionary with symbols as keys and tuples of (target, options) as values.
     :param capital_cap: The max amount of money to spend in this transaction
-    :return: List of dictionaries mapping symbols to indices of chosen options.
+    :param relative_gap: Allowed relative excess of the squared error over the optimum. 0 for an exact answer.
+    :param max_nodes: Branch budget for the exact search before falling back to local search. None for no limit.
+    :return: Dictionary mapping symbols to indices of chosen options. Empty if no choice fits the cap.
     """
     if not order_options:
         return {}
 
-    # Generate all permutations of indices for the options
-    # e.g. [(0, 0, 0), (0, 0, 1), (1, 0, 0), (1, 0, 1)]
+    if relative_gap < 0:
+        raise ValueError("Relative gap cannot be negative.")
+
     symbol_keys = list(order_options.keys())
-    index_permutations = list(product(*[range(len(options)) for _, options in order_options.values()]))
-    best_permutation = None
-    smallest_rmse = float('inf')
+    targets = [target for target, _ in order_options.values()]
+    options = [tuple(opts) for _, opts in order_options.values()]
+
+    if any(not opts for opts in options):
+        return {}
+
+    best_choice = _solve_branch_and_bound(targets, options, capital_cap, relative_gap, max_nodes)
+    if not best_choice:
+        return {}
+
+    return {symbol_keys[k]: idx for k, idx in enumerate(best_choice)}
+
+
+def _lower_hull_increments(points: List[Tuple[float, float, int]]) -> List[Tuple[float, float, int]]:
+    """
+    Build the convex, non-decreasing lower envelope of (capital reduction, added squared error, option index)
+    points starting at (0, 0) and return it as a list of (reduction, error, option index) segment increments.
+    """
+    # Drop points where another point reduces capital at least as much for no more error
+    pareto: List[Tuple[float, float, int]] = []
+    for x, y, j in sorted(points, key=lambda p: (-p[0], p[1], p[2])):
+        if not pareto or y < pareto[-1][1]:
+            pareto.append((x, y, j))
+    pareto.reverse()
+
+    hull = [(0.0, 0.0, -1)]
+    for x, y, j in pareto:
+        if x <= 0:
+            continue
+        while len(hull) >= 2:
+            (x1, y1, _), (x2, y2, _) = hull[-2], hull[-1]
+            if (y2 - y1) * (x - x1) >= (y - y1) * (x2 - x1):
+                hull.pop()
+            else:
+                break
+        hull.append((x, y, j))
+
+    return [(x2 - x1, y2 - y1, j) for (x1, y1, _), (x2, y2, j) in zip(hull, hull[1:])]
+
 
-    for indices in index_permutations:
-        pairs = []
+def _solve_branch_and_bound(
+        targets: List[float],
+        options: List[Tuple[float, ...]],
+        capital_cap: float,
+        relative_gap: float = 0.0,
+        max_nodes: Optional[int] = None,
+) -> Optional[Tuple[int, ...]]:
+    """
+    Depth-first branch-and-bound over the option indices. Each branch is bounded by the linear relaxation
+    of the remaining multiple-choice knapsack, and the search starts from the rounded relaxation as an incumbent,
+    so only branches that could still beat (or tie) the best choice found so far are explored.
+    Once max_nodes branches have been visited, the best choice so far is handed to the local search instead.
+    """
+    n = len(targets)
+    errors = [[(t - o) ** 2 for o in opts] for t, opts in zip(targets, options)]
+
+    def evaluate(choice: Tuple[int, ...]) -> Tuple[float, float]:
+        # Same float operations as the exhaustive search so that ties resolve identically
+        squares = sum([errors[k][idx] for k, idx in enumerate(choice)])
         capital_value = 0
+        for k, idx in enumerate(choice):
+            capital_value += options[k][idx]
+        return squares, capital_value
+
+    # Unconstrained optimum: the first minimum-error option for every symbol
+    greedy = tuple(min(range(len(e)), key=e.__getitem__) for e in errors)
+    if evaluate(greedy)[1] <= capital_cap:
+        return greedy
+
+    # Per-symbol base option (min error, cheapest on ties) and its relaxed cost-reduction increments
+    base, increments = [], []
+    for opts, errs in zip(options, errors):
+        s = min(range(len(opts)), key=lambda j: (errs[j], opts[j]))
+        base.append(s)
+        increments.append(_lower_hull_increments(
+            [(opts[s] - o, e - errs[s], j) for j, (o, e) in enumerate(zip(opts, errs)) if o < opts[s]]
+        ))
+
+    # Branch on the symbols with the most error at stake first; leaves are still evaluated in input order
+    order = sorted(range(n), key=lambda k: -sum(dy for _, dy, _ in increments[k]))
+
+    # Suffix aggregates for the bound at each depth of the search order
+    suffix_errors = [0.0] * (n + 1)
+    suffix_costs = [0.0] * (n + 1)
+    suffix_min_costs = [0.0] * (n + 1)
+    suffix_steps: List[Tuple[List[float], List[float], List[float]]] = [([], [], [])] * (n + 1)
+    steps: List[Tuple[float, float]] = []
+    for depth in range(n - 1, -1, -1):
+        k = order[depth]
+        suffix_errors[depth] = suffix_errors[depth + 1] + errors[k][base[k]]
+        suffix_costs[depth] = suffix_costs[depth + 1] + options[k][base[k]]
+        suffix_min_costs[depth] = suffix_min_costs[depth + 1] + min(options[k])
+
+        steps = sorted(steps + [(dy / dx, dx) for dx, dy, _ in increments[k]])
+        cum_dx, cum_dy, slopes = [], [], []
+        total_dx, total_dy = 0.0, 0.0
+        for slope, dx in steps:
+            total_dx += dx
+            total_dy += slope * dx
+            cum_dx.append(total_dx)
+            cum_dy.append(total_dy)
+            slopes.append(slope)
+        suffix_steps[depth] = (cum_dx, cum_dy, slopes)
+
+    def tolerance(value: float) -> float:
+        return 1e-9 * max(1.0, abs(value))
+
+    def lower_bound(depth: int, capital: float) -> float:
+        """Minimum added squared error for the symbols from this depth on, given the capital already committed."""
+        if capital + suffix_min_costs[depth] > capital_cap + tolerance(capital_cap):
+            return float('inf')
+
+        reduction = suffix_costs[depth] - (capital_cap - capital)
+        if reduction <= 0:
+            return suffix_errors[depth]
+
+        cum_dx, cum_dy, slopes = suffix_steps[depth]
+        i = bisect_left(cum_dx, reduction)
+        if i == len(cum_dx):
+            return suffix_errors[depth] + (cum_dy[-1] if cum_dy else 0.0)
+        prev_dx = cum_dx[i - 1] if i else 0.0
+        prev_dy = cum_dy[i - 1] if i else 0.0
+        return suffix_errors[depth] + prev_dy + slopes[i] * (reduction - prev_dx)
 
-        for k, idx in enumerate(indices):
-            target, options = order_options[symbol_keys[k]]
-            pairs.append((target, options[idx]))
-            capital_value += options[idx]
+    best_error = float('inf')
+    best_rmse = float('inf')
+    best_choice: Optional[Tuple[int, ...]] = None
 
-        # Discard permutations that exceed the cap
+    def consider(choice: Tuple[int, ...]):
+        nonlocal best_error, best_rmse, best_choice
+        squares, capital_value = evaluate(choice)
         if capital_value > capital_cap:
-            continue
+            return
+        rmse = math.sqrt(squares / n)
+        if rmse < best_rmse or (rmse == best_rmse and choice < best_choice):
+            best_error, best_rmse, best_choice = squares, rmse, choice
 
-        rmse = calculate_rmse(pairs)
-        if rmse < smallest_rmse:
-            smallest_rmse = rmse
-            best_permutation = indices
+    # Incumbent: walk the relaxation's increments by slope until the cap is met, taking the last one whole
+    incumbent = list(base)
+    reduction = sum(options[k][base[k]] for k in range(n)) - capital_cap
+    for _, dx, k, j in sorted((dy / dx, dx, k, j) for k in range(n) for dx, dy, j in increments[k]):
+        if reduction <= 0:
+            break
+        incumbent[k] = j
+        reduction -= dx
+    consider(tuple(incumbent))
 
-    if not best_permutation:
-        return {}
+    ranked = [sorted(range(len(e)), key=lambda j, e=e: (e[j], j)) for e in errors]
+    chosen = list(base)
+
+    # Iterative depth-first search; each frame holds the remaining candidate options for its symbol
+    stack = [(0, 0.0, 0.0, iter(ranked[order[0]]))]
+    nodes = 0
+    while stack:
+        depth, error, capital, candidates = stack[-1]
+        k = order[depth]
+        for j in candidates:
+            nodes += 1
+            if max_nodes is not None and nodes > max_nodes:
+                return _refine_with_local_search(targets, options, capital_cap, best_choice)
+            next_error = error + errors[k][j]
+            next_capital = capital + options[k][j]
+            bound = next_error + lower_bound(depth + 1, next_capital)
+            if math.isinf(bound) or bound * (1 + relative_gap) > best_error + tolerance(best_error):
+                continue
+            chosen[k] = j
+            if depth + 1 == n:
+                consider(tuple(chosen))
+                continue
+            stack.append((depth + 1, next_error, next_capital, iter(ranked[order[depth + 1]])))
+            break
+        else:
+            stack.pop()
+
+    return best_choice
+
+
+def _refine_with_local_search(
+        targets: List[float],
+        options: List[Tuple[float, ...]],
+        capital_cap: float,
+        choice: Optional[Tuple[int, ...]],
+        batch_size: int = 4096,
+) -> Optional[Tuple[int, ...]]:
+    """
+    Improve a choice by scoring the neighbours that change one or two symbols' options with calculate_rmse_batch,
+    a batch at a time, and moving to the best neighbour of the first batch that improves on it. Neighbours are then
+    generated again from the new choice, until no neighbour improves.
+    Starts from the cheapest option of every symbol if no feasible choice is given.
+    """
+    target_values = np.asarray(targets, dtype=float)
+    option_values = pad_options(options)
+
+    if choice is None:
+        choice = tuple(min(range(len(opts)), key=opts.__getitem__) for opts in options)
+    current = np.asarray(choice, dtype=np.intp)
+    current_rmse = calculate_rmse_batch(target_values, option_values, current, capital_cap)[0]
+    if math.isinf(current_rmse):
+        return None
+
+    improved = True
+    while improved:
+        improved = False
+        for candidates in _neighbour_batches(current, options, batch_size):
+            scores = calculate_rmse_batch(target_values, option_values, candidates, capital_cap)
+            best = int(np.argmin(scores))
+            if scores[best] < current_rmse:
+                current, current_rmse = candidates[best].copy(), scores[best]
+                improved = True
+                # The remaining batches are neighbours of the previous choice
+                break
+
+    return tuple(int(idx) for idx in current)
+
+
+def _neighbour_batches(
+        current: np.ndarray,
+        options: List[Tuple[float, ...]],
+        batch_size: int,
+) -> Iterator[np.ndarray]:
+    """
+    Yield candidate index matrices covering every single-symbol and two-symbol change from the current choice.
+    """
+    moves = [(k, j) for k, opts in enumerate(options) for j in range(len(opts)) if j != current[k]]
+    if not moves:
+        return
+    move_symbols = np.array([k for k, _ in moves], dtype=np.intp)
+    move_options = np.array([j for _, j in moves], dtype=np.intp)
+
+    # Single-symbol changes
+    for start in range(0, len(moves), batch_size):
+        rows = np.arange(start, min(start + batch_size, len(moves)))
+        candidates = np.repeat(current[None, :], len(rows), axis=0)
+        candidates[np.arange(len(rows)), move_symbols[rows]] = move_options[rows]
+        yield candidates
 
-    return {symbol_keys[k]: idx for k, idx in enumerate(best_permutation)}
+    # Two-symbol changes, batched by the first move
+    for a in range(len(moves)):
+        partners = np.nonzero(move_symbols > move_symbols[a])[0]
+        for start in range(0, len(partners), batch_size):
+            rows = partners[start:start + batch_size]
+            candidates = np.repeat(current[None, :], len(rows), axis=0)
+            candidates[:, move_symbols[a]] = move_options[a]
+            candidates[np.arange(len(rows)), move_symbols[rows]] = move_options[rows]
+            yield candidates
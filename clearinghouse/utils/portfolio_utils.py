@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.models.response_structs import Position, PortfolioSummary
+
+"""
+Columnar view of an account's positions for whole-book analytics.
+"""
+
+
+class PositionsSnapshot:
+    """
+    Positions of an account at one point in time, stored as one NumPy column per attribute so that account
+    fractions, weights, exposures and P&L are computed for the whole book at once.
+
+    Quantities are signed: long positions are positive, short positions negative.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        asset_types: List[str],
+        quantity: np.ndarray,
+        market_value: np.ndarray,
+        entry_value: np.ndarray,
+        net_change: np.ndarray,
+        day_profit_loss: np.ndarray,
+        account_value: Optional[float] = None,
+    ):
+        self.symbols = symbols
+        self.asset_types = asset_types
+        self.quantity = quantity
+        self.market_value = market_value
+        self.entry_value = entry_value
+        self.net_change = net_change
+        self.day_profit_loss = day_profit_loss
+        self._index: Dict[str, int] = {s: i for i, s in enumerate(symbols)}
+
+        # Without a usable account value, fall back to the net value of the positions
+        net_value = float(market_value.sum())
+        self.account_value = account_value if account_value and account_value > 0 else net_value
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.account_fraction = (
+                market_value / self.account_value if self.account_value > 0 else np.zeros_like(market_value))
+            gross = float(np.abs(market_value).sum())
+            self.weights = market_value / gross if gross > 0 else np.zeros_like(market_value)
+
+    @classmethod
+    def from_schwab(
+        cls,
+        positions: List[schwab_response.SchwabPosition],
+        account_value: Optional[float] = None,
+    ) -> "PositionsSnapshot":
+        """
+        :param positions: Decoded Schwab positions
+        :param account_value: Total account value used for account fractions
+        :return: Snapshot of the positions
+        """
+        n = len(positions)
+        long_quantity = np.fromiter((p.long_quantity for p in positions), dtype=np.float64, count=n)
+        short_quantity = np.fromiter((p.short_quantity for p in positions), dtype=np.float64, count=n)
+        average_price = np.fromiter((p.average_price for p in positions), dtype=np.float64, count=n)
+        quantity = np.where(long_quantity != 0, long_quantity, -short_quantity)
+        return cls(
+            symbols=[p.instrument.symbol for p in positions],
+            asset_types=[p.instrument.type for p in positions],
+            quantity=quantity,
+            market_value=np.fromiter((p.market_value for p in positions), dtype=np.float64, count=n),
+            entry_value=average_price * quantity,
+            net_change=np.fromiter(
+                (p.instrument.net_change or 0.0 for p in positions), dtype=np.float64, count=n),
+            day_profit_loss=np.fromiter((p.current_day_profit_loss for p in positions), dtype=np.float64, count=n),
+            account_value=account_value,
+        )
+
+    @classmethod
+    def merge(cls, snapshots: List["PositionsSnapshot"]) -> "PositionsSnapshot":
+        """
+        Net the positions of several accounts into one book. Positions in the same symbol are summed, so a long in
+        one account and a short in another offset each other, and account fractions are relative to the combined
+        account value.
+
+        :param snapshots: Snapshots of each account
+        :return: Snapshot of the netted book, symbols in the order they are first seen
+        """
+        index: Dict[str, int] = {}
+        asset_types: List[str] = []
+        net_change: List[float] = []
+        for snapshot in snapshots:
+            for i, symbol in enumerate(snapshot.symbols):
+                if symbol not in index:
+                    index[symbol] = len(index)
+                    asset_types.append(snapshot.asset_types[i])
+                    net_change.append(float(snapshot.net_change[i]))
+        inverse = np.fromiter(
+            (index[s] for snapshot in snapshots for s in snapshot.symbols), dtype=np.intp,
+            count=sum(len(s) for s in snapshots))
+
+        def net(column: str) -> np.ndarray:
+            values = np.concatenate([getattr(s, column) for s in snapshots]) if snapshots else np.empty(0)
+            return np.bincount(inverse, weights=values, minlength=len(index))
+
+        return cls(
+            symbols=list(index),
+            asset_types=asset_types,
+            quantity=net("quantity"),
+            market_value=net("market_value"),
+            entry_value=net("entry_value"),
+            net_change=np.array(net_change, dtype=np.float64),
+            day_profit_loss=net("day_profit_loss"),
+            account_value=sum(s.account_value for s in snapshots),
+        )
+
+    def select(self, symbols: Iterable[str]) -> "PositionsSnapshot":
+        """
+        :param symbols: Symbols to keep, those without a position are ignored
+        :return: Snapshot of only those positions, with account fractions still relative to the whole account
+        """
+        wanted = set(symbols)
+        idx = np.array([i for i, s in enumerate(self.symbols) if s in wanted], dtype=np.intp)
+        return PositionsSnapshot(
+            symbols=[self.symbols[i] for i in idx],
+            asset_types=[self.asset_types[i] for i in idx],
+            quantity=self.quantity[idx],
+            market_value=self.market_value[idx],
+            entry_value=self.entry_value[idx],
+            net_change=self.net_change[idx],
+            day_profit_loss=self.day_profit_loss[idx],
+            account_value=self.account_value,
+        )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def fraction_of(self, symbol: str) -> float:
+        """
+        :param symbol: Position symbol
+        :return: Account fraction of the position, 0 if there is none
+        """
+        i = self._index.get(symbol)
+        return float(self.account_fraction[i]) if i is not None else 0.0
+
+    @property
+    def unrealized_profit_loss(self) -> np.ndarray:
+        return self.market_value - self.entry_value
+
+    def summary(self) -> PortfolioSummary:
+        long_mask = self.market_value > 0
+        long_exposure = float(self.market_value[long_mask].sum())
+        short_exposure = float(-self.market_value[~long_mask].sum())
+        return PortfolioSummary(
+            account_value=float(self.account_value),
+            positions=len(self),
+            long_exposure=long_exposure,
+            short_exposure=short_exposure,
+            net_exposure=long_exposure - short_exposure,
+            gross_exposure=long_exposure + short_exposure,
+            unrealized_profit_loss=float(self.unrealized_profit_loss.sum()),
+            day_profit_loss=float(self.day_profit_loss.sum()),
+        )
+
+    def to_positions(self) -> List[Position]:
+        """
+        Quantities and entry values are unsigned, as in schwab_to_ch_position.
+
+        :return: Position structs with their account fractions filled in
+        """
+        return [
+            Position(
+                symbol=symbol,
+                asset_type=asset_type,
+                quantity=quantity,
+                lots=[],  # TODO: confirm how this is structured in response. see docs
+                market_value=market_value,
+                entry_value=entry_value,
+                net_change=net_change,
+                account_fraction=account_fraction,
+            )
+            for symbol, asset_type, quantity, market_value, entry_value, net_change, account_fraction in zip(
+                self.symbols,
+                self.asset_types,
+                np.abs(self.quantity).tolist(),
+                self.market_value.tolist(),
+                np.abs(self.entry_value).tolist(),
+                self.net_change.tolist(),
+                self.account_fraction.tolist(),
+            )
+        ]
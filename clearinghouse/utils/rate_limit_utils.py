@@ -0,0 +1,254 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Final, Iterator, List, Optional
+import asyncio
+import itertools
+import math
+import time
+
+from clearinghouse.exceptions import RateLimitedException
+
+"""
+Token-bucket rate limits and priority scheduling for outbound Schwab calls.
+"""
+
+# Priority lanes, lower goes first
+PRIORITY_ORDERS: Final = 0
+PRIORITY_READS: Final = 1
+PRIORITY_BACKGROUND: Final = 2
+LANE_NAMES: Final = {PRIORITY_ORDERS: "orders", PRIORITY_READS: "reads", PRIORITY_BACKGROUND: "background"}
+
+# Limit shared by every call, next to the limit of the call's endpoint class
+ALL_ENDPOINTS: Final = "all"
+# Requests per minute, the default limits of the Schwab trader and market data APIs
+DEFAULT_RATE_LIMITS: Final = {ALL_ENDPOINTS: 120.0, "orders": 120.0, "market_data": 120.0}
+
+ENDPOINT_CLASSES: Final = {
+    "order_place": "orders",
+    "order_cancel": "orders",
+    "order_replace": "orders",
+    "quotes": "market_data",
+    "quote": "market_data",
+}
+
+_outbound_priority: ContextVar[Optional[int]] = ContextVar("outbound_priority", default=None)
+
+
+def endpoint_class(method: str) -> str:
+    """
+    :param method: Schwab client method name
+    :return: Rate limit class of the method
+    """
+    return ENDPOINT_CLASSES.get(method, "accounts")
+
+
+def endpoint_priority(method: str) -> int:
+    """
+    Order placement and cancellation go ahead of reads, and calls made within background_priority() go last.
+
+    :param method: Schwab client method name
+    :return: Priority lane of the call
+    """
+    priority = PRIORITY_ORDERS if endpoint_class(method) == "orders" else PRIORITY_READS
+    override = _outbound_priority.get()
+    return max(priority, override) if override is not None else priority
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """
+    Schedule the outbound calls made within the block, including by tasks it creates, in the background lane.
+    """
+    token = _outbound_priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _outbound_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Refills rate tokens per second up to capacity. A call takes one token.
+    """
+
+    def __init__(self, rate: float, capacity: float, timer: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._timer = timer
+        self._tokens = capacity
+        self._updated_at = timer()
+
+    @property
+    def tokens(self) -> float:
+        now = self._timer()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        return self._tokens
+
+    def take(self):
+        self._tokens = self.tokens - 1
+
+    def time_until(self, tokens: float) -> float:
+        """
+        :param tokens: Number of tokens needed
+        :return: Seconds until that many tokens are available
+        """
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "endpoint_class", "future", "queued_at")
+
+    def __init__(self, priority: int, seq: int, endpoint_class: str, future: asyncio.Future, queued_at: float):
+        self.priority = priority
+        self.seq = seq
+        self.endpoint_class = endpoint_class
+        self.future = future
+        self.queued_at = queued_at
+
+
+class OutboundScheduler:
+    """
+    Admits outbound calls under a token bucket shared by all calls and one per endpoint class, in priority order.
+
+    A call goes straight through when tokens are available and no call of the same or a higher priority is
+    waiting. Otherwise it is queued in its priority lane and a dispatcher grants the queued calls as tokens refill,
+    highest priority first; a queued call whose endpoint class is exhausted does not hold up calls of other classes.
+    Calls that would wait longer than max_wait, or find max_queue calls already waiting, are rejected with
+    RateLimitedException (HTTP 429 with Retry-After) so the backpressure reaches the API client instead of piling up.
+
+    Attributes:
+        granted (int): Calls admitted.
+        rejected (int): Calls rejected with RateLimitedException.
+        waited (float): Total seconds admitted calls spent queued.
+        peak_queue (int): Most calls queued at once.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, float]] = None,
+        max_wait: Optional[float] = 10.0,
+        max_queue: int = 1000,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param limits: Requests per minute by endpoint class, ALL_ENDPOINTS for the shared limit.
+            Classes without a limit are not limited.
+        :param max_wait: Max estimated seconds a call in the order or read lane may queue, None for no limit.
+            Background calls are never rejected.
+        :param max_queue: Max number of queued calls
+        :param timer: Monotonic clock
+        """
+        self._timer = timer
+        self._buckets = {
+            name: TokenBucket(per_minute / 60, per_minute, timer)
+            for name, per_minute in (limits or {}).items()
+        }
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.granted = 0
+        self.rejected = 0
+        self.waited = 0.0
+        self.peak_queue = 0
+
+    def _buckets_for(self, endpoint_class: str) -> List[TokenBucket]:
+        return [b for b in (self._buckets.get(ALL_ENDPOINTS), self._buckets.get(endpoint_class)) if b is not None]
+
+    def _available(self, endpoint_class: str) -> bool:
+        return all(b.tokens >= 1 for b in self._buckets_for(endpoint_class))
+
+    def _grant(self, endpoint_class: str):
+        for bucket in self._buckets_for(endpoint_class):
+            bucket.take()
+        self.granted += 1
+
+    def _estimated_wait(self, endpoint_class: str, priority: int) -> float:
+        ahead = [w for w in self._waiters if w.priority <= priority]
+        wait = 0.0
+        shared = self._buckets.get(ALL_ENDPOINTS)
+        if shared is not None:
+            wait = shared.time_until(len(ahead) + 1)
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is not None:
+            same_class = sum(1 for w in ahead if w.endpoint_class == endpoint_class)
+            wait = max(wait, bucket.time_until(same_class + 1))
+        return wait
+
+    async def acquire(self, endpoint_class: str, priority: int = PRIORITY_READS):
+        """
+        Wait until a call of the endpoint class may go out.
+
+        :param endpoint_class: Rate limit class of the call, see endpoint_class
+        :param priority: Priority lane, lower goes first
+        :raises RateLimitedException: If the call would queue longer than max_wait or the queue is full
+        """
+        if not any(w.priority <= priority for w in self._waiters) and self._available(endpoint_class):
+            self._grant(endpoint_class)
+            return
+
+        if priority < PRIORITY_BACKGROUND:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitedException(self._estimated_wait(endpoint_class, priority))
+            wait = self._estimated_wait(endpoint_class, priority)
+            if self.max_wait is not None and wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitedException(wait)
+
+        waiter = _Waiter(
+            priority, next(self._seq), endpoint_class, asyncio.get_running_loop().create_future(), self._timer())
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    async def _dispatch(self):
+        while self._waiters:
+            for waiter in list(self._waiters):
+                if waiter.future.done():
+                    self._waiters.remove(waiter)
+                elif self._available(waiter.endpoint_class):
+                    self._grant(waiter.endpoint_class)
+                    self.waited += self._timer() - waiter.queued_at
+                    self._waiters.remove(waiter)
+                    waiter.future.set_result(None)
+            if self._waiters:
+                await asyncio.sleep(min(
+                    max((b.time_until(1) for b in self._buckets_for(w.endpoint_class)), default=0.0)
+                    for w in self._waiters
+                ))
+
+    def queue_depth(self) -> Dict[str, int]:
+        """
+        :return: Number of queued calls per priority lane
+        """
+        depth = {name: 0 for name in LANE_NAMES.values()}
+        for waiter in self._waiters:
+            lane = LANE_NAMES.get(waiter.priority, str(waiter.priority))
+            depth[lane] = depth.get(lane, 0) + 1
+        return depth
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Counters for tuning the limits and spotting backpressure.
+        """
+        return {
+            "queue_depth": self.queue_depth(),
+            "peak_queue": self.peak_queue,
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "waited": self.waited,
+            "tokens": {name: math.floor(b.tokens) for name, b in self._buckets.items()},
+        }
@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Final, Optional
+import asyncio
+import logging
+import random
+
+import httpx
+import requests
+
+"""
+Classification of transient Schwab failures and retries with jittered exponential backoff.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Rate limited or a server/gateway error that may succeed when tried again
+RETRYABLE_STATUS_CODES: Final = frozenset({429, 500, 502, 503, 504})
+# Connection problems and timeouts of the async (httpx) and local (requests) clients
+RETRYABLE_EXCEPTIONS: Final = (httpx.TransportError, requests.ConnectionError, requests.Timeout)
+
+Response = httpx.Response | requests.Response
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Attributes:
+        max_attempts (int): Calls made in total, including the first.
+        base_delay (float): Backoff ceiling in seconds before the first retry, doubled for every further retry.
+        max_delay (float): Largest backoff in seconds, also caps a Retry-After sent by Schwab.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None, rng: Callable[[], float] = random.random) -> float:
+        """
+        Full jitter backoff, so that concurrent callers that failed together do not retry together.
+
+        :param attempt: Number of the attempt that failed, starting at 1
+        :param retry_after: Seconds Schwab asked to wait, if it did
+        :param rng: Source of uniform numbers in [0, 1)
+        :return: Seconds to wait before the next attempt
+        """
+        delay = rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+def is_retryable(resp: Optional[Response] = None, error: Optional[BaseException] = None) -> bool:
+    """
+    :param resp: Response of the failed call
+    :param error: Exception raised by the failed call instead
+    :return: Whether the call may succeed if made again
+    """
+    if error is not None:
+        return isinstance(error, RETRYABLE_EXCEPTIONS)
+    return resp is not None and resp.status_code in RETRYABLE_STATUS_CODES
+
+
+def retry_after(resp: Optional[Response]) -> Optional[float]:
+    """
+    :param resp: Response of the failed call
+    :return: Seconds from the Retry-After header, None if absent or given as a date
+    """
+    if resp is None:
+        return None
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[Response]],
+    policy: RetryPolicy,
+    should_retry: Optional[Callable[[Optional[Response], Optional[BaseException]], Awaitable[bool]]] = None,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> Response:
+    """
+    Make a Schwab call, retrying it with backoff while it fails transiently and attempts remain.
+
+    :param call: Makes the call, once per attempt
+    :param policy: Number of attempts and backoff
+    :param should_retry: Awaited before every retry with the failed response or exception, returns False to stop
+        retrying (e.g. when the call turns out to have taken effect after all)
+    :param sleep: Waits between attempts
+    :return: Response of the last attempt
+    :raises: The exception of the last attempt, if it raised one
+    """
+    attempt = 1
+    while True:
+        resp, error = None, None
+        try:
+            resp = await call()
+        except RETRYABLE_EXCEPTIONS as e:
+            error = e
+
+        if attempt >= policy.max_attempts or not is_retryable(resp, error):
+            break
+        if should_retry is not None and not await should_retry(resp, error):
+            break
+
+        delay = policy.delay(attempt, retry_after(resp))
+        logger.info(
+            "Retrying Schwab call in %.2fs after attempt %d failed with %s",
+            delay, attempt, error if error is not None else resp.status_code)
+        await sleep(delay)
+        attempt += 1
+
+    if error is not None:
+        raise error
+    return resp
@@ -0,0 +1,427 @@
+from typing import Any, Callable, Dict, Final, Iterable, List, Optional, Set
+import datetime
+import sqlite3
+import threading
+import time
+
+import msgspec
+
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.models.response_structs import Quote, StandardOrder, Transaction
+
+"""
+Local stores for data synced from Schwab in the background.
+"""
+
+TERMINAL_ORDER_STATUSES: Final = frozenset({"REJECTED", "CANCELED", "REPLACED", "FILLED", "EXPIRED"})
+
+
+def as_aware(value: datetime.datetime) -> datetime.datetime:
+    """
+    Treat naive datetimes as local time so they compare with the timezone aware times from Schwab.
+    """
+    return value if value.tzinfo is not None else value.astimezone()
+
+
+class OrderStore:
+    """
+    In-memory order history keyed by order id, kept up to date by the order sync in services.sync_service.
+
+    The high-water mark is the latest entered time seen, so each sync only asks Schwab for newer orders.
+    Orders that are not in a terminal status are re-checked on every sync since their status can still change.
+
+    Once the store holds more than maxsize orders, the oldest terminal orders by entered time are evicted and the
+    coverage start moves past them, so windows reaching back that far are fetched from Schwab again.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._timer = timer
+        self._orders: Dict[int, StandardOrder] = {}
+        self.high_water_mark: Optional[datetime.datetime] = None
+        self.coverage_start: Optional[datetime.datetime] = None
+        self._evicted_through: Optional[datetime.datetime] = None
+        self._synced_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def is_synced(self) -> bool:
+        return self._synced_at is not None
+
+    def staleness(self) -> Optional[float]:
+        """
+        :return: Seconds since the last completed sync, None if the store was never synced
+        """
+        if self._synced_at is None:
+            return None
+        return self._timer() - self._synced_at
+
+    def covers(self, start_date: Optional[datetime.datetime]) -> bool:
+        """
+        :param start_date: Start of a requested entered time window
+        :return: True if the store was synced from at least as far back as start_date
+        """
+        if not self.is_synced:
+            return False
+        return start_date is None or as_aware(start_date) >= self.coverage_start
+
+    def upsert(self, orders: Iterable[StandardOrder]):
+        for order in orders:
+            self._orders[order.order_id] = order
+            entered_time = as_aware(order.entered_time)
+            if self.high_water_mark is None or entered_time > self.high_water_mark:
+                self.high_water_mark = entered_time
+        self._evict()
+
+    def mark_synced(self, coverage_start: datetime.datetime):
+        if self.coverage_start is None or coverage_start < self.coverage_start:
+            self.coverage_start = coverage_start
+        self._limit_coverage()
+        self._synced_at = self._timer()
+
+    def _evict(self):
+        if self.maxsize is None or len(self._orders) <= self.maxsize:
+            return
+        # Open orders are kept since the sync re-checks them until they reach a terminal status
+        terminal = sorted(
+            (o for o in self._orders.values() if o.status in TERMINAL_ORDER_STATUSES),
+            key=lambda o: as_aware(o.entered_time),
+        )
+        for order in terminal[:len(self._orders) - self.maxsize]:
+            del self._orders[order.order_id]
+            entered_time = as_aware(order.entered_time)
+            if self._evicted_through is None or entered_time > self._evicted_through:
+                self._evicted_through = entered_time
+        self._limit_coverage()
+
+    def _limit_coverage(self):
+        # Windows starting at or before an evicted order are no longer complete
+        if self._evicted_through is None:
+            return
+        earliest = self._evicted_through + datetime.timedelta(microseconds=1)
+        if self.coverage_start is None or self.coverage_start < earliest:
+            self.coverage_start = earliest
+
+    def open_orders(self) -> List[StandardOrder]:
+        """
+        :return: Orders whose status may still change
+        """
+        return [o for o in self._orders.values() if o.status not in TERMINAL_ORDER_STATUSES]
+
+    def query(
+        self,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        max_results: Optional[int] = None,
+        status: Optional[str] = None,
+    ) -> List[StandardOrder]:
+        """
+        Orders entered within the window, newest first.
+
+        :param start_date: Earliest entered time, defaults to the start of the synced history
+        :param end_date: Latest entered time
+        :param max_results: Maximum number of orders to return
+        :param status: Only return orders with this status
+        :return: Matching orders
+        """
+        start_date = as_aware(start_date) if start_date else None
+        end_date = as_aware(end_date) if end_date else None
+        orders = [
+            o for o in self._orders.values()
+            if (start_date is None or as_aware(o.entered_time) >= start_date)
+            and (end_date is None or as_aware(o.entered_time) <= end_date)
+            and (status is None or o.status == status)
+        ]
+        orders.sort(key=lambda o: as_aware(o.entered_time), reverse=True)
+        return orders[:max_results] if max_results else orders
+
+
+_EPOCH: Final = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _to_micros(value: datetime.datetime) -> int:
+    delta = as_aware(value) - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=value)
+
+
+class TransactionLedger:
+    """
+    SQLite ledger of account transactions, kept up to date by the transaction sync in services.sync_service.
+
+    Times are stored as UTC epoch microseconds so range queries use the time index. The symbols of each
+    transaction's transfer items are stored in their own table, indexed by symbol.
+    A file backed ledger persists across restarts and runs in WAL mode so reads do not block the sync.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            order_id INTEGER,
+            time INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            net_amount REAL NOT NULL,
+            trade_date INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transactions_time ON transactions (time);
+        CREATE INDEX IF NOT EXISTS transactions_type_time ON transactions (type, time);
+        CREATE INDEX IF NOT EXISTS transactions_order_id ON transactions (order_id);
+        CREATE TABLE IF NOT EXISTS transaction_symbols (
+            symbol TEXT NOT NULL,
+            transaction_id INTEGER NOT NULL REFERENCES transactions (id) ON DELETE CASCADE,
+            PRIMARY KEY (symbol, transaction_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS transaction_symbols_transaction_id ON transaction_symbols (transaction_id);
+        CREATE TABLE IF NOT EXISTS ledger_meta (
+            key TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = ":memory:", timer: Callable[[], float] = time.time):
+        self.path = path
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(self._SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def _get_meta(self, key: str) -> Optional[float]:
+        row = self._conn.execute("SELECT value FROM ledger_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: float):
+        self._conn.execute("INSERT OR REPLACE INTO ledger_meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def high_water_mark(self) -> Optional[datetime.datetime]:
+        """
+        :return: Time of the latest transaction in the ledger
+        """
+        with self._lock:
+            value = self._conn.execute("SELECT MAX(time) FROM transactions").fetchone()[0]
+        return _from_micros(value) if value is not None else None
+
+    @property
+    def coverage_start(self) -> Optional[datetime.datetime]:
+        with self._lock:
+            value = self._get_meta("coverage_start")
+        return _from_micros(int(value)) if value is not None else None
+
+    def staleness(self) -> Optional[float]:
+        """
+        :return: Seconds since the last completed sync, None if the ledger was never synced
+        """
+        with self._lock:
+            synced_at = self._get_meta("synced_at")
+        return self._timer() - synced_at if synced_at is not None else None
+
+    def covers(self, start_date: Optional[datetime.datetime]) -> bool:
+        """
+        :param start_date: Start of a requested time window
+        :return: True if the ledger was synced from at least as far back as start_date
+        """
+        coverage_start = self.coverage_start
+        if coverage_start is None or self.staleness() is None:
+            return False
+        return start_date is None or as_aware(start_date) >= coverage_start
+
+    def ingest(self, transactions: Iterable[schwab_response.Transaction]) -> int:
+        """
+        Insert or update transactions. Transactions without an activity id cannot be keyed and are skipped.
+
+        :param transactions: Decoded Schwab transactions
+        :return: Number of transactions written
+        """
+        rows = []
+        symbols = []
+        for t in transactions:
+            if t.activity_id is None:
+                continue
+            rows.append((
+                t.activity_id, t.order_id, _to_micros(t.time), t.type, t.status, t.net_amount,
+                _to_micros(t.trade_date),
+            ))
+            symbols.extend(
+                (item.instrument.symbol, t.activity_id)
+                for item in (t.transfer_items or [])
+                if item.instrument.symbol
+            )
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transaction_symbols (symbol, transaction_id) VALUES (?, ?)", symbols)
+        return len(rows)
+
+    def mark_synced(self, coverage_start: datetime.datetime):
+        current = self.coverage_start
+        with self._lock, self._conn:
+            if current is None or coverage_start < current:
+                self._set_meta("coverage_start", _to_micros(coverage_start))
+            self._set_meta("synced_at", self._timer())
+
+    def query(
+        self,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        symbols: Optional[Iterable[str]] = None,
+        order_id: Optional[int] = None,
+    ) -> List[Transaction]:
+        """
+        Transactions matching all given criteria, oldest first.
+
+        :param start_date: Earliest transaction time
+        :param end_date: Latest transaction time
+        :param types: Transaction types to include
+        :param symbols: Only include transactions with a transfer item in one of these symbols
+        :param order_id: Only include transactions of this order
+        :return: Matching transactions
+        """
+        clauses = []
+        params = []
+        if start_date is not None:
+            clauses.append("time >= ?")
+            params.append(_to_micros(start_date))
+        if end_date is not None:
+            clauses.append("time <= ?")
+            params.append(_to_micros(end_date))
+        if types:
+            types = list(types)
+            clauses.append(f"type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        if symbols:
+            symbols = list(symbols)
+            clauses.append(
+                f"id IN (SELECT transaction_id FROM transaction_symbols WHERE symbol IN ({', '.join('?' * len(symbols))}))")
+            params.extend(symbols)
+        if order_id is not None:
+            clauses.append("order_id = ?")
+            params.append(order_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, order_id, time, type, status, net_amount, trade_date "
+                f"FROM transactions {where} ORDER BY time, id",
+                params,
+            ).fetchall()
+        return [
+            Transaction(
+                id=row[0],
+                order_id=row[1],
+                time=_from_micros(row[2]),
+                type=row[3],
+                status=row[4],
+                net_amount=row[5],
+                trade_date=_from_micros(row[6]),
+            )
+            for row in rows
+        ]
+
+
+_EMPTY_QUOTE: Final = {
+    "price": 0.0,
+    "total_volume": 0,
+    "net_percent_change": 0.0,
+    "bid_price": 0.0,
+    "ask_price": 0.0,
+}
+# Fields a streamed quote needs before it is served, since limit prices and order sizes are derived from them
+_REQUIRED_QUOTE_FIELDS: Final = frozenset({"price", "bid_price", "ask_price"})
+
+
+class QuoteBook:
+    """
+    Latest quote per symbol, kept up to date by the quote stream in services.sync_service.
+
+    Streamed updates only carry the fields that changed, so they are merged into the symbol's current quote.
+    A symbol is only served once its price, bid and ask have all been received, so that a partial first update
+    does not serve zeros. Quotes are only served while the stream is live: a quote that has not changed is still
+    current while the stream is connected, but may be arbitrarily old once it disconnects.
+    """
+
+    def __init__(self, timer: Callable[[], float] = time.monotonic):
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, Quote] = {}
+        self._updated_at: Dict[str, float] = {}
+        # Required fields not received yet, by symbol
+        self._incomplete: Dict[str, Set[str]] = {}
+        self.live = False
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._quotes
+
+    def apply(self, symbol: str, fields: Dict[str, Any]):
+        """
+        Merge changed fields into a symbol's quote. Fields missing from a symbol's first update start at zero,
+        and the symbol is not served until the required ones have been received.
+
+        :param symbol: Quote symbol
+        :param fields: Changed Quote fields by name
+        """
+        with self._lock:
+            quote = self._quotes.get(symbol)
+            if quote is None:
+                self._quotes[symbol] = Quote(**{**_EMPTY_QUOTE, "quote_time": datetime.datetime.now(), **fields,
+                                                "symbol": symbol})
+                missing = _REQUIRED_QUOTE_FIELDS.difference(fields)
+                if missing:
+                    self._incomplete[symbol] = set(missing)
+            else:
+                for name, value in fields.items():
+                    setattr(quote, name, value)
+                missing = self._incomplete.get(symbol)
+                if missing is not None:
+                    missing.difference_update(fields)
+                    if not missing:
+                        del self._incomplete[symbol]
+            self._updated_at[symbol] = self._timer()
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """
+        :param symbols: Symbols to look up
+        :return: Copies of the complete quotes in the book, none while the stream is not live
+        """
+        if not self.live:
+            return {}
+        with self._lock:
+            return {
+                s: msgspec.structs.replace(self._quotes[s])
+                for s in symbols if s in self._quotes and s not in self._incomplete
+            }
+
+    def age(self, symbol: str) -> Optional[float]:
+        """
+        :return: Seconds since the symbol's quote last changed, None if it is not in the book
+        """
+        updated_at = self._updated_at.get(symbol)
+        return self._timer() - updated_at if updated_at is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+            self._updated_at.clear()
+            self._incomplete.clear()
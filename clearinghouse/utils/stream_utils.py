@@ -0,0 +1,205 @@
+from typing import Any, AsyncIterator, Dict, Final, Iterable, List, Optional, Set, Tuple
+import asyncio
+import datetime
+import logging
+
+import msgspec
+import schwabdev
+
+import clearinghouse.data.sample_data as sample_data
+
+"""
+Pluggable sources of streamed level one equity quotes for the quote book.
+"""
+
+logger = logging.getLogger(__name__)
+
+# LEVELONE_EQUITIES field ids of the Schwab streamer, mapped to the Quote fields they update
+LEVEL_ONE_EQUITY_FIELDS: Final = {
+    "1": "bid_price",
+    "2": "ask_price",
+    "3": "price",
+    "8": "total_volume",
+    "34": "quote_time",
+    "42": "net_percent_change",
+}
+_REQUESTED_FIELDS: Final = ",".join(["0", *LEVEL_ONE_EQUITY_FIELDS])
+
+QuoteUpdate = Tuple[str, Dict[str, Any]]
+
+
+class _StreamedService(msgspec.Struct):
+    service: str
+    content: List[Dict[str, Any]] = []
+
+
+class _StreamerMessage(msgspec.Struct):
+    data: List[_StreamedService] = []
+
+
+_message_decoder = msgspec.json.Decoder(_StreamerMessage)
+
+
+def parse_level_one(message: str | bytes) -> List[QuoteUpdate]:
+    """
+    Extract quote updates from a raw Schwab streamer message. Responses, notifications and other services are skipped.
+
+    :param message: JSON message as received from the streamer
+    :return: (symbol, changed Quote fields) for every LEVELONE_EQUITIES item in the message
+    """
+    updates = []
+    for service in _message_decoder.decode(message).data:
+        if service.service != "LEVELONE_EQUITIES":
+            continue
+        for item in service.content:
+            fields = {LEVEL_ONE_EQUITY_FIELDS[k]: v for k, v in item.items() if k in LEVEL_ONE_EQUITY_FIELDS}
+            if "quote_time" in fields:
+                fields["quote_time"] = datetime.datetime.fromtimestamp(fields["quote_time"] / 1000)
+            updates.append((item["key"], fields))
+    return updates
+
+
+class QuoteSource:
+    """
+    Base class of the quote stream sources. A source delivers updates for the symbols it was subscribed to,
+    starting with a full quote for every new subscription.
+    """
+
+    def __init__(self):
+        self.subscribed: Set[str] = set()
+        # Batches of updates, then None once the source is stopped
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """
+        Connect the source. Updates are delivered through updates() from then on.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    async def stop(self):
+        """
+        Disconnect the source. Consumers of updates() stop iterating, including one waiting for the next batch.
+        """
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+        self._queue = None
+
+    async def subscribe(self, symbols: Iterable[str]) -> List[str]:
+        """
+        :param symbols: Symbols to receive updates for
+        :return: Symbols that were not subscribed yet
+        """
+        new = [s for s in dict.fromkeys(symbols) if s not in self.subscribed]
+        self.subscribed.update(new)
+        return new
+
+    async def updates(self) -> AsyncIterator[List[QuoteUpdate]]:
+        """
+        :return: Batches of quote updates, in the order they were received, until the source is stopped
+        """
+        queue = self._queue
+        while queue is not None:
+            batch = await queue.get()
+            if batch is None:
+                return
+            yield batch
+
+    def _publish(self, batch: List[QuoteUpdate]):
+        # Sources may receive data on other threads
+        if batch and self._queue is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, batch)
+
+
+class SchwabQuoteSource(QuoteSource):
+    """
+    Level one equity quotes from the Schwab streamer, which runs in its own thread in schwabdev.
+    """
+
+    def __init__(self, client: schwabdev.Client):
+        super().__init__()
+        self._stream = client.stream
+
+    async def start(self):
+        await super().start()
+        self._stream.start(receiver=self._receive)
+
+    async def stop(self):
+        await asyncio.to_thread(self._stream.stop)
+        self.subscribed.clear()
+        await super().stop()
+
+    async def subscribe(self, symbols: Iterable[str]) -> List[str]:
+        new = await super().subscribe(symbols)
+        if new:
+            self._stream.send(self._stream.level_one_equities(new, _REQUESTED_FIELDS))
+        return new
+
+    def _receive(self, message: str):
+        try:
+            self._publish(parse_level_one(message))
+        except msgspec.DecodeError:
+            logger.warning("Could not decode streamer message: %s", message)
+
+
+class LocalReplayQuoteSource(QuoteSource):
+    """
+    Replays quotes from sample_data.QUOTES as Schwab streamer messages, for local mode and testing.
+    Every subscription gets the full sample quote, then the last price of every subscribed symbol is replayed
+    every interval seconds, if set.
+    """
+
+    def __init__(self, quotes: Dict[str, Any] = None, interval: Optional[float] = None):
+        super().__init__()
+        self.quotes = sample_data.QUOTES if quotes is None else quotes
+        self.interval = interval
+        self._replay: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await super().start()
+        if self.interval:
+            self._replay = asyncio.create_task(self._run_replay())
+
+    async def stop(self):
+        if self._replay is not None:
+            self._replay.cancel()
+            self._replay = None
+        self.subscribed.clear()
+        await super().stop()
+
+    async def subscribe(self, symbols: Iterable[str]) -> List[str]:
+        new = await super().subscribe(symbols)
+        self.replay(new, full=True)
+        return new
+
+    def replay(self, symbols: Iterable[str], full: bool = False):
+        """
+        Publish a streamer message for the symbols that have sample quotes.
+
+        :param symbols: Symbols to publish
+        :param full: Publish every field rather than only the last price
+        """
+        content = []
+        for symbol in symbols:
+            if symbol not in self.quotes:
+                continue
+            quote = self.quotes[symbol]["quote"]
+            item = {"key": symbol, "3": quote["lastPrice"]}
+            if full:
+                item.update({
+                    "1": quote["bidPrice"],
+                    "2": quote["askPrice"],
+                    "8": quote["totalVolume"],
+                    "34": quote["quoteTime"],
+                    "42": quote["netPercentChange"],
+                })
+            content.append(item)
+        if content:
+            message = msgspec.json.encode({"data": [{"service": "LEVELONE_EQUITIES", "content": content}]})
+            self._publish(parse_level_one(message))
+
+    async def _run_replay(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.replay(sorted(self.subscribed))
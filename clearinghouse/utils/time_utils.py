@@ -0,0 +1,56 @@
+from typing import Any, Dict, Iterable, List
+import datetime
+import functools
+
+"""
+Fallback timestamp parsing for Schwab payloads that msgspec cannot decode as RFC 3339 datetimes.
+"""
+
+FALLBACK_TIMESTAMP_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%d %H:%M:%S%z",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y",
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(value: str | int | float) -> datetime.datetime:
+    """
+    Parse a timestamp in any of the formats seen from Schwab. Results are memoized since order histories repeat
+    the same timestamps (e.g. cancel times at midnight) many times.
+
+    :param value: ISO 8601 string, one of FALLBACK_TIMESTAMP_FORMATS, or epoch milliseconds
+    :return: Parsed datetime, timezone aware if the input carried an offset or was an epoch
+    """
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value / 1000, tz=datetime.timezone.utc)
+
+    value = value.strip()
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        pass
+
+    for fmt in FALLBACK_TIMESTAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized timestamp format: {value!r}")
+
+
+def normalize_timestamps(records: Dict[str, Any] | List[Dict[str, Any]], keys: Iterable[str]) -> Any:
+    """
+    Replace the timestamp values under keys with parsed datetimes, in place.
+
+    :param records: Decoded JSON object or list of objects
+    :param keys: JSON keys holding timestamps
+    :return: The same records
+    """
+    for record in ([records] if isinstance(records, dict) else records):
+        for key in keys:
+            if record.get(key) is not None:
+                record[key] = parse_timestamp(record[key])
+    return records
@@ -1,10 +1,14 @@
+import json
 from typing import Dict
 from collections import Counter
 
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from clearinghouse.main import app
+from clearinghouse.dependencies import LocalSchwabService, FaultInjectingSchwabClient
+from clearinghouse.routers.orders import create_order_endpoints
 
 VERSION = "v1"
 
@@ -22,7 +26,7 @@ def assert_meta_structure(resp: Dict, expected_type_label: str):
     meta = resp["meta"]
     assert isinstance(meta, dict)
     assert meta["type"] == expected_type_label
-    assert meta.keys() == {"type", "timestamp"}
+    assert meta.keys() == {"type", "timestamp", "staleness"}
 
 
 def test_read_main(client):
@@ -66,6 +70,25 @@ def test_get_positions_filter_negative(client):
     assert resp.status_code == 200
     assert len(data) == 0
 
+def test_get_positions_account_fraction(client):
+    """
+    Positions carry their account fraction. The sample account has no liquidation value,
+    so fractions are relative to the positions' total value.
+    """
+    data = client.get(f"/{VERSION}/positions").json()["data"]
+    assert sum(p["account_fraction"] for p in data) == pytest.approx(1)
+    assert all(p["account_fraction"] > 0 for p in data)
+
+def test_get_positions_summary(client):
+    """
+    Test for GET /v1/positions/summary
+    """
+    resp = client.get(f"/{VERSION}/positions/summary")
+    assert_meta_structure(resp.json(), "PortfolioSummary")
+    data = resp.json()["data"]
+    assert data["positions"] == 5
+    assert data["gross_exposure"] == pytest.approx(7550)
+
 def test_get_orders(client):
     """
     Test for GET /v1/orders
@@ -74,6 +97,18 @@ def test_get_orders(client):
     assert_meta_structure(resp.json(), "OrdersList")
     assert isinstance(resp.json()["data"], list)
 
+def test_get_orders_by_symbol(client):
+    """
+    Test for GET /v1/orders filtered by the symbols of the order legs
+    """
+    resp = client.get(f"/{VERSION}/orders?symbols=XXX")
+    assert resp.status_code == 200
+    assert [o["symbols"] for o in resp.json()["data"]] == [["XXX"]]
+
+    resp = client.get(f"/{VERSION}/orders?symbols=AAPL,MSFT&stream=true")
+    assert resp.status_code == 200
+    assert resp.json()["data"] == []
+
 def test_order_details(client):
     """
     Test for GET /v1/orders/{orderId}
@@ -99,6 +134,32 @@ def test_get_transactions(client):
     assert isinstance(resp.json()["data"], list)
     assert resp.status_code == 200
 
+def test_get_orders_stream_json_matches(client):
+    """
+    Streamed JSON for GET /v1/orders has the same data as the buffered response
+    """
+    buffered = client.get(f"/{VERSION}/orders").json()
+    resp = client.get(f"/{VERSION}/orders?stream=true")
+    assert resp.status_code == 200
+    assert_meta_structure(resp.json(), "OrdersList")
+    assert resp.json()["data"] == buffered["data"]
+
+def test_get_transactions_stream_ndjson(client):
+    """
+    NDJSON for GET /v1/transactions sends meta on the first line, then one transaction per line
+    """
+    buffered = client.get(f"/{VERSION}/transactions").json()
+    resp = client.get(
+        f"/{VERSION}/transactions?stream=true",
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert_meta_structure(lines[0], "TransactionsList")
+    assert lines[1:] == buffered["data"]
+
 def test_get_transactions_details(client):
     """
     Test for GET /v1/transactions/{transactionId}
@@ -142,6 +203,38 @@ def test_order_placement(client):
     assert_meta_structure(resp.json(), "OrderResult")
     assert resp.status_code == 201
 
+
+def test_order_placement_idempotency_key_header():
+    service = LocalSchwabService()
+    service.client = FaultInjectingSchwabClient()
+    router_app = FastAPI()
+    router_app.include_router(create_order_endpoints(service))
+    client = TestClient(router_app)
+
+    order_data = {"symbol": "AAPL", "quantity": 5, "instruction": "buy"}
+    for _ in range(2):
+        resp = client.post(f"/{VERSION}/orders", json=order_data, headers={"Idempotency-Key": "abc"})
+        assert resp.status_code == 201
+        assert resp.json()["data"]["idempotency_key"] == "abc"
+    assert service.client.calls["order_place"] == 1
+
+    order_data["quantity"] = 6
+    resp = client.post(f"/{VERSION}/orders", json=order_data, headers={"Idempotency-Key": "abc"})
+    assert resp.status_code == 409
+    assert service.client.calls["order_place"] == 1
+
+def test_orders_routed_by_account(client):
+    """
+    Order routes serve the default account under /v1 and any linked account by path or header.
+    """
+    default = client.get(f"/{VERSION}/positions").json()["data"]
+    assert client.get(f"/{VERSION}/accounts/1234/positions").json()["data"] == default
+    assert client.get(f"/{VERSION}/accounts/abcde/positions").json()["data"] == default
+    assert client.get(f"/{VERSION}/positions", headers={"X-Schwab-Account": "1234"}).json()["data"] == default
+
+    assert client.get(f"/{VERSION}/accounts/0000/positions").status_code == 404
+    assert client.get(f"/{VERSION}/positions", headers={"X-Schwab-Account": "0000"}).status_code == 404
+
 def test_order_placement_batch(client):
     """
     Test for POST /v1/orders/batch
@@ -168,6 +261,22 @@ def test_order_placement_batch(client):
     assert_meta_structure(resp.json(), "OrderResultList")
     assert resp.status_code == 201
 
+def test_fractional_order_placement_batch(client):
+    """
+    Test for POST /v1/orders/batch with fractional orders realized as one rebalance
+    """
+    orders_data = [
+        {"symbol": "aapl", "fraction": 0.5},
+        {"symbol": "amd", "fraction": 0},
+    ]
+    resp = client.post(f"/{VERSION}/orders/batch", json=orders_data)
+    assert_meta_structure(resp.json(), "OrderResultList")
+    assert resp.status_code == 201
+
+    data = resp.json()["data"]
+    assert [(d["symbol"], d["instruction"]) for d in data] == [("AMD", "BUY_TO_COVER"), ("AAPL", "BUY")]
+    assert all(d["status"] == "SUCCEEDED" for d in data)
+
 def test_adjust_position_base(client):
     """
     Test for POST /v1/adjustments.
@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from clearinghouse.main import app
+from clearinghouse.dependencies import LocalSchwabService
+from clearinghouse.routers.status import create_status_endpoints
+from clearinghouse.utils.maintenance_utils import MaintenanceJob, MaintenanceRunner
+
+VERSION = "v1"
+
+"""
+Tests for the status router. Uses sample data in the repo.
+"""
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('SCHWAB_LOCAL_MODE', 'true')
+    return TestClient(app)
+
+
+def test_get_account_details(client):
+    resp = client.get(f"/{VERSION}/accounts/default")
+    assert resp.status_code == 200
+    assert resp.json()["meta"]["type"] == "AccountDetails"
+
+
+def test_get_linked_account_details(client):
+    resp = client.get(f"/{VERSION}/accounts/1234")
+    assert resp.status_code == 200
+    assert resp.json()["meta"]["type"] == "AccountDetails"
+    assert client.get(f"/{VERSION}/accounts/0000").status_code == 404
+
+
+def test_get_household_book(client):
+    resp = client.get(f"/{VERSION}/household")
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert resp.json()["meta"]["type"] == "HouseholdBook"
+    assert [b["account_number"] for b in data["balances"]] == ["1234"]
+    assert data["summary"]["positions"] == len(data["positions"])
+
+
+def test_quote_cache_stats(client):
+    """
+    Repeated quote requests for the same symbol should be served from the cache.
+    """
+    before = client.get(f"/{VERSION}/cache/quotes").json()["data"]
+    client.get(f"/{VERSION}/quotes/AAPL")
+    client.get(f"/{VERSION}/quotes/AAPL")
+    after = client.get(f"/{VERSION}/cache/quotes").json()["data"]
+
+    assert after["hits"] + after["misses"] == before["hits"] + before["misses"] + 2
+    assert after["hits"] >= before["hits"] + 1
+
+
+def test_account_cache_stats(client):
+    client.get(f"/{VERSION}/positions")
+    client.get(f"/{VERSION}/positions")
+    data = client.get(f"/{VERSION}/cache/accounts").json()["data"]
+    assert data.keys() == {"balances", "positions"}
+    assert data["positions"]["hits"] >= 1
+
+
+def test_scheduler_stats(client):
+    resp = client.get(f"/{VERSION}/scheduler")
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert set(data["queue_depth"]) == {"orders", "reads", "background"}
+    assert data["rejected"] == 0
+
+
+def test_maintenance_health(client):
+    resp = client.get(f"/{VERSION}/maintenance")
+    assert resp.status_code == 200
+    assert resp.json()["data"] == {"running": False, "jobs": {}}
+
+
+def test_maintenance_health_times_are_utc():
+    async def noop():
+        pass
+
+    service = LocalSchwabService()
+    service.maintenance = MaintenanceRunner([MaintenanceJob("noop", noop, interval=60)])
+    assert asyncio.run(service.maintenance.run_once("noop"))
+    router_app = FastAPI()
+    router_app.include_router(create_status_endpoints(service))
+
+    job = TestClient(router_app).get(f"/{VERSION}/maintenance").json()["data"]["jobs"]["noop"]
+    last_run = datetime.datetime.fromisoformat(job["last_run"])
+    assert last_run.tzinfo is not None
+    assert abs(last_run - datetime.datetime.now(datetime.timezone.utc)) < datetime.timedelta(seconds=5)
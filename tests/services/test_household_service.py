@@ -0,0 +1,78 @@
+import asyncio
+import collections
+import copy
+
+import clearinghouse.data.sample_data as sample_data
+from clearinghouse.dependencies import LocalSchwabClient, LocalSchwabService
+from clearinghouse.services.household_service import fetch_household_book
+from clearinghouse.utils.cache_utils import CoalescingTTLCache
+
+"""
+Tests for the household view over all linked accounts, with a second account short IBM.
+"""
+
+
+class HouseholdLocalClient(LocalSchwabClient):
+    def __init__(self):
+        super().__init__()
+        self.balance_calls = collections.Counter()
+
+    def account_linked(self):
+        return self._generate_response([
+            {"accountNumber": "1234", "hashValue": "abcde"},
+            {"accountNumber": "5678", "hashValue": "fghij"},
+        ])
+
+    def account_details(self, accountHash: str, fields: str = None):
+        if fields != "positions":
+            self.balance_calls[accountHash] += 1
+        if accountHash != "fghij" or fields != "positions":
+            return super().account_details(accountHash, fields)
+        positions = copy.deepcopy(sample_data.ACCOUNT_DETAILS_ALL["securitiesAccount"]["positions"])
+        ibm = next(p for p in positions if p["instrument"]["symbol"] == "IBM")
+        ibm["shortQuantity"], ibm["longQuantity"] = ibm["longQuantity"], 0
+        ibm["marketValue"] = -ibm["marketValue"]
+        return self._generate_response([ibm])
+
+
+def household_service() -> LocalSchwabService:
+    service = LocalSchwabService()
+    service.client = HouseholdLocalClient()
+    service.set_default_trading_account()
+    return service
+
+
+def test_household_book_nets_positions():
+    book = asyncio.run(fetch_household_book(household_service()))
+
+    assert [b.account_number for b in book.balances] == ["1234", "5678"]
+    positions = {p.symbol: p for p in book.positions}
+    assert len(positions) == 5
+
+    ibm = positions["IBM"]
+    assert ibm.quantity == 0
+    assert [(a.account_number, a.quantity) for a in ibm.accounts] == [
+        ("1234", ibm.accounts[0].quantity), ("5678", -ibm.accounts[0].quantity)]
+    assert [a.account_number for a in positions["AAPL"].accounts] == ["1234"]
+    assert book.summary.positions == 5
+
+
+def test_household_book_single_account():
+    service = LocalSchwabService()
+    book = asyncio.run(fetch_household_book(service))
+
+    assert [b.account_number for b in book.balances] == ["1234"]
+    assert all(len(p.accounts) == 1 for p in book.positions)
+    assert book.summary.account_value == 7550
+
+
+def test_household_book_loads_balances_once_per_account():
+    service = LocalSchwabService()
+    # Nothing stays cached, so only loads in flight at the same time are shared
+    service.account_cache = CoalescingTTLCache(maxsize=16, ttl=0)
+    service.client = HouseholdLocalClient()
+    service.set_default_trading_account()
+
+    asyncio.run(fetch_household_book(service))
+
+    assert service.client.balance_calls == {"abcde": 1, "fghij": 1}
@@ -0,0 +1,79 @@
+import asyncio
+
+from clearinghouse.dependencies import LocalSchwabService, LocalSchwabClient
+from clearinghouse.services.maintenance_service import create_maintenance_runner
+from clearinghouse.utils.maintenance_utils import ManualClock
+
+"""
+Tests for the maintenance jobs of the Schwab service, on a stand-in clock.
+"""
+
+
+class RenewalCountingSchwabService(LocalSchwabService):
+    def __init__(self):
+        super().__init__()
+        self.renewals = 0
+        self.clock = ManualClock()
+        self.maintenance_jitter = 0
+
+    def _renew_refresh_token(self) -> str:
+        self.renewals += 1
+        return ""
+
+
+def test_token_renewal_runs_every_interval():
+    service = RenewalCountingSchwabService()
+    service.order_sync_interval = 3 * 24 * 3600
+    service.transaction_sync_interval = service.account_refresh_interval = 0
+    runner = create_maintenance_runner(service, service.clock)
+
+    async def run():
+        runner.start()
+        await service.clock.advance(0)
+        renewals_at_start = service.renewals
+        await service.clock.advance(13 * 24 * 3600)
+        await runner.stop()
+        return renewals_at_start
+
+    assert asyncio.run(run()) == 0
+    assert service.renewals == 2
+    health = runner.health()
+    assert health["token_renewal"]["runs"] == 2
+    assert health["order_sync"]["failures"] == 0 and health["order_sync"]["runs"] == 5
+    assert service.order_store.is_synced
+
+
+def test_account_status_refreshed_before_expiry():
+    service = RenewalCountingSchwabService()
+    service.order_sync_interval = service.transaction_sync_interval = service.token_renewal_interval = 0
+    runner = create_maintenance_runner(service, service.clock)
+
+    async def run():
+        runner.start()
+        await service.clock.advance(service.account_refresh_interval)
+        await runner.stop()
+
+    asyncio.run(run())
+    assert set(runner.jobs) == {"account_status"}
+    assert service.account_cache.stats()["misses"] == 1
+
+
+class MultiAccountLocalClient(LocalSchwabClient):
+    def account_linked(self):
+        return self._generate_response([
+            {"accountNumber": "1234", "hashValue": "abcde"},
+            {"accountNumber": "5678", "hashValue": "fghij"},
+        ])
+
+
+def test_linked_accounts_synced():
+    service = RenewalCountingSchwabService()
+    service.client = MultiAccountLocalClient()
+    service.set_default_trading_account()
+    runner = create_maintenance_runner(service, service.clock)
+    other = service.accounts.get("5678")
+
+    assert {"order_sync:5678", "transaction_sync:5678"} <= set(runner.jobs)
+    assert asyncio.run(runner.run_once("order_sync:5678"))
+    assert other.order_store.is_synced
+    assert not service.order_store.is_synced
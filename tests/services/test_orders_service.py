@@ -0,0 +1,486 @@
+import asyncio
+import copy
+import datetime
+import math
+import threading
+import time
+from typing import List
+
+import msgspec
+import pytest
+import requests
+
+import clearinghouse.data.sample_data as sample_data
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.dependencies import LocalSchwabService, LocalSchwabClient, FaultInjectingSchwabClient, Fault
+from clearinghouse.models.request import NumericalOrder, AdjustmentOrder, FractionalOrder
+from clearinghouse.exceptions import IdempotencyKeyConflictException
+from clearinghouse.utils.retry_utils import RetryPolicy
+from clearinghouse.utils.rate_limit_utils import OutboundScheduler
+from clearinghouse.services.orders_service import (
+    place_orders,
+    cancel_order_request,
+    rebalance_to_fractions,
+    adjust_bulk_positions_fractions,
+    fetch_positions_by_symbol,
+    decode_orders,
+    schwab_to_ch_order,
+)
+from clearinghouse.services.status_service import fetch_account_status
+
+"""
+Tests for the orders service using the local Schwab client.
+"""
+
+
+class SlowLocalSchwabClient(LocalSchwabClient):
+    """
+    Local client that blocks on order placement and records the peak number of in-flight calls.
+    Orders for the symbol "FAIL" are rejected.
+    """
+    def __init__(self, delay: float = 0.02):
+        super().__init__()
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def order_place(self, accountHash: str, order: dict):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+
+        symbol = order["order_leg_collection"][0]["instrument"]["symbol"]
+        return self._generate_response(None, status_code=400 if symbol == "FAIL" else 201)
+
+
+@pytest.fixture
+def schwab_service():
+    service = LocalSchwabService()
+    service.client = SlowLocalSchwabClient()
+    service.max_concurrent_orders = 4
+    return service
+
+
+def _market_orders(symbols):
+    return [NumericalOrder(symbol=s, instruction="BUY", quantity=1) for s in symbols]
+
+
+def test_place_orders_preserves_input_order(schwab_service):
+    symbols = [f"S{i}" for i in range(12)]
+    results, count = asyncio.run(place_orders(schwab_service, _market_orders(symbols)))
+
+    assert [r.symbol for r in results] == symbols
+    assert count["SUCCEEDED"] == 12
+
+
+def test_place_orders_bounded_concurrency(schwab_service):
+    asyncio.run(place_orders(schwab_service, _market_orders([f"S{i}" for i in range(12)])))
+
+    assert 1 < schwab_service.client.max_in_flight <= schwab_service.max_concurrent_orders
+
+
+def test_place_orders_counts_failures(schwab_service):
+    results, count = asyncio.run(place_orders(schwab_service, _market_orders(["A", "FAIL", "B"])))
+
+    assert [r.status for r in results] == ["SUCCEEDED", "FAILED", "SUCCEEDED"]
+    assert count == {"IGNORED": 0, "FAILED": 1, "SUCCEEDED": 2, "PREVIEW": 0}
+
+
+def test_place_orders_preview_skips_submission(schwab_service):
+    results, count = asyncio.run(place_orders(schwab_service, _market_orders(["A", "B"]), preview=True))
+
+    assert count["PREVIEW"] == 2
+    assert schwab_service.client.max_in_flight == 0
+
+
+class CountingLocalSchwabClient(LocalSchwabClient):
+    """
+    Local client that counts quote requests.
+    """
+    def __init__(self):
+        super().__init__()
+        self.quote_calls = 0
+        self.quotes_calls = 0
+
+    def quote(self, symbol_id, fields=None):
+        self.quote_calls += 1
+        return super().quote(symbol_id, fields)
+
+    def quotes(self, symbols, fields=None, indicative=False):
+        self.quotes_calls += 1
+        return super().quotes(symbols, fields, indicative)
+
+
+def test_place_orders_prefetches_limit_prices_in_one_request():
+    service = LocalSchwabService()
+    service.client = CountingLocalSchwabClient()
+    orders = [
+        NumericalOrder(symbol="AAPL" if i % 2 else "AMD", instruction="BUY" if i % 3 else "SELL",
+                       quantity=1, order_type="LIMIT")
+        for i in range(100)
+    ]
+
+    results, count = asyncio.run(place_orders(service, orders, preview=True))
+
+    assert service.client.quotes_calls == 1
+    assert service.client.quote_calls == 0
+    assert count["PREVIEW"] == 100
+    for order in orders:
+        quote = sample_data.QUOTES[order.symbol]["quote"]
+        assert order.price == (quote["bidPrice"] if order.instruction == "BUY" else quote["askPrice"])
+
+
+def test_place_orders_unknown_limit_symbol():
+    service = LocalSchwabService()
+    orders = [NumericalOrder(symbol="ZZZZ", instruction="BUY", quantity=1, order_type="LIMIT")]
+
+    with pytest.raises(ValueError, match="No market data"):
+        asyncio.run(place_orders(service, orders, preview=True))
+
+
+def test_default_limit_price_skips_partial_streamed_quote():
+    service = LocalSchwabService()
+    service.quote_book.live = True
+    service.quote_book.apply("AAPL", {"price": 1.0})
+    orders = [NumericalOrder(symbol="AAPL", instruction="BUY", quantity=1, order_type="LIMIT")]
+
+    asyncio.run(place_orders(service, orders, preview=True))
+
+    assert orders[0].price == sample_data.QUOTES["AAPL"]["quote"]["bidPrice"]
+
+def test_adjust_bulk_positions_uses_one_positions_snapshot():
+    service = LocalSchwabService()
+    calls = []
+    account_details = service.client.account_details
+
+    def counting_account_details(*args, **kwargs):
+        calls.append(kwargs.get("fields"))
+        return account_details(*args, **kwargs)
+
+    service.client.account_details = counting_account_details
+    orders = [
+        AdjustmentOrder(symbol="AAPL", adjustment=0.5),
+        AdjustmentOrder(symbol="GOOGL", adjustment=-1),
+        AdjustmentOrder(symbol="AMD", adjustment=0),
+        AdjustmentOrder(symbol="TSLA", adjustment=0.1),
+    ]
+
+    results, count = asyncio.run(adjust_bulk_positions_fractions(service, orders, preview=True))
+
+    # Positions are fetched once, alongside the account balances for the snapshot
+    assert calls.count("positions") == 1
+    assert [r.symbol for r in results] == ["AAPL", "GOOGL", "AMD", "TSLA"]
+    assert [r.status for r in results] == ["PREVIEW", "PREVIEW", "IGNORED", "FAILED"]
+    assert results[0].instruction == "BUY" and results[0].quantity == 5
+    assert results[1].instruction == "SELL" and results[1].total_position_size == 0
+    assert count == {"IGNORED": 1, "FAILED": 1, "SUCCEEDED": 0, "PREVIEW": 2}
+
+
+def test_adjust_bulk_positions_round_down():
+    service = LocalSchwabService()
+    positions = asyncio.run(fetch_positions_by_symbol(service))
+    orders = [AdjustmentOrder(symbol="AAPL", adjustment=0.33)]
+
+    results, _ = asyncio.run(adjust_bulk_positions_fractions(
+        service, orders, round_down=True, preview=True, positions=positions))
+
+    assert results[0].total_position_size == 13
+    assert results[0].quantity == 3
+
+
+def test_decode_orders_native_and_fallback_timestamps():
+    """
+    Standard timestamps decode natively, non-standard ones through the fallback parser, and cancelTime is optional
+    """
+    base = dict(sample_data.ACCOUNT_ORDERS_ALL[0])
+    standard = msgspec.json.encode([base])
+    orders = decode_orders(standard, List[schwab_response.Order])
+    assert orders[0].entered_time == datetime.datetime(2023, 4, 5, tzinfo=datetime.timezone.utc)
+
+    odd = {**base, "enteredTime": "04/05/2023 09:30:00"}
+    del odd["cancelTime"]
+    orders = decode_orders(msgspec.json.encode([base, odd]), List[schwab_response.Order])
+    mapped = [schwab_to_ch_order(o) for o in orders]
+    assert mapped[0].cancel_time == datetime.datetime(2023, 4, 5, tzinfo=datetime.timezone.utc)
+    assert mapped[1].entered_time == datetime.datetime(2023, 4, 5, 9, 30)
+    assert mapped[1].cancel_time is None
+
+
+def test_rebalance_to_fractions_preview():
+    service = LocalSchwabService()
+    service.client = CountingLocalSchwabClient()
+    targets = [
+        FractionalOrder(symbol="AAPL", fraction=0.5),
+        FractionalOrder(symbol="AMD", fraction=0.0),
+        FractionalOrder(symbol="ZZZZ", fraction=0.1),
+    ]
+
+    results, count = asyncio.run(rebalance_to_fractions(service, targets))
+
+    # Sample balances have no liquidation value, so fractions are of the positions' total value
+    aapl_price = sample_data.QUOTES["AAPL"]["quote"]["lastPrice"]
+    # Rounding up would spend more than the targets, so AAPL is rounded down
+    expected_aapl = math.floor(0.5 * 7550 / aapl_price)
+    assert [(r.symbol, r.instruction, r.quantity, r.status) for r in results] == [
+        ("AMD", "BUY_TO_COVER", 5, "PREVIEW"),
+        ("AAPL", "BUY" if expected_aapl > 10 else "SELL", abs(expected_aapl - 10), "PREVIEW"),
+        ("ZZZZ", "BUY", 0, "FAILED"),
+    ]
+    assert [r.fraction for r in results] == [0.0, 0.5, 0.1]
+    assert count == {"IGNORED": 0, "FAILED": 1, "SUCCEEDED": 0, "PREVIEW": 2}
+    assert service.client.quotes_calls == 1
+
+
+def test_place_orders_realizes_fractional_orders(schwab_service):
+    # 10.2 shares of AAPL on target rounds to the 10 already held
+    held = FractionalOrder(symbol="AAPL", fraction=10.2 * sample_data.QUOTES["AAPL"]["quote"]["lastPrice"] / 7550)
+    results, count = asyncio.run(place_orders(
+        schwab_service, [held, NumericalOrder(symbol="A", instruction="BUY", quantity=1)], preview=True))
+
+    assert [(r.symbol, r.status) for r in results] == [("A", "PREVIEW"), ("AAPL", "IGNORED")]
+    assert count["IGNORED"] == 1
+
+
+@pytest.fixture
+def faulty_service():
+    service = LocalSchwabService()
+    service.client = FaultInjectingSchwabClient()
+    service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    return service
+
+
+def test_place_orders_retries_transient_failure(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=503))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A"])))
+
+    assert count["SUCCEEDED"] == 1
+    assert client.calls["order_place"] == 2
+    # The order was not found among the recent orders before it was placed again
+    assert client.calls["account_orders"] == 1
+    assert len(client.placed_orders) == 1
+
+
+def test_place_orders_does_not_duplicate_accepted_order(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=504, applied=True))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A", "B"])))
+
+    # The matching order may have been placed by someone else, so it is not reported as placed
+    assert [r.status for r in results] == ["FAILED", "SUCCEEDED"]
+    assert "A matching order 1 was entered since" in results[0].info
+    assert client.calls["order_place"] == 2
+    assert len(client.placed_orders) == 2
+
+
+def test_place_orders_identical_orders_after_lost_responses(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(error=requests.ConnectionError(), applied=True), Fault(status_code=502))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A", "A"])))
+
+    # The order accepted despite the error is claimed once, the other one is placed again
+    assert count["SUCCEEDED"] == 1
+    assert count["FAILED"] == 1
+    assert len(client.placed_orders) == 2
+
+
+def test_place_orders_checks_after_last_attempt(faulty_service):
+    client = faulty_service.client
+    client.inject(
+        "order_place", Fault(status_code=503), Fault(status_code=503),
+        Fault(error=requests.ConnectionError(), applied=True))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A"])))
+
+    assert count["FAILED"] == 1
+    assert "A matching order 1 was entered since" in results[0].info
+    assert client.calls["order_place"] == 3
+    assert client.calls["account_orders"] == 3
+    assert len(client.placed_orders) == 1
+
+
+def test_place_orders_rate_limited_retry_skips_check(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=429, retry_after=0))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A"])))
+
+    assert count["SUCCEEDED"] == 1
+    assert client.calls["account_orders"] == 0
+
+
+def test_place_orders_gives_up(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=400), *[Fault(status_code=500)] * 3)
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["BAD", "DOWN"])))
+
+    assert [r.status for r in results] == ["FAILED", "FAILED"]
+    assert results[0].info == "Schwab responded with status 400"
+    assert client.calls["order_place"] == 4
+    assert client.placed_orders == []
+
+
+def test_place_orders_unverified_failure_not_retried(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=503))
+    client.inject("account_orders", Fault(status_code=500))
+
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A"])))
+
+    assert count["FAILED"] == 1
+    assert "may have been placed" in results[0].info
+    assert client.calls["order_place"] == 1
+
+
+def test_place_orders_idempotency_key(faulty_service):
+    client = faulty_service.client
+    order = NumericalOrder(symbol="A", instruction="BUY", quantity=1, idempotency_key="rebalance-1")
+
+    async def submit_twice():
+        first = await place_orders(faulty_service, [order, order.model_copy()])
+        second = await place_orders(faulty_service, [order.model_copy()])
+        return first, second
+
+    (first, _), (second, _) = asyncio.run(submit_twice())
+
+    assert [r.status for r in first + second] == ["SUCCEEDED"] * 3
+    assert second[0].idempotency_key == "rebalance-1"
+    assert client.calls["order_place"] == 1
+
+
+def test_place_orders_failed_idempotency_key_can_be_retried(faulty_service):
+    client = faulty_service.client
+    client.inject("order_place", Fault(status_code=400))
+    order = NumericalOrder(symbol="A", instruction="BUY", quantity=1, idempotency_key="k")
+
+    first, _ = asyncio.run(place_orders(faulty_service, [order]))
+    second, _ = asyncio.run(place_orders(faulty_service, [order]))
+
+    assert (first[0].status, second[0].status) == ("FAILED", "SUCCEEDED")
+
+
+def test_place_orders_idempotency_key_reused_for_different_order(faulty_service):
+    order = NumericalOrder(symbol="A", instruction="BUY", quantity=1, idempotency_key="k")
+    asyncio.run(place_orders(faulty_service, [order]))
+
+    with pytest.raises(IdempotencyKeyConflictException):
+        asyncio.run(place_orders(faulty_service, [order.model_copy(update={"quantity": 2})]))
+    with pytest.raises(IdempotencyKeyConflictException):
+        asyncio.run(place_orders(faulty_service, [
+            NumericalOrder(symbol="B", instruction="BUY", quantity=1, idempotency_key="other"),
+            NumericalOrder(symbol="C", instruction="BUY", quantity=1, idempotency_key="other"),
+        ]))
+    assert faulty_service.client.calls["order_place"] == 1
+
+
+def test_place_orders_idempotency_keys_after_rate_limit(faulty_service):
+    orders = [
+        NumericalOrder(symbol=s, instruction="BUY", quantity=1, idempotency_key=f"batch-{s}")
+        for s in ["A", "B", "C", "D", "E", "F"]
+    ]
+    faulty_service.outbound_scheduler = OutboundScheduler(limits={"orders": 3}, max_wait=0)
+    _, first = asyncio.run(place_orders(faulty_service, orders))
+
+    # Submitting the batch again under the same keys only places the rejected orders
+    faulty_service.outbound_scheduler = OutboundScheduler()
+    _, second = asyncio.run(place_orders(faulty_service, [o.model_copy() for o in orders]))
+
+    assert first["FAILED"] == 3
+    assert second["SUCCEEDED"] == 6
+    assert faulty_service.client.calls["order_place"] == 6
+
+def test_cancel_order_retries(faulty_service):
+    faulty_service.client.inject("order_cancel", Fault(status_code=502))
+
+    assert asyncio.run(cancel_order_request(faulty_service, "1")) == 204
+    assert faulty_service.client.calls["order_cancel"] == 2
+
+
+def test_place_orders_rate_limited_partway(faulty_service):
+    # Room for 3 placements, the rest of the batch is rejected instead of queued
+    faulty_service.outbound_scheduler = OutboundScheduler(limits={"orders": 3}, max_wait=0)
+    results, count = asyncio.run(place_orders(faulty_service, _market_orders(["A", "B", "C", "D", "E", "F"])))
+
+    assert faulty_service.client.calls["order_place"] == 3
+    assert len(faulty_service.client.placed_orders) == 3
+    assert count["SUCCEEDED"] == 3 and count["FAILED"] == 3
+    assert [r.symbol for r in results] == ["A", "B", "C", "D", "E", "F"]
+    assert all("retry after" in r.info for r in results if r.status == "FAILED")
+
+def test_account_state_cached_until_orders_change(faulty_service):
+    calls = []
+    account_details = faulty_service.client.account_details
+
+    def counting_account_details(*args, **kwargs):
+        calls.append(kwargs.get("fields"))
+        return account_details(*args, **kwargs)
+
+    faulty_service.client.account_details = counting_account_details
+
+    async def run():
+        await fetch_positions_by_symbol(faulty_service)
+        await fetch_positions_by_symbol(faulty_service)
+        assert sorted(calls, key=str) == [None, "positions"]
+
+        await place_orders(faulty_service, _market_orders(["A"]), preview=True)
+        await fetch_positions_by_symbol(faulty_service)
+        assert len(calls) == 2
+
+        await place_orders(faulty_service, _market_orders(["A"]))
+        await fetch_positions_by_symbol(faulty_service)
+        assert len(calls) == 4
+
+        await cancel_order_request(faulty_service, "1")
+        await fetch_positions_by_symbol(faulty_service)
+        assert len(calls) == 6
+
+    asyncio.run(run())
+
+
+class TradingBalancesClient(FaultInjectingSchwabClient):
+    """
+    Local client whose balances count the placed orders. A balance read is held until an order is placed, so it
+    returns the balances from before the order after Schwab accepted it.
+    """
+    def __init__(self):
+        super().__init__()
+        self.read_started = threading.Event()
+        self.release_read = threading.Event()
+
+    def account_details(self, accountHash: str, fields: str = None):
+        placed = len(self.placed_orders)
+        self.read_started.set()
+        self.release_read.wait(timeout=5)
+        data = copy.deepcopy(sample_data.ACCOUNT_DETAILS_ALL)
+        data["securitiesAccount"]["currentBalances"]["placedOrders"] = placed
+        return self._generate_response(data)
+
+    def order_place(self, accountHash: str, order: dict):
+        resp = super().order_place(accountHash, order)
+        self.release_read.set()
+        return resp
+
+
+def test_read_racing_placement_does_not_cache_pre_trade_balances():
+    service = LocalSchwabService()
+    service.client = TradingBalancesClient()
+
+    async def run():
+        # A read that fetched the balances before the order is answered after it
+        read = asyncio.create_task(fetch_account_status(service))
+        await asyncio.to_thread(service.client.read_started.wait, 5)
+        await place_orders(service, _market_orders(["A"]))
+        stale = await read
+        return stale, await fetch_account_status(service)
+
+    stale, fresh = asyncio.run(run())
+    assert stale.current_balances["placedOrders"] == 0
+    assert fresh.current_balances["placedOrders"] == 1
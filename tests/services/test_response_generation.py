@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+
+import pytest
+
+from clearinghouse.dependencies import LocalSchwabService
+from clearinghouse.models import response, response_structs
+from clearinghouse.models.response import (
+    GenericCollectionResponse,
+    GenericItemResponse,
+    Position,
+    Lot,
+)
+from clearinghouse.services.orders_service import (
+    fetch_orders,
+    fetch_positions,
+    fetch_quotes,
+    fetch_transactions,
+)
+from clearinghouse.services.response_generation import (
+    encode_generic_response,
+    generate_meta_data,
+    _event_chunks,
+)
+
+"""
+Tests for the msgspec response path. Its output must match the pydantic serialization byte for byte.
+"""
+
+
+@pytest.fixture
+def service():
+    return LocalSchwabService()
+
+
+def test_encoded_collections_match_pydantic(service):
+    """
+    Structs returned by the services encode the same as their pydantic response models
+    """
+    meta = generate_meta_data("List")
+    collections = [
+        (response.StandardOrder, asyncio.run(fetch_orders(service))),
+        (response.Position, asyncio.run(fetch_positions(service))),
+        (response.Transaction, asyncio.run(fetch_transactions(service))),
+        (response.Quote, asyncio.run(fetch_quotes(service, ["AAPL", "MSFT"]))),
+        (response.Quote, []),
+    ]
+    for model, data in collections:
+        models = [model.model_validate(item, from_attributes=True) for item in data]
+        expected = GenericCollectionResponse(meta=meta, data=models).model_dump_json().encode()
+        assert encode_generic_response(meta, data) == expected
+        assert encode_generic_response(meta, models) == expected
+
+
+def test_struct_fields_match_models():
+    pairs = [
+        (response.StandardOrder, response_structs.StandardOrder),
+        (response.Position, response_structs.Position),
+        (response.Lot, response_structs.Lot),
+        (response.Transaction, response_structs.Transaction),
+        (response.Quote, response_structs.Quote),
+    ]
+    for model, struct in pairs:
+        assert tuple(model.model_fields) == struct.__struct_fields__
+
+
+def test_encoded_item_matches_pydantic():
+    meta = generate_meta_data("Position")
+    position = Position(
+        symbol="ÄBC",
+        asset_type="EQUITY",
+        quantity=3,
+        lots=[Lot(acquisition_date=datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc), quantity=3, price=1e20)],
+        market_value=0.1 + 0.2,
+        entry_value=-0.0,
+        net_change=1e-7,
+    )
+    for data in (position, None):
+        expected = GenericItemResponse(meta=meta, data=data or {}).model_dump_json().encode()
+        assert encode_generic_response(meta, data) == expected
+
+
+def test_event_stream_heartbeat_and_close():
+    closed = []
+
+    async def slow_items():
+        try:
+            yield {"a": 1}
+            await asyncio.sleep(0.05)
+            yield {"a": 2}
+            await asyncio.sleep(3600)
+            yield {"a": 3}
+        finally:
+            closed.append(True)
+
+    async def run():
+        chunks = []
+        events = _event_chunks("Item", slow_items(), heartbeat=0.02)
+        async for chunk in events:
+            chunks.append(chunk)
+            if chunk.startswith(b"event") and b'"a":2' in chunk:
+                break
+        await events.aclose()
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert chunks[0] == b'event: Item\ndata: {"a":1}\n\n'
+    assert b": keepalive\n\n" in chunks[1:-1]
+    assert chunks[-1] == b'event: Item\ndata: {"a":2}\n\n'
+    assert closed == [True]
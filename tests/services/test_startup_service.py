@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from clearinghouse.dependencies import LocalSchwabService
+from clearinghouse.exceptions import ServiceUnavailableException
+from clearinghouse.services.startup_service import ServiceStartup, require_started
+
+"""
+Tests for the background startup of the Schwab service.
+"""
+
+
+class SlowStartingSchwabService(LocalSchwabService):
+    """
+    Local service that has to be started, taking delay seconds and failing the first failures attempts.
+    """
+    def __init__(self, delay: float = 0.05, failures: int = 0):
+        super().__init__()
+        self._started.clear()
+        self.delay = delay
+        self.failures = failures
+        self.attempts = 0
+        self.order_sync_interval = 0
+        self.transaction_sync_interval = 0
+
+    def _start(self):
+        self.attempts += 1
+        time.sleep(self.delay)
+        if self.attempts <= self.failures:
+            raise ConnectionError("Schwab unreachable")
+        super()._start()
+
+
+def test_startup_runs_in_background():
+    service = SlowStartingSchwabService()
+    startup = ServiceStartup(service)
+
+    async def run():
+        task = startup.launch()
+        await asyncio.sleep(0)
+        status_while_starting = startup.status
+        # The event loop stays free while the service starts
+        await asyncio.sleep(0.01)
+        await task
+        return status_while_starting
+
+    assert asyncio.run(run()) == "starting"
+    assert startup.status == "ready"
+    assert service.started
+    assert set(startup.durations) == {"start", "account_status", "account_positions"}
+    assert service.account_cache.stats()["size"] == 1
+
+
+def test_startup_retries_failed_start():
+    service = SlowStartingSchwabService(delay=0, failures=2)
+    startup = ServiceStartup(service, retry=0)
+
+    asyncio.run(startup.run())
+
+    assert service.attempts == 3
+    assert startup.readiness() == {"status": "ready"}
+
+
+def test_startup_reports_error_while_retrying():
+    service = SlowStartingSchwabService(delay=0, failures=100)
+    startup = ServiceStartup(service, retry=0.01)
+
+    async def run():
+        startup.launch()
+        await asyncio.sleep(0.05)
+        readiness = startup.readiness()
+        await startup.aclose()
+        return readiness
+
+    readiness = asyncio.run(run())
+    assert readiness["status"] == "starting"
+    assert "Schwab unreachable" in readiness["detail"]
+
+
+def test_startup_starts_maintenance():
+    service = SlowStartingSchwabService(delay=0)
+    service.order_sync_interval = 60
+    service.quote_stream = True
+    startup = ServiceStartup(service)
+
+    async def run():
+        await startup.run()
+        running = (service.maintenance.running, [not t.done() for t in startup.tasks])
+        await startup.aclose()
+        return running
+
+    assert asyncio.run(run()) == (True, [True])
+    assert set(service.maintenance.jobs) == {"token_renewal", "account_status", "order_sync"}
+    assert not service.maintenance.running
+    assert all(t.cancelled() for t in startup.tasks)
+
+
+def test_require_started():
+    service = SlowStartingSchwabService(delay=0)
+
+    async def run():
+        with pytest.raises(ServiceUnavailableException) as e:
+            await require_started(service, wait=0.01)()
+        waiting = asyncio.create_task(require_started(service, wait=1)())
+        await service.start()
+        await waiting
+        return e.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503 and error.headers["Retry-After"] == "5"
+
+
+def test_root_readiness(monkeypatch):
+    from clearinghouse import main
+
+    monkeypatch.setattr(main, "schwab_service", SlowStartingSchwabService(delay=0))
+    client = TestClient(main.app)
+    resp = client.get("/")
+    assert resp.status_code == 503
+    assert resp.json() == {"status": "starting"}
+
+    asyncio.run(main.schwab_service.start())
+    assert client.get("/").json() == {"status": "healthy"}
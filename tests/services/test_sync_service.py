@@ -0,0 +1,296 @@
+import asyncio
+import copy
+import datetime
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import clearinghouse.data.sample_data as sample_data
+from clearinghouse.dependencies import LocalSchwabService, LocalSchwabClient
+from clearinghouse.routers.orders import create_order_endpoints
+from clearinghouse.services.orders_service import fetch_quotes, get_default_limit_price
+from clearinghouse.services.sync_service import (
+    OrderStatusWatcher,
+    stream_quotes,
+    sync_orders,
+    sync_transactions,
+    fetch_synced_orders,
+    SYNC_OVERLAP,
+    MAX_TRANSACTION_WINDOW,
+)
+
+"""
+Tests for the background syncs and the local stores they fill.
+"""
+
+
+class OrderHistoryLocalSchwabClient(LocalSchwabClient):
+    """
+    Local client with a mutable order history. Records the windows requested and the orders re-checked.
+    """
+    def __init__(self):
+        super().__init__()
+        self.orders = {}
+        self.windows = []
+        self.detail_calls = []
+
+    def add_order(self, order_id: int, entered_time: datetime.datetime, status: str = "WORKING"):
+        order = dict(sample_data.ACCOUNT_ORDERS_ALL[0])
+        order.update(orderId=order_id, status=status, enteredTime=entered_time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+        self.orders[order_id] = order
+
+    def account_orders(self, accountHash, fromEnteredTime, toEnteredTime, maxResults=None, status=None):
+        start = datetime.datetime.fromisoformat(fromEnteredTime).astimezone()
+        self.windows.append(start)
+        data = [o for o in self.orders.values() if datetime.datetime.fromisoformat(o["enteredTime"]) >= start]
+        return self._generate_response(data)
+
+    def order_details(self, accountHash, orderId):
+        self.detail_calls.append(int(orderId))
+        return self._generate_response(self.orders[int(orderId)])
+
+
+class TransactionHistoryLocalSchwabClient(LocalSchwabClient):
+    """
+    Local client with a transaction history. Records the windows requested.
+    """
+    def __init__(self):
+        super().__init__()
+        self.history = []
+        self.windows = []
+
+    def add_transaction(self, activity_id: int, time: datetime.datetime, symbol: str):
+        transaction = copy.deepcopy(sample_data.TRANSACTIONS[0])
+        transaction.update(activityId=activity_id, time=time.isoformat(), tradeDate=time.isoformat())
+        transaction["transferItems"][0]["instrument"]["symbol"] = symbol
+        self.history.append(transaction)
+
+    def transactions(self, accountHash, startDate, endDate, types, symbol=None):
+        startDate, endDate = startDate.astimezone(), endDate.astimezone()
+        self.windows.append((startDate, endDate))
+        data = [
+            t for t in self.history
+            if startDate <= datetime.datetime.fromisoformat(t["time"]) < endDate
+        ]
+        return self._generate_response(data)
+
+
+class QuoteCountingLocalSchwabClient(LocalSchwabClient):
+    """
+    Local client that records the symbols of every quotes request.
+    """
+    def __init__(self):
+        super().__init__()
+        self.quote_requests = []
+
+    def quotes(self, symbols, fields=None, indicative=False):
+        self.quote_requests.append(list(symbols))
+        return super().quotes(symbols, fields, indicative)
+
+
+@pytest.fixture
+def service():
+    service = LocalSchwabService()
+    service.client = OrderHistoryLocalSchwabClient()
+    return service
+
+
+def test_sync_uses_high_water_mark_and_rechecks_open_orders(service):
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    service.client.add_order(1, now - datetime.timedelta(days=2), status="WORKING")
+    service.client.add_order(2, now - datetime.timedelta(days=1), status="FILLED")
+    service.client.add_order(3, now - datetime.timedelta(hours=1), status="QUEUED")
+
+    assert asyncio.run(sync_orders(service)) == 3
+    assert service.order_store.high_water_mark == now - datetime.timedelta(hours=1)
+
+    service.client.orders[1]["status"] = "CANCELED"
+    service.client.add_order(4, now - datetime.timedelta(minutes=5), status="FILLED")
+    asyncio.run(sync_orders(service))
+
+    # Only the window since the high-water mark is requested, older open orders are re-checked one by one
+    assert service.client.windows[-1] == now - datetime.timedelta(hours=1) - SYNC_OVERLAP
+    assert service.client.detail_calls == [1]
+    statuses = {o.order_id: o.status for o in fetch_synced_orders(service)}
+    assert statuses == {1: "CANCELED", 2: "FILLED", 3: "QUEUED", 4: "FILLED"}
+
+    # Order 1 is terminal now and is not re-checked again, order 3 is still open but now before the window
+    asyncio.run(sync_orders(service))
+    assert service.client.detail_calls == [1, 3]
+
+
+def test_synced_orders_query(service):
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    for i in range(5):
+        service.client.add_order(i, now - datetime.timedelta(hours=i), status="FILLED" if i % 2 else "WORKING")
+
+    assert fetch_synced_orders(service) is None
+    asyncio.run(sync_orders(service))
+
+    assert [o.order_id for o in fetch_synced_orders(service, max_results=3)] == [0, 1, 2]
+    assert [o.order_id for o in fetch_synced_orders(service, status="FILLED")] == [1, 3]
+    naive_start = (now - datetime.timedelta(hours=2, minutes=30)).astimezone().replace(tzinfo=None)
+    assert [o.order_id for o in fetch_synced_orders(service, start_date=naive_start)] == [0, 1, 2]
+    # Windows reaching past the synced history are not served from the store
+    assert fetch_synced_orders(service, start_date=now - datetime.timedelta(days=30)) is None
+
+
+def test_get_orders_reports_staleness(service):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    service.client.add_order(1, now - datetime.timedelta(hours=1))
+    app = FastAPI()
+    app.include_router(create_order_endpoints(service))
+    client = TestClient(app)
+
+    assert client.get("/v1/orders").json()["meta"]["staleness"] is None
+
+    asyncio.run(sync_orders(service))
+    service.client.add_order(2, now)  # not synced yet, so not served
+    body = client.get("/v1/orders").json()
+    assert body["meta"]["staleness"] >= 0
+    assert [o["order_id"] for o in body["data"]] == [1]
+
+
+def test_sync_transactions_backfills_in_chunks_then_serves_symbols():
+    service = LocalSchwabService()
+    service.client = TransactionHistoryLocalSchwabClient()
+    service.ledger_backfill_days = 400
+    now = datetime.datetime.now(datetime.timezone.utc)
+    service.client.add_transaction(1, now - datetime.timedelta(days=390), "AAPL")
+    service.client.add_transaction(2, now - datetime.timedelta(days=3), "MSFT")
+    service.client.add_transaction(3, now - datetime.timedelta(days=1), "AAPL")
+
+    assert asyncio.run(sync_transactions(service)) == 3
+    # A backfill longer than Schwab's limit is split into windows
+    assert len(service.client.windows) == 2
+    assert all(end - start <= MAX_TRANSACTION_WINDOW for start, end in service.client.windows)
+
+    service.client.windows.clear()
+    asyncio.run(sync_transactions(service))
+    assert service.client.windows[0][0] == now - datetime.timedelta(days=1) - SYNC_OVERLAP
+
+    app = FastAPI()
+    app.include_router(create_order_endpoints(service))
+    client = TestClient(app)
+    start = (now - datetime.timedelta(days=395)).isoformat()
+    body = client.get("/v1/transactions", params={"start_date": start, "symbols": "AAPL"}).json()
+    assert body["meta"]["staleness"] >= 0
+    assert [t["id"] for t in body["data"]] == [1, 3]
+
+    # Windows reaching past the ledger's history go to Schwab
+    start = (now - datetime.timedelta(days=500)).isoformat()
+    assert client.get("/v1/transactions", params={"start_date": start}).json()["meta"]["staleness"] is None
+
+
+def test_transactions_by_symbol_sync_the_window_first():
+    service = LocalSchwabService()
+    service.client = TransactionHistoryLocalSchwabClient()
+    service.ledger_backfill_days = 30
+    now = datetime.datetime.now(datetime.timezone.utc)
+    service.client.add_transaction(1, now - datetime.timedelta(days=60), "AAPL")
+    service.client.add_transaction(2, now - datetime.timedelta(days=3), "MSFT")
+    service.client.add_transaction(3, now - datetime.timedelta(days=1), "AAPL")
+
+    app = FastAPI()
+    app.include_router(create_order_endpoints(service))
+    client = TestClient(app)
+    # Symbols are never filtered on rows fetched straight from Schwab, so the unsynced ledger is synced first
+    body = client.get("/v1/transactions", params={"symbols": "AAPL"}).json()
+    assert body["meta"]["staleness"] >= 0
+    assert [t["id"] for t in body["data"]] == [3]
+
+    # A window reaching past the backfill is synced back to its start
+    start = (now - datetime.timedelta(days=90)).isoformat()
+    body = client.get("/v1/transactions", params={"start_date": start, "symbols": "AAPL"}).json()
+    assert [t["id"] for t in body["data"]] == [1, 3]
+    assert service.transaction_ledger.covers(now - datetime.timedelta(days=90))
+
+
+def test_quote_stream_serves_quotes_without_requests():
+    service = LocalSchwabService()
+    service.client = QuoteCountingLocalSchwabClient()
+
+    async def run():
+        stream = asyncio.create_task(stream_quotes(service))
+        while len(service.quote_book) < 2:
+            await asyncio.sleep(0.01)
+
+        # Held positions with sample quotes were subscribed when the stream started
+        streamed = await fetch_quotes(service, ["AAPL", "AMD"])
+        bid = await get_default_limit_price(service, "AAPL")
+        assert service.client.quote_requests == []
+
+        # Anything else falls back to REST and is subscribed for next time
+        await fetch_quotes(service, ["AAPL", "MSFT"])
+        assert service.client.quote_requests == [["MSFT"]]
+        assert "MSFT" in service.quote_source.subscribed
+
+        stream.cancel()
+        await asyncio.gather(stream, return_exceptions=True)
+        return streamed, bid
+
+    streamed, bid = asyncio.run(run())
+    assert [(q.symbol, q.price) for q in streamed] == [
+        (s, sample_data.QUOTES[s]["quote"]["lastPrice"]) for s in ("AAPL", "AMD")
+    ]
+    assert bid == sample_data.QUOTES["AAPL"]["quote"]["bidPrice"]
+    assert service.quote_source is None
+    assert not service.quote_book.live and len(service.quote_book) == 0
+
+
+def test_order_watcher_dedups_polls_across_subscribers(service):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for order_id in (1, 2, 3):
+        service.client.add_order(order_id, now, status="WORKING")
+    watcher = OrderStatusWatcher(service, interval=3600)
+
+    async def collect(order_ids, received):
+        async for order in watcher.watch(order_ids):
+            received.append((order.order_id, order.status))
+
+    async def run():
+        received = {name: [] for name in "abc"}
+        subscribers = [
+            asyncio.create_task(collect([1, 2], received["a"])),
+            asyncio.create_task(collect([2, 3], received["b"])),
+            asyncio.create_task(collect([2], received["c"])),
+        ]
+        await asyncio.sleep(0.05)  # first poll publishes the current states
+        assert sorted(service.client.detail_calls) == [1, 2, 3]
+
+        service.client.orders[2]["status"] = "FILLED"
+        assert await watcher.poll() == 3
+        service.client.orders[1]["status"] = "CANCELED"
+        service.client.orders[3]["status"] = "FILLED"
+        # Order 2 is terminal and no longer polled
+        assert await watcher.poll() == 2
+        await asyncio.gather(*subscribers)
+        return received
+
+    received = asyncio.run(run())
+    assert received["a"] == [(1, "WORKING"), (2, "WORKING"), (2, "FILLED"), (1, "CANCELED")]
+    assert received["b"] == [(2, "WORKING"), (3, "WORKING"), (2, "FILLED"), (3, "FILLED")]
+    assert received["c"] == [(2, "WORKING"), (2, "FILLED")]
+    assert service.client.detail_calls.count(2) == 2
+    assert watcher.watched == set()
+    assert {o.order_id: o.status for o in service.order_store.query()} == {1: "CANCELED", 2: "FILLED", 3: "FILLED"}
+
+
+def test_order_events_endpoint(service):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    service.client.add_order(1, now, status="FILLED")
+    service.client.add_order(2, now, status="REJECTED")
+    app = FastAPI()
+    app.include_router(create_order_endpoints(service))
+    client = TestClient(app)
+
+    with client.stream("GET", "/v1/orders/events", params={"order_ids": [1, 2]}) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [e for e in resp.read().decode().split("\n\n") if e]
+
+    assert all(e.startswith("event: OrderDetails\ndata: ") for e in events)
+    orders = [json.loads(e.split("data: ", 1)[1]) for e in events]
+    assert sorted((o["order_id"], o["status"]) for o in orders) == [(1, "FILLED"), (2, "REJECTED")]
+    assert client.get("/v1/orders/events").status_code == 422
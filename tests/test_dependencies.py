@@ -1,7 +1,18 @@
+import asyncio
 import os
+
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
-from clearinghouse.dependencies import SchwabService, EnvSettings, SafetySettings
+from clearinghouse.dependencies import (
+    SchwabService,
+    EnvSettings,
+    SafetySettings,
+    AsyncSchwabClient,
+    LocalSchwabService,
+    LocalSchwabClient,
+)
+from clearinghouse.exceptions import UnknownAccountException
 
 
 @pytest.fixture
@@ -120,3 +131,97 @@ def test_custom_settings():
     assert custom_settings.max_position_fraction == 0.5
     assert custom_settings.allowed_currencies == ["USD", "EUR"]
     assert custom_settings.restricted_securities == ["XYZ", "ABC"]
+
+
+def test_async_schwab_client_requests():
+    """
+    The async client should hit the Schwab endpoints with bearer auth and drop unset parameters.
+    """
+    requests_seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        return httpx.Response(200, json={})
+
+    tokens = MagicMock()
+    tokens.access_token = "access"
+    client = AsyncSchwabClient(tokens=tokens, transport=httpx.MockTransport(handler))
+
+    async def run():
+        await client.account_details("hash123", fields="positions")
+        await client.quotes(["AAPL", "AMD"])
+        await client.order_place("hash123", order={"orderType": "MARKET"})
+        await client.aclose()
+
+    asyncio.run(run())
+
+    details, quotes, place = requests_seen
+    assert details.url.path == "/trader/v1/accounts/hash123"
+    assert details.url.params["fields"] == "positions"
+    assert details.headers["Authorization"] == "Bearer access"
+    assert quotes.url.path == "/marketdata/v1/quotes"
+    assert quotes.url.params["symbols"] == "AAPL,AMD"
+    assert place.method == "POST"
+    assert place.content == b'{"orderType":"MARKET"}'
+
+
+def test_local_service_async_client():
+    service = LocalSchwabService()
+    resp = asyncio.run(service.async_client.quote(["AAPL"]))
+    assert resp.status_code == 200
+    assert "AAPL" in resp.json()
+
+
+class MultiAccountLocalClient(LocalSchwabClient):
+    def account_linked(self):
+        return self._generate_response([
+            {"accountNumber": "1234", "hashValue": "abcde"},
+            {"accountNumber": "5678", "hashValue": "fghij"},
+        ])
+
+
+def multi_account_service() -> LocalSchwabService:
+    service = LocalSchwabService()
+    service.client = MultiAccountLocalClient()
+    service.set_default_trading_account()
+    return service
+
+
+def test_account_pool_resolves_linked_accounts():
+    service = multi_account_service()
+    assert service.accounts.account_numbers == ["1234", "5678"]
+    assert len(service.accounts) == 2
+
+    assert service.accounts.get() is service
+    assert service.accounts.get("abcde") is service
+    other = service.accounts.get("5678")
+    assert other.account_number == "5678"
+    assert other.account_hash == "fghij"
+    # Resolved once, by number or by hash
+    assert service.accounts.get("fghij") is other
+    assert service.accounts.all() == [service, other]
+
+    with pytest.raises(UnknownAccountException):
+        service.accounts.get("0000")
+
+
+def test_account_pool_shares_clients():
+    service = multi_account_service()
+    other = service.accounts.get("5678")
+
+    assert other.client is service.client
+    assert other.outbound_scheduler is service.outbound_scheduler
+    assert other.quote_cache is service.quote_cache
+    assert other.account_cache is not service.account_cache
+    assert other.order_store is not service.order_store
+    assert other.transaction_ledger is not service.transaction_ledger
+
+
+def test_account_pool_sees_later_client_and_quote_source():
+    service = multi_account_service()
+    other = service.accounts.get("5678")
+
+    service.client = MultiAccountLocalClient()
+    service.quote_source = service.create_quote_source()
+    assert other.client is service.client
+    assert other.quote_source is service.quote_source
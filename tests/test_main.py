@@ -1,3 +1,4 @@
+import asyncio
 import importlib
 from unittest.mock import patch, MagicMock
 from clearinghouse.dependencies import LocalSchwabService
@@ -31,3 +32,35 @@ def test_schwab_service_in_local_mode(monkeypatch):
 
             assert main.schwab_service is not None
             MockLocalSchwabService.assert_called_once()
+
+
+def test_lifespan_starts_services_in_background(monkeypatch):
+    from fastapi.testclient import TestClient
+    from clearinghouse import main
+
+    monkeypatch.setattr(main, "schwab_service", LocalSchwabService())
+    with TestClient(main.app) as client:
+        assert client.get("/").json() == {"status": "healthy"}
+        startup = main.app.state.startup
+        assert startup.schwab_service is main.schwab_service
+
+
+def test_lifespans_on_new_loops_answer_503_while_starting(monkeypatch):
+    from fastapi.testclient import TestClient
+    from clearinghouse import main
+    from clearinghouse.services import startup_service
+
+    async def never_start():
+        await asyncio.Event().wait()
+
+    # Earlier tests reload the app with mocked services
+    importlib.reload(main)
+    service = main.get_global_schwab_service()
+    monkeypatch.setattr(service, "_started", asyncio.Event())
+    monkeypatch.setattr(service, "start", never_start)
+    monkeypatch.setattr(startup_service, "STARTUP_WAIT", 0.05)
+    # Each TestClient session runs the lifespan on its own event loop
+    for _ in range(2):
+        with TestClient(main.app) as client:
+            resp = client.get("/v1/positions")
+            assert resp.status_code == 503
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from clearinghouse.utils.cache_utils import CoalescingTTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_hits_and_misses():
+    cache = CoalescingTTLCache(maxsize=10, ttl=5)
+    calls = []
+
+    def loader(keys):
+        calls.append(keys)
+        return {k: k.lower() for k in keys}
+
+    assert cache.get_many(["A", "B"], loader) == {"A": "a", "B": "b"}
+    assert cache.get_many(["B", "C"], loader) == {"B": "b", "C": "c"}
+
+    assert calls == [["A", "B"], ["C"]]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_entries_expire():
+    timer = FakeTimer()
+    cache = CoalescingTTLCache(maxsize=10, ttl=5, timer=timer)
+    calls = []
+
+    def loader(keys):
+        calls.append(keys)
+        return {k: timer.now for k in keys}
+
+    assert cache.get("A", lambda k: loader([k])[k]) == 0.0
+    timer.now = 4
+    assert cache.get("A", lambda k: loader([k])[k]) == 0.0
+    timer.now = 6
+    assert cache.get("A", lambda k: loader([k])[k]) == 6
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CoalescingTTLCache(maxsize=2, ttl=60)
+
+    def loader(keys):
+        return {k: k for k in keys}
+
+    cache.get_many(["A", "B"], loader)
+    cache.get_many(["A"], loader)
+    cache.get_many(["C"], loader)
+
+    assert cache.stats()["size"] == 2
+    misses = cache.misses
+    cache.get_many(["A", "C"], loader)
+    assert cache.misses == misses
+    cache.get_many(["B"], loader)
+    assert cache.misses == misses + 1
+
+
+def test_cache_missing_keys_not_cached():
+    cache = CoalescingTTLCache(maxsize=10, ttl=60)
+    assert cache.get_many(["A", "B"], lambda keys: {"A": 1}) == {"A": 1}
+    assert cache.stats()["size"] == 1
+
+
+def test_cache_coalesces_concurrent_misses():
+    cache = CoalescingTTLCache(maxsize=10, ttl=60)
+    started = threading.Event()
+    calls = []
+
+    def loader(keys):
+        calls.append(keys)
+        started.set()
+        time.sleep(0.05)
+        return {k: k for k in keys}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_many(["A"], loader)))
+    first.start()
+    started.wait()
+    others = [threading.Thread(target=lambda: results.append(cache.get_many(["A"], loader))) for _ in range(4)]
+    for t in others:
+        t.start()
+    for t in [first] + others:
+        t.join()
+
+    assert calls == [["A"]]
+    assert results == [{"A": "A"}] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_cache_loader_error_propagates_and_is_not_cached():
+    cache = CoalescingTTLCache(maxsize=10, ttl=60)
+
+    def failing_loader(keys):
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_many(["A"], failing_loader)
+    assert cache.get_many(["A"], lambda keys: {"A": 1}) == {"A": 1}
+
+
+def test_cache_invalidate():
+    cache = CoalescingTTLCache(maxsize=10, ttl=60)
+    cache.get_many(["A", "B"], lambda keys: {k: k for k in keys})
+    cache.invalidate("A")
+    assert cache.stats()["size"] == 1
+    assert (cache.peek("A"), cache.peek("B")) == (None, "B")
+    assert cache.stats()["hits"] == 0
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_invalidate_discards_load_in_flight():
+    cache = CoalescingTTLCache(maxsize=10, ttl=60)
+    version = {"A": 1}
+    release = asyncio.Event()
+
+    async def slow_loader(keys):
+        loaded = {k: version[k] for k in keys}
+        await release.wait()
+        return loaded
+
+    async def scenario():
+        stale = asyncio.create_task(cache.aget_many(["A"], slow_loader))
+        await asyncio.sleep(0)
+        version["A"] = 2
+        cache.invalidate("A")
+        fresh = asyncio.create_task(cache.aget_many(["A"], slow_loader))
+        await asyncio.sleep(0)
+        release.set()
+        return await stale, await fresh
+
+    stale, fresh = asyncio.run(scenario())
+    # The load started before the invalidation still answers its caller but is not cached
+    assert stale == {"A": 1}
+    assert fresh == {"A": 2}
+    assert cache.get("A", lambda k: 3) == 2
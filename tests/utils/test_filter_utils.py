@@ -0,0 +1,91 @@
+import datetime
+import itertools
+import random
+
+from clearinghouse.models.request import PositionsFilter, TransactionsFilter
+from clearinghouse.models.response_structs import Position, Transaction
+from clearinghouse.utils.filter_utils import compile_positions_filter, compile_transactions_filter
+
+"""
+Tests for compiled filter predicates against a clause-by-clause reference.
+"""
+
+UTC = datetime.timezone.utc
+START = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def make_positions(n: int = 200):
+    rng = random.Random(0)
+    return [
+        Position(
+            symbol=rng.choice(["AAPL", "MSFT", "VTI", "BND"]),
+            asset_type=rng.choice(["EQUITY", "MUTUAL_FUND"]),
+            quantity=rng.uniform(-10, 10),
+            lots=[],
+            market_value=rng.uniform(-1000, 1000),
+            entry_value=0.0,
+            net_change=0.0,
+        )
+        for _ in range(n)
+    ]
+
+
+def reference_positions(data, f: PositionsFilter):
+    return [
+        p for p in data
+        if (not f.asset_types or p.asset_type in f.asset_types)
+        and (f.shorts or p.quantity >= 0)
+        and (f.longs or p.quantity <= 0)
+        and (f.min_position_size is None or p.market_value >= f.min_position_size)
+        and (f.max_position_size is None or p.market_value <= f.max_position_size)
+        and (not f.symbols or p.symbol in f.symbols)
+    ]
+
+
+def test_positions_filter_matches_reference():
+    data = make_positions()
+    options = itertools.product(
+        [None, ["EQUITY"], ["EQUITY", "MUTUAL_FUND"]],
+        [True, False],
+        [True, False],
+        [None, -100.0],
+        [None, 500.0],
+        [[], ["AAPL"], ["AAPL", "BND"]],
+    )
+    for asset_types, shorts, longs, min_size, max_size, symbols in options:
+        f = PositionsFilter(
+            asset_types=asset_types, shorts=shorts, longs=longs,
+            min_position_size=min_size, max_position_size=max_size, symbols=symbols,
+        )
+        assert list(compile_positions_filter(f).apply(data)) == reference_positions(data, f)
+
+
+def test_inactive_and_pushed_down_clauses_are_dropped():
+    assert compile_positions_filter(PositionsFilter(symbols=[])).predicate is None
+    assert compile_positions_filter(PositionsFilter(symbols=["AAPL"]), pushed_down={"symbols"}).predicate is None
+
+    f = TransactionsFilter(types=["TRADE"], start_date=START, symbols=[])
+    assert compile_transactions_filter(f).predicate is not None
+    assert compile_transactions_filter(f, pushed_down={"types", "start_date"}).predicate is None
+
+
+def test_transactions_filter_dates_and_types():
+    data = [
+        Transaction(
+            id=i, order_id=i, time=START + datetime.timedelta(days=i), type="TRADE" if i % 2 else "JOURNAL",
+            status="VALID", net_amount=0.0, trade_date=START,
+        )
+        for i in range(10)
+    ]
+    f = TransactionsFilter(
+        types=["TRADE"],
+        start_date=START + datetime.timedelta(days=2),
+        end_date=START + datetime.timedelta(days=7),
+        symbols=[],
+    )
+    assert [t.id for t in compile_transactions_filter(f).apply(data)] == [3, 5, 7]
+
+    # Naive bounds are local time
+    naive_start = (START + datetime.timedelta(days=8)).astimezone().replace(tzinfo=None)
+    f = TransactionsFilter(start_date=naive_start, symbols=[])
+    assert [t.id for t in compile_transactions_filter(f).apply(data)] == [8, 9]
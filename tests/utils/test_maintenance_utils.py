@@ -0,0 +1,81 @@
+import asyncio
+import datetime
+
+from clearinghouse.utils.maintenance_utils import ManualClock, MaintenanceJob, MaintenanceRunner
+
+"""
+Tests for the maintenance runner on a stand-in clock.
+"""
+
+
+def test_jobs_run_on_their_intervals():
+    clock = ManualClock()
+    runs = []
+
+    async def job(name):
+        runs.append((name, clock.time()))
+
+    runner = MaintenanceRunner([
+        MaintenanceJob("fast", lambda: job("fast"), interval=10, jitter=0),
+        MaintenanceJob("slow", lambda: job("slow"), interval=25, jitter=0, run_at_start=False),
+    ], clock=clock)
+
+    async def run():
+        runner.start()
+        await asyncio.sleep(0)
+        await clock.advance(30)
+        await runner.stop()
+
+    asyncio.run(run())
+    assert runs == [("fast", 0), ("fast", 10), ("fast", 20), ("slow", 25), ("fast", 30)]
+
+
+def test_jitter_spreads_runs():
+    runner = MaintenanceRunner([MaintenanceJob("job", lambda: None, interval=100, jitter=0.2)], rng=lambda: 0.0)
+    assert runner._wait(runner.jobs["job"]) == 80
+    runner._rng = lambda: 0.999999
+    assert 119.9 < runner._wait(runner.jobs["job"]) <= 120
+
+
+def test_failures_are_reported_and_retried():
+    clock = ManualClock()
+    outcomes = [RuntimeError("token expired"), RuntimeError("token expired"), None]
+
+    async def renew():
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+
+    runner = MaintenanceRunner(
+        [MaintenanceJob("renewal", renew, interval=1000, jitter=0, retry_interval=5)],
+        clock=clock, max_failures=2)
+
+    async def run():
+        runner.start()
+        await clock.advance(5)
+        unhealthy = runner.health()["renewal"]
+        await clock.advance(5)
+        await runner.stop()
+        return unhealthy
+
+    unhealthy = asyncio.run(run())
+    assert unhealthy["healthy"] is False
+    assert unhealthy["consecutive_failures"] == 2
+    assert unhealthy["last_error"] == "RuntimeError: token expired"
+
+    health = runner.health()["renewal"]
+    assert health["healthy"] is True
+    assert (health["runs"], health["failures"]) == (3, 2)
+    # Clock times are reported as UTC datetimes, the clock is at 10 after the last success
+    assert health["last_success"].tzinfo is datetime.timezone.utc
+    assert abs(health["last_success"] - datetime.datetime.now(datetime.timezone.utc)) < datetime.timedelta(seconds=5)
+    assert health["next_run"] - health["last_success"] == datetime.timedelta(seconds=1000)
+
+
+def test_run_timeout_counts_as_failure():
+    async def hang():
+        await asyncio.sleep(10)
+
+    runner = MaintenanceRunner([MaintenanceJob("hang", hang, interval=1, timeout=0.01)])
+    assert asyncio.run(runner.run_once("hang")) is False
+    assert runner.health()["hang"]["last_error"].startswith("TimeoutError")
@@ -0,0 +1,84 @@
+import copy
+from typing import List
+
+import msgspec
+import numpy as np
+import pytest
+
+import clearinghouse.data.sample_data as sample_data
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.utils.portfolio_utils import PositionsSnapshot
+
+"""
+Tests for the columnar positions snapshot.
+"""
+
+
+def sample_positions(short_symbol: str = None) -> List[schwab_response.SchwabPosition]:
+    raw = copy.deepcopy(sample_data.ACCOUNT_DETAILS_ALL["securitiesAccount"]["positions"])
+    for p in raw:
+        if p["instrument"]["symbol"] == short_symbol:
+            p["shortQuantity"], p["longQuantity"] = p["longQuantity"], 0
+            p["marketValue"] = -p["marketValue"]
+    return msgspec.json.decode(msgspec.json.encode(raw), type=List[schwab_response.SchwabPosition])
+
+
+def test_account_fraction_uses_account_value():
+    positions = sample_positions()
+    snapshot = PositionsSnapshot.from_schwab(positions, account_value=20_000)
+
+    expected = [p.market_value / 20_000 for p in positions]
+    assert snapshot.account_fraction.tolist() == pytest.approx(expected)
+    assert [p.account_fraction for p in snapshot.to_positions()] == pytest.approx(expected)
+    assert snapshot.fraction_of("AAPL") == pytest.approx(1500 / 20_000)
+    assert snapshot.fraction_of("TSLA") == 0.0
+
+
+def test_account_fraction_falls_back_to_positions_value():
+    snapshot = PositionsSnapshot.from_schwab(sample_positions(), account_value=0)
+    assert snapshot.account_value == pytest.approx(7550)
+    assert snapshot.account_fraction.sum() == pytest.approx(1)
+
+
+def test_summary_with_short_position():
+    snapshot = PositionsSnapshot.from_schwab(sample_positions(short_symbol="IBM"), account_value=10_000)
+    summary = snapshot.summary()
+
+    assert summary.positions == 5
+    assert summary.long_exposure == pytest.approx(5750)
+    assert summary.short_exposure == pytest.approx(1800)
+    assert summary.net_exposure == pytest.approx(3950)
+    assert summary.gross_exposure == pytest.approx(7550)
+    assert np.abs(snapshot.weights).sum() == pytest.approx(1)
+    assert snapshot.quantity[snapshot.symbols.index("IBM")] == -15
+
+    ibm = next(p for p in snapshot.to_positions() if p.symbol == "IBM")
+    assert ibm.quantity == 15
+    assert ibm.account_fraction == pytest.approx(-0.18)
+
+
+def test_select_keeps_account_value():
+    snapshot = PositionsSnapshot.from_schwab(sample_positions(), account_value=0)
+    selected = snapshot.select({"AAPL", "TSLA"})
+    assert selected.symbols == ["AAPL"]
+    assert selected.fraction_of("AAPL") == snapshot.fraction_of("AAPL")
+
+
+def test_merge_nets_positions_across_accounts():
+    first = PositionsSnapshot.from_schwab(sample_positions(), account_value=10_000)
+    second = PositionsSnapshot.from_schwab(sample_positions(short_symbol="IBM"), account_value=10_000)
+    book = PositionsSnapshot.merge([first, second])
+
+    assert book.symbols == first.symbols
+    assert book.account_value == 20_000
+    ibm = book.symbols.index("IBM")
+    assert book.quantity[ibm] == 0
+    assert book.market_value[ibm] == pytest.approx(0)
+    assert book.fraction_of("AAPL") == pytest.approx(2 * 1500 / 20_000)
+    assert book.day_profit_loss.sum() == pytest.approx(first.day_profit_loss.sum() + second.day_profit_loss.sum())
+
+
+def test_merge_without_accounts():
+    book = PositionsSnapshot.merge([])
+    assert len(book) == 0
+    assert book.summary().positions == 0
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from clearinghouse.dependencies import LocalSchwabService
+from clearinghouse.exceptions import RateLimitedException
+from clearinghouse.routers.orders import create_order_endpoints
+from clearinghouse.utils.rate_limit_utils import (
+    OutboundScheduler,
+    TokenBucket,
+    background_priority,
+    endpoint_class,
+    endpoint_priority,
+    PRIORITY_ORDERS,
+    PRIORITY_READS,
+    PRIORITY_BACKGROUND,
+)
+
+"""
+Tests for the outbound rate limits and priority scheduling.
+"""
+
+
+def test_token_bucket_refills_up_to_capacity():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=3, timer=lambda: now[0])
+    for _ in range(3):
+        bucket.take()
+    assert bucket.tokens == 0
+    assert bucket.time_until(1) == 0.5
+
+    now[0] = 1.0
+    assert bucket.tokens == 2
+    now[0] = 100.0
+    assert bucket.tokens == 3
+
+
+def test_endpoint_classes_and_priorities():
+    assert endpoint_class("order_place") == "orders"
+    assert endpoint_class("quotes") == "market_data"
+    assert endpoint_class("account_details") == "accounts"
+    assert endpoint_priority("order_cancel") == PRIORITY_ORDERS
+    assert endpoint_priority("account_orders") == PRIORITY_READS
+    with background_priority():
+        assert endpoint_priority("quotes") == PRIORITY_BACKGROUND
+    assert endpoint_priority("quotes") == PRIORITY_READS
+
+
+def test_queued_calls_are_granted_by_priority():
+    # 20 calls per second once the initial burst is used up
+    scheduler = OutboundScheduler({"all": 1200}, max_wait=None)
+
+    async def run():
+        for _ in range(1200):
+            await scheduler.acquire("accounts")
+        granted = []
+
+        async def call(name, cls, priority):
+            await scheduler.acquire(cls, priority)
+            granted.append(name)
+
+        tasks = [
+            asyncio.create_task(call("sync", "accounts", PRIORITY_BACKGROUND)),
+            asyncio.create_task(call("read", "market_data", PRIORITY_READS)),
+            asyncio.create_task(call("order", "orders", PRIORITY_ORDERS)),
+        ]
+        await asyncio.sleep(0)
+        depth = scheduler.queue_depth()
+        await asyncio.gather(*tasks)
+        return granted, depth
+
+    granted, depth = asyncio.run(run())
+    assert granted == ["order", "read", "sync"]
+    assert depth == {"orders": 1, "reads": 1, "background": 1}
+    stats = scheduler.stats()
+    assert stats["granted"] == 1203 and stats["peak_queue"] == 3 and stats["waited"] > 0
+
+
+def test_exhausted_class_does_not_block_other_classes():
+    scheduler = OutboundScheduler({"all": 100, "orders": 1}, max_wait=None)
+
+    async def run():
+        await scheduler.acquire("orders", PRIORITY_ORDERS)
+        blocked = asyncio.create_task(scheduler.acquire("orders", PRIORITY_ORDERS))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.acquire("market_data"), timeout=1)
+        assert not blocked.done()
+        blocked.cancel()
+
+    asyncio.run(run())
+
+
+def test_backpressure_rejects_with_retry_after():
+    scheduler = OutboundScheduler({"market_data": 6}, max_wait=1)
+
+    async def run():
+        for _ in range(6):
+            await scheduler.acquire("market_data")
+        with pytest.raises(RateLimitedException) as e:
+            await scheduler.acquire("market_data")
+        # Background calls wait instead of being rejected
+        background = asyncio.create_task(scheduler.acquire("market_data", PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth()["background"] == 1
+        background.cancel()
+        await asyncio.gather(background, return_exceptions=True)
+        return e.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == "10"
+    assert scheduler.rejected == 1 and scheduler.queue_depth()["background"] == 0
+
+
+def test_rate_limited_request_returns_429():
+    service = LocalSchwabService()
+    service.outbound_scheduler = OutboundScheduler({"market_data": 1}, max_wait=0)
+    app = FastAPI()
+    app.include_router(create_order_endpoints(service))
+    client = TestClient(app)
+
+    assert client.get("/v1/quotes/AAPL").status_code == 200
+    resp = client.get("/v1/quotes/AMD")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) == 60
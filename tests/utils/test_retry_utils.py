@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from clearinghouse.utils.retry_utils import RetryPolicy, call_with_retry, is_retryable, retry_after
+
+"""
+Tests for the retry classification and backoff.
+"""
+
+
+def _response(status_code: int, headers=None) -> httpx.Response:
+    return httpx.Response(status_code, headers=headers)
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert policy.delay(1, rng=lambda: 0.999) < 1
+    assert policy.delay(3, rng=lambda: 0.5) == 2
+    assert policy.delay(10, rng=lambda: 0.5) == 2.5
+    assert policy.delay(1, retry_after=3, rng=lambda: 0) == 3
+    assert policy.delay(1, retry_after=60, rng=lambda: 0) == 5
+
+
+def test_is_retryable():
+    assert is_retryable(_response(503))
+    assert is_retryable(_response(429))
+    assert not is_retryable(_response(400))
+    assert not is_retryable(_response(201))
+    assert is_retryable(error=httpx.ReadTimeout("timed out"))
+    assert is_retryable(error=requests.ConnectionError())
+    assert not is_retryable(error=ValueError())
+
+
+def test_retry_after_header():
+    assert retry_after(_response(429, {"Retry-After": "2"})) == 2
+    assert retry_after(_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+    assert retry_after(_response(429)) is None
+
+
+def _run(responses, policy=RetryPolicy(max_attempts=3), should_retry=None):
+    calls, delays = [], []
+
+    async def call():
+        item = responses[len(calls)]
+        calls.append(item)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    result = asyncio.run(call_with_retry(call, policy, should_retry, sleep=sleep))
+    return result, calls, delays
+
+
+def test_call_with_retry_until_success():
+    result, calls, delays = _run([_response(503), httpx.ConnectError("refused"), _response(201)])
+    assert result.status_code == 201
+    assert len(calls) == 3 and len(delays) == 2
+
+
+def test_call_with_retry_stops_on_permanent_failure():
+    result, calls, _ = _run([_response(400), _response(201)])
+    assert result.status_code == 400 and len(calls) == 1
+
+
+def test_call_with_retry_raises_last_error():
+    with pytest.raises(httpx.ConnectError):
+        _run([httpx.ConnectError("refused")] * 3)
+
+
+def test_call_with_retry_hook_can_stop():
+    async def should_retry(resp, error):
+        return False
+
+    result, calls, _ = _run([_response(503), _response(201)], should_retry=should_retry)
+    assert result.status_code == 503 and len(calls) == 1
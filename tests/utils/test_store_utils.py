@@ -0,0 +1,147 @@
+import copy
+import datetime
+from typing import List
+
+import msgspec
+
+import clearinghouse.data.sample_data as sample_data
+import clearinghouse.models.schwab_response as schwab_response
+from clearinghouse.models.response_structs import StandardOrder
+from clearinghouse.utils.store_utils import OrderStore, TransactionLedger, QuoteBook
+
+"""
+Tests for the SQLite transaction ledger and the quote book.
+"""
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_transactions(n: int) -> List[schwab_response.Transaction]:
+    raw = []
+    for i in range(n):
+        t = copy.deepcopy(sample_data.TRANSACTIONS[0])
+        time = START + datetime.timedelta(days=i, microseconds=i)
+        t.update(
+            activityId=i + 1,
+            orderId=100 + i % 3,
+            type="TRADE" if i % 2 else "DIVIDEND_OR_INTEREST",
+            time=time.isoformat(),
+            tradeDate=time.isoformat(),
+        )
+        t["transferItems"][0]["instrument"]["symbol"] = "AAPL" if i % 4 == 0 else "MSFT"
+        raw.append(t)
+    return msgspec.json.decode(msgspec.json.encode(raw), type=List[schwab_response.Transaction])
+
+
+def test_ingest_and_query():
+    ledger = TransactionLedger()
+    transactions = make_transactions(10)
+    assert ledger.ingest(transactions) == 10
+    assert ledger.ingest(transactions[:3]) == 3
+    assert len(ledger) == 10
+    assert ledger.high_water_mark == START + datetime.timedelta(days=9, microseconds=9)
+
+    assert [t.id for t in ledger.query(start_date=START + datetime.timedelta(days=7))] == [8, 9, 10]
+    assert [t.id for t in ledger.query(end_date=START + datetime.timedelta(days=1, microseconds=1))] == [1, 2]
+    assert [t.id for t in ledger.query(types=["TRADE"])] == [2, 4, 6, 8, 10]
+    assert [t.id for t in ledger.query(symbols=["AAPL"])] == [1, 5, 9]
+    assert [t.id for t in ledger.query(symbols=["CURRENCY_USD"], order_id=101)] == [2, 5, 8]
+    assert [t.id for t in ledger.query(types=["TRADE"], symbols=["AAPL", "MSFT"], start_date=START + datetime.timedelta(days=5))] == [6, 8, 10]
+
+    first = ledger.query()[0]
+    assert first.time == transactions[0].time
+    assert first.net_amount == transactions[0].net_amount
+
+
+def _order(order_id: int, status: str) -> StandardOrder:
+    return StandardOrder(
+        order_id=order_id,
+        is_filled=status == "FILLED",
+        total=100.0,
+        duration="DAY",
+        order_type="LIMIT",
+        price=100.0,
+        quantity=1,
+        filled_quantity=1 if status == "FILLED" else 0,
+        remaining_quantity=0 if status == "FILLED" else 1,
+        status=status,
+        entered_time=START + datetime.timedelta(days=order_id),
+        session="NORMAL",
+        cancelable=status == "WORKING",
+    )
+
+
+def test_order_store_evicts_oldest_terminal_orders():
+    store = OrderStore(maxsize=3)
+    store.upsert([_order(0, "WORKING"), _order(1, "FILLED"), _order(2, "CANCELED")])
+    store.mark_synced(START)
+    assert store.covers(START)
+
+    store.upsert([_order(3, "FILLED"), _order(4, "FILLED")])
+    assert len(store) == 3
+    # The open order is kept even though it is the oldest
+    assert [o.order_id for o in store.query()] == [4, 3, 0]
+    assert not store.covers(START + datetime.timedelta(days=2))
+    assert store.covers(START + datetime.timedelta(days=3))
+
+    # A later sync from an older window does not claim the evicted orders again
+    store.mark_synced(START)
+    assert not store.covers(START + datetime.timedelta(days=2))
+
+
+def test_coverage_and_staleness():
+    now = [1000.0]
+    ledger = TransactionLedger(timer=lambda: now[0])
+    assert not ledger.covers(None)
+    assert ledger.staleness() is None
+
+    ledger.mark_synced(START)
+    now[0] += 5
+    assert ledger.staleness() == 5
+    assert ledger.covers(START)
+    assert not ledger.covers(START - datetime.timedelta(seconds=1))
+
+
+def test_file_ledger_persists_in_wal_mode(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = TransactionLedger(path)
+    assert ledger._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    ledger.ingest(make_transactions(4))
+    ledger.mark_synced(START)
+    ledger.close()
+
+    reopened = TransactionLedger(path)
+    assert len(reopened) == 4
+    assert reopened.coverage_start == START
+    assert [t.id for t in reopened.query(symbols=["AAPL"])] == [1]
+
+
+def test_quote_book_merges_partial_updates():
+    now = [0.0]
+    book = QuoteBook(timer=lambda: now[0])
+    book.apply("AAPL", {"price": 10.0, "bid_price": 9.9, "ask_price": 10.1, "total_volume": 100})
+    now[0] = 3.0
+    book.apply("AAPL", {"bid_price": 9.95})
+
+    assert book.get_many(["AAPL"]) == {}
+    book.live = True
+    quote = book.get_many(["AAPL", "MSFT"])["AAPL"]
+    assert (quote.price, quote.bid_price, quote.ask_price, quote.total_volume) == (10.0, 9.95, 10.1, 100)
+    assert book.age("AAPL") == 0.0 and book.age("MSFT") is None
+
+    # Readers get copies that later updates do not change
+    book.apply("AAPL", {"price": 11.0})
+    assert quote.price == 10.0
+    assert book.get_many(["AAPL"])["AAPL"].price == 11.0
+
+
+def test_quote_book_serves_complete_quotes_only():
+    book = QuoteBook()
+    book.live = True
+    book.apply("AAPL", {"price": 10.0})
+    assert book.get_many(["AAPL"]) == {}
+
+    book.apply("AAPL", {"bid_price": 9.9})
+    book.apply("AAPL", {"ask_price": 10.1})
+    quote = book.get_many(["AAPL"])["AAPL"]
+    assert (quote.price, quote.bid_price, quote.ask_price) == (10.0, 9.9, 10.1)
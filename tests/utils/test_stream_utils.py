@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+
+import msgspec
+
+import clearinghouse.data.sample_data as sample_data
+from clearinghouse.utils.stream_utils import LocalReplayQuoteSource, parse_level_one
+
+"""
+Tests for the quote stream sources.
+"""
+
+
+def test_parse_level_one_skips_other_messages():
+    message = msgspec.json.encode({
+        "data": [
+            {"service": "LEVELONE_EQUITIES", "timestamp": 1729295935436, "command": "SUBS", "content": [
+                {"key": "AAPL", "delayed": False, "1": 234.86, "3": 234.87, "34": 1729295935436},
+                {"key": "AMD", "8": 1000},
+            ]},
+            {"service": "CHART_EQUITY", "content": [{"key": "AAPL", "1": 1.0}]},
+        ]
+    })
+
+    assert parse_level_one(message) == [
+        ("AAPL", {"bid_price": 234.86, "price": 234.87,
+                  "quote_time": datetime.datetime.fromtimestamp(1729295935.436)}),
+        ("AMD", {"total_volume": 1000}),
+    ]
+    assert parse_level_one('{"response": [{"service": "ADMIN", "command": "LOGIN"}]}') == []
+    assert parse_level_one('{"notify": [{"heartbeat": "1729295935436"}]}') == []
+
+
+def test_local_replay_source():
+    async def run():
+        source = LocalReplayQuoteSource(interval=0.01)
+        await source.start()
+        assert await source.subscribe(["AAPL", "ZZZZ", "AAPL"]) == ["AAPL", "ZZZZ"]
+        assert await source.subscribe(["AAPL"]) == []
+
+        updates = source.updates()
+        first, second = await anext(updates), await anext(updates)
+        await source.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    quote = sample_data.QUOTES["AAPL"]["quote"]
+    assert first == [("AAPL", {
+        "price": quote["lastPrice"],
+        "bid_price": quote["bidPrice"],
+        "ask_price": quote["askPrice"],
+        "total_volume": quote["totalVolume"],
+        "quote_time": datetime.datetime.fromtimestamp(quote["quoteTime"] / 1000),
+        "net_percent_change": quote["netPercentChange"],
+    })]
+    assert second == [("AAPL", {"price": quote["lastPrice"]})]
+
+
+def test_stop_ends_waiting_consumer():
+    async def run():
+        source = LocalReplayQuoteSource()
+        await source.start()
+        consumer = asyncio.create_task(anext(source.updates(), None))
+        await asyncio.sleep(0)
+        await source.stop()
+        return await asyncio.wait_for(consumer, timeout=1)
+
+    assert asyncio.run(run()) is None
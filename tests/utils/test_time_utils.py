@@ -0,0 +1,41 @@
+import datetime
+
+import pytest
+
+from clearinghouse.utils.time_utils import parse_timestamp, normalize_timestamps
+
+"""
+Tests for the fallback timestamp parser.
+"""
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2023-04-05T00:00:00+0000", datetime.datetime(2023, 4, 5, tzinfo=UTC)),
+    ("2023-04-05T01:02:03.250+0000", datetime.datetime(2023, 4, 5, 1, 2, 3, 250000, tzinfo=UTC)),
+    ("04/05/2023 01:02:03", datetime.datetime(2023, 4, 5, 1, 2, 3)),
+    (1680652800000, datetime.datetime(2023, 4, 5, tzinfo=UTC)),
+])
+def test_parse_timestamp(value, expected):
+    assert parse_timestamp(value) == expected
+
+
+def test_parse_timestamp_unrecognized():
+    with pytest.raises(ValueError):
+        parse_timestamp("yesterday")
+
+
+def test_parse_timestamp_memoized():
+    parse_timestamp.cache_clear()
+    parse_timestamp("04/05/2023 01:02:03")
+    parse_timestamp("04/05/2023 01:02:03")
+    assert parse_timestamp.cache_info().hits == 1
+
+
+def test_normalize_timestamps_skips_missing():
+    records = [{"enteredTime": "04/05/2023"}, {"enteredTime": "04/06/2023", "cancelTime": None}]
+    normalize_timestamps(records, ("enteredTime", "cancelTime"))
+    assert records[0] == {"enteredTime": datetime.datetime(2023, 4, 5)}
+    assert records[1]["enteredTime"] == datetime.datetime(2023, 4, 6)
+    assert records[1]["cancelTime"] is None
@@ -1,7 +1,12 @@
+import math
+import random
+from itertools import product
+
+import numpy as np
 import pytest
-from clearinghouse.utils.math_utils import calculate_rmse
-from clearinghouse.models.request import NumericalOrder
-from clearinghouse.utils.orders_utils import sort_orders, find_order_minimum_error
+from clearinghouse.utils.math_utils import calculate_rmse, calculate_rmse_batch, pad_options
+from clearinghouse.models.request import NumericalOrder, FractionalOrder
+from clearinghouse.utils.orders_utils import sort_orders, find_order_minimum_error, plan_rebalance
 
 
 def test_calculate_rmse_basic():
@@ -108,3 +113,181 @@ def test_find_order_minimum_error_no_valid_permutation():
     capital_cap = 200
     expected_result = {}
     assert find_order_minimum_error(order_options, capital_cap) == expected_result
+
+
+def _brute_force_minimum_error(order_options, capital_cap=float('inf')):
+    """Reference implementation: score every permutation of option indices."""
+    symbol_keys = list(order_options.keys())
+    best_permutation, smallest_rmse = None, float('inf')
+    for indices in product(*[range(len(options)) for _, options in order_options.values()]):
+        pairs = [(order_options[symbol_keys[k]][0], order_options[symbol_keys[k]][1][idx]) for k, idx in enumerate(indices)]
+        capital_value = 0
+        for _, value in pairs:
+            capital_value += value
+        if capital_value > capital_cap:
+            continue
+        rmse = calculate_rmse(pairs)
+        if rmse < smallest_rmse:
+            smallest_rmse, best_permutation = rmse, indices
+    if not best_permutation:
+        return {}
+    return {symbol_keys[k]: idx for k, idx in enumerate(best_permutation)}
+
+
+def _random_order_options(rng: random.Random, n: int):
+    order_options = {}
+    for i in range(n):
+        target = rng.choice([rng.uniform(0, 500), rng.randint(0, 20) * 10])
+        options = tuple(rng.choice([rng.randint(0, 30) * 10, round(rng.uniform(0, 600), 2)]) for _ in range(rng.randint(1, 4)))
+        order_options[f"S{i}"] = (target, options)
+    return order_options
+
+
+def test_find_order_minimum_error_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(300):
+        order_options = _random_order_options(rng, rng.randint(1, 6))
+        floor = sum(min(options) for _, options in order_options.values())
+        ceiling = sum(max(options) for _, options in order_options.values())
+        capital_cap = rng.choice([float('inf'), floor, rng.uniform(floor * 0.9, ceiling * 1.1)])
+        assert find_order_minimum_error(order_options, capital_cap) == _brute_force_minimum_error(order_options, capital_cap)
+
+
+def test_find_order_minimum_error_ties_use_lowest_index():
+    order_options = {
+        "A": (100, (90, 110)),
+        "B": (100, (110, 90)),
+    }
+    assert find_order_minimum_error(order_options) == {"A": 0, "B": 0}
+    assert find_order_minimum_error(order_options, capital_cap=200) == {"A": 0, "B": 0}
+
+
+def test_find_order_minimum_error_approximate_within_gap():
+    rng = random.Random(1)
+    for _ in range(100):
+        order_options = _random_order_options(rng, rng.randint(1, 6))
+        capital_cap = sum(target for target, _ in order_options.values())
+        exact = find_order_minimum_error(order_options, capital_cap)
+        approximate = find_order_minimum_error(order_options, capital_cap, relative_gap=0.1)
+
+        def squared_error(choice):
+            return sum((order_options[k][0] - order_options[k][1][i]) ** 2 for k, i in choice.items())
+
+        assert bool(approximate) == bool(exact)
+        if exact:
+            assert sum(order_options[k][1][i] for k, i in approximate.items()) <= capital_cap
+            assert squared_error(approximate) <= squared_error(exact) * 1.1 + 1e-6
+
+
+def test_find_order_minimum_error_negative_gap():
+    with pytest.raises(ValueError):
+        find_order_minimum_error({"A": (100, (90, 110))}, relative_gap=-0.1)
+
+
+def test_find_order_minimum_error_large_basket():
+    rng = random.Random(2)
+    order_options = {}
+    for i in range(200):
+        price = rng.uniform(5, 500)
+        target = rng.uniform(1_000, 20_000)
+        shares = math.floor(target / price)
+        order_options[f"S{i}"] = (target, (shares * price, (shares + 1) * price))
+    capital_cap = sum(opts[0] for _, opts in order_options.values()) + 5_000
+
+    result = find_order_minimum_error(order_options, capital_cap)
+    assert len(result) == 200
+    assert sum(order_options[k][1][i] for k, i in result.items()) <= capital_cap
+
+
+def test_calculate_rmse_batch_matches_scalar():
+    options = [(80, 130), (100,), (79, 140)]
+    targets = np.array([100, 100, 80])
+    candidates = np.array([[0, 0, 0], [1, 0, 1], [0, 0, 1]])
+
+    scores = calculate_rmse_batch(targets, pad_options(options), candidates)
+    expected = [calculate_rmse([(t, options[k][idx]) for k, (t, idx) in enumerate(zip(targets, row))]) for row in candidates]
+    assert scores == pytest.approx(expected)
+
+
+def test_calculate_rmse_batch_masks_cap_and_padding():
+    options = [(80, 130), (100,)]
+    targets = np.array([100, 100])
+    candidates = np.array([[0, 0], [1, 0], [0, 1]])
+
+    scores = calculate_rmse_batch(targets, pad_options(options), candidates, capital_cap=200)
+    assert np.isfinite(scores[0])
+    assert np.isinf(scores[1])  # 230 is over the cap
+    assert np.isinf(scores[2])  # "B" only has one option
+
+
+def test_find_order_minimum_error_node_budget_fallback():
+    rng = random.Random(3)
+    for _ in range(50):
+        order_options = _random_order_options(rng, rng.randint(2, 6))
+        capital_cap = sum(target for target, _ in order_options.values())
+        exact = find_order_minimum_error(order_options, capital_cap, max_nodes=None)
+        fallback = find_order_minimum_error(order_options, capital_cap, max_nodes=1)
+
+        assert bool(fallback) == bool(exact)
+        if exact:
+            assert sum(order_options[k][1][i] for k, i in fallback.items()) <= capital_cap
+
+
+def test_plan_rebalance_minimal_orders():
+    targets = [
+        FractionalOrder(symbol="A", fraction=0.3),  # 30 shares held, target 30
+        FractionalOrder(symbol="B", fraction=0.2),  # 5 shares held, target 20
+        FractionalOrder(symbol="C", fraction=0.0),  # 8 shares held, close
+    ]
+    orders = plan_rebalance(targets, {"A": 30, "B": 5, "C": 8}, {"A": 100, "B": 100, "C": 50}, 10_000)
+
+    assert [(o.symbol, o.instruction, o.quantity) for o in orders] == [("C", "SELL", 8), ("B", "BUY", 15)]
+
+
+def test_plan_rebalance_keeps_current_quantity_on_ties():
+    # 10.5 shares on target, both 10 and 11 are equally close
+    orders = plan_rebalance([FractionalOrder(symbol="A", fraction=0.105)], {"A": 11}, {"A": 100}, 10_000,
+                            capital_cap=float("inf"))
+    assert orders == []
+
+
+def test_plan_rebalance_respects_capital_cap():
+    targets = [FractionalOrder(symbol=s, fraction=0.25) for s in ("A", "B", "C", "D")]
+    prices = {"A": 30, "B": 70, "C": 90, "D": 110}
+    orders = plan_rebalance(targets, {}, prices, 10_000)
+
+    spent = sum(o.quantity * prices[o.symbol] for o in orders)
+    assert spent <= 10_000
+    assert all(o.instruction == "BUY" for o in orders)
+    # Nearest share rounding would spend 10,060, rounding B down is the cheapest fix
+    assert {o.symbol: o.quantity for o in orders} == {"A": 83, "B": 35, "C": 28, "D": 23}
+
+
+def test_plan_rebalance_crossing_zero():
+    targets = [FractionalOrder(symbol="A", fraction=-0.1), FractionalOrder(symbol="B", fraction=0.1)]
+    orders = plan_rebalance(targets, {"A": 5, "B": -3}, {"A": 100, "B": 100}, 10_000)
+
+    assert [(o.symbol, o.instruction, o.quantity) for o in orders] == [
+        ("A", "SELL", 5), ("A", "SELL_SHORT", 10), ("B", "BUY_TO_COVER", 3), ("B", "BUY", 10),
+    ]
+
+
+def test_plan_rebalance_missing_price():
+    with pytest.raises(ValueError, match="No price"):
+        plan_rebalance([FractionalOrder(symbol="A", fraction=0.1)], {}, {}, 10_000)
+
+
+def test_plan_rebalance_large_basket():
+    rng = random.Random(0)
+    n = 500
+    targets = [FractionalOrder(symbol=f"S{i}", fraction=1 / n) for i in range(n)]
+    prices = {f"S{i}": round(rng.uniform(5, 500), 2) for i in range(n)}
+    current = {f"S{i}": rng.randrange(0, 50) for i in range(0, n, 2)}
+
+    orders = plan_rebalance(targets, current, prices, 1_000_000)
+
+    final = {s: current.get(s, 0) for s in prices}
+    for o in orders:
+        final[o.symbol] += o.quantity if o.instruction == "BUY" else -o.quantity
+    assert sum(final[s] * prices[s] for s in prices) <= 1_000_000
+    assert all(abs(final[s] * prices[s] - 2_000) < prices[s] for s in prices)